@@ -3,24 +3,46 @@ FlowScope Python SDK
 
 AI/LLM debugging and observability platform for Python applications.
 Supports LangChain, LlamaIndex, and custom AI workflows.
+
+Submodules are loaded on first attribute access (PEP 562), so importing the
+package is cheap and free of side effects.
 """
 
 __version__ = "0.1.0"
 __author__ = "FlowScope Team"
 
-from .core import FlowScopeClient, trace, init
-from .context import with_context, current_context
-from .auto import auto_instrument, configure_auto_instrumentation
+import importlib
+
+# Public name -> submodule defining it, imported on first access
+_LAZY_ATTRIBUTES = {
+    'FlowScopeClient': 'core',
+    'SpanProcessor': 'core',
+    'trace': 'core',
+    'init': 'core',
+    'with_context': 'context',
+    'current_context': 'context',
+    'auto_instrument': 'auto',
+    'configure_auto_instrumentation': 'auto',
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
-# Main client instance - initialized lazily
-_client = None
 
 def get_client():
     """Get the global FlowScope client instance."""
-    global _client
-    if _client is None:
-        _client = FlowScopeClient()
-    return _client
+    from .core import get_global_client
+    return get_global_client()
 
 # Convenience functions that use the global client
 def configure(config=None, **kwargs):
@@ -42,7 +64,7 @@ def set_session(session_id):
 # Export commonly used items
 __all__ = [
     # Core functionality
-    'FlowScopeClient', 'trace', 'init', 'configure', 'flush',
+    'FlowScopeClient', 'SpanProcessor', 'trace', 'init', 'configure', 'flush',
     # Session management
     'create_session', 'set_session',
     # Context management
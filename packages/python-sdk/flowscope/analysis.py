@@ -0,0 +1,461 @@
+"""
+FlowScope Trace Analysis
+
+Offline analysis of traces spooled to disk by the file exporter. Span files
+are loaded into a columnar SpanTable (NumPy arrays, with strings dictionary-
+encoded as integer codes) and aggregated with vectorized operations, so
+reports over millions of spans never loop over spans in Python.
+
+Loading stays columnar too. Parquet files are read memory-mapped and NDJSON
+files parsed by Arrow's JSON reader; columnar files are decoded column by
+column (flowscope.wire.decode_columns), their string dictionaries mapped to
+codes once per distinct value. Only metadata's "class" is picked per span
+from columnar files, and NDJSON is read record by record without pyarrow.
+
+Filters are applied as early as possible: sidecar indexes skip whole files,
+Parquet reads push them down to row groups, and the other formats apply them
+as masks before any column is encoded.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .exporters.file import SpanFileIndex, build_index, read_records, span_files
+
+# Dictionary-encoded string columns of a SpanTable
+CATEGORICAL_COLUMNS = ("session_id", "operation", "framework", "class", "status")
+
+# Parquet stores metadata as a JSON string; pull the wrapped class out without parsing it
+_CLASS_PATTERN = r'"class":"(?P<value>[^"\\]*)"'
+
+# Arrow's JSON reader needs each NDJSON line to fit in one block
+_JSON_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+class _Categories:
+    """Assigns stable integer codes to the distinct values of a column across files."""
+    
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+        
+    def code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+        
+    def lookup_table(self, values: Iterable[Any]) -> np.ndarray:
+        """Map a file-local dictionary to global codes."""
+        return np.array([self.code(v) for v in values], dtype=np.int32)
+        
+    def map_references(self, references: np.ndarray, dictionary: Sequence[Any]) -> np.ndarray:
+        """Global codes of references into a file-local dictionary, coding only the values in use."""
+        used = np.unique(references)
+        lookup = np.zeros(len(dictionary), dtype=np.int32)
+        lookup[used] = self.lookup_table([dictionary[i] for i in used.tolist()])
+        return lookup[references]
+
+
+def _predicates(filters: Dict[str, Any]) -> List[Tuple[str, str, Any]]:
+    """The load filters as Parquet-style (column, op, value) predicates."""
+    predicates = []
+    if filters["session"] is not None:
+        predicates.append(("session_id", "=", filters["session"]))
+    if filters["operation"] is not None:
+        predicates.append(("operation", "=", filters["operation"]))
+    if filters["since"] is not None:
+        predicates.append(("start_time", ">=", filters["since"]))
+    if filters["until"] is not None:
+        predicates.append(("start_time", "<", filters["until"]))
+    return predicates
+
+
+class SpanTable:
+    """
+    Columnar spans: categorical columns as int32 codes plus their values,
+    start times (epoch seconds) and durations (ms, NaN for unfinished spans).
+    """
+    
+    def __init__(
+        self,
+        ids: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        categories: Dict[str, List[Any]],
+        start_time: np.ndarray,
+        duration: np.ndarray
+    ):
+        self.ids = ids
+        self.codes = codes
+        self.categories = categories
+        self.start_time = start_time
+        self.duration = duration
+        self.is_error = self.codes["status"] == self._code_of("status", "error")
+        
+    def __len__(self) -> int:
+        return len(self.start_time)
+        
+    def _code_of(self, column: str, value: Any) -> int:
+        try:
+            return self.categories[column].index(value)
+        except ValueError:
+            return -1
+            
+    def values(self, column: str, rows: Optional[np.ndarray] = None) -> List[Any]:
+        """Decoded values of a categorical column, optionally for selected rows only."""
+        codes = self.codes[column] if rows is None else self.codes[column][rows]
+        categories = self.categories[column]
+        return [categories[c] for c in codes.tolist()]
+
+
+class _TableBuilder:
+    """Accumulates per-file column chunks into one SpanTable."""
+    
+    def __init__(self):
+        self.categories = {name: _Categories() for name in CATEGORICAL_COLUMNS}
+        self.chunks: List[Dict[str, np.ndarray]] = []
+        
+    def add_records(self, path: str, filters: Dict[str, Any]):
+        """Add a file record by record (NDJSON without pyarrow, or too long lines for Arrow)."""
+        session, operation = filters["session"], filters["operation"]
+        since, until = filters["since"], filters["until"]
+        ids, starts, durations = [], [], []
+        codes = {name: [] for name in CATEGORICAL_COLUMNS}
+        categorical = [(codes[name], self.categories[name].code, name) for name in CATEGORICAL_COLUMNS]
+        
+        for record in read_records(path):
+            start = record["start_time"]
+            if (
+                (session is not None and record["session_id"] != session)
+                or (operation is not None and record["operation"] != operation)
+                or (since is not None and start < since)
+                or (until is not None and start >= until)
+            ):
+                continue
+            record["class"] = (record.get("metadata") or {}).get("class")
+            ids.append(record["id"])
+            starts.append(start)
+            durations.append(record["duration"])
+            for column, code, name in categorical:
+                column.append(code(record[name]))
+                
+        chunk = {name: np.array(values, dtype=np.int32) for name, values in codes.items()}
+        chunk["id"] = np.array(ids, dtype=object)
+        chunk["start_time"] = np.array(starts, dtype=np.float64)
+        chunk["duration"] = np.array(durations, dtype=np.float64)  # None becomes NaN
+        self.chunks.append(chunk)
+        
+    def add_columnar(self, path: str, filters: Dict[str, Any]):
+        """Add a columnar file, batch by batch, without building span records."""
+        from .wire import decode_columns, split_frames
+        
+        with open(path, "rb") as f:
+            data = f.read()
+        for batch in split_frames(data):
+            columns = decode_columns(batch)
+            dictionary = [None] + columns["strings"]
+            references = {name: np.asarray(columns[name], dtype=np.int64) for name in ("session_id", "operation", "framework", "status")}
+            start_time = np.asarray(columns["start_us"], dtype=np.int64) / 1e6
+            end = np.asarray(columns["end_us"], dtype=np.int64)
+            
+            keep = np.ones(len(start_time), dtype=bool)
+            for name in ("session", "operation"):
+                value = filters[name]
+                if value is not None:
+                    reference = columns["strings"].index(value) + 1 if value in columns["strings"] else -1
+                    keep &= references["session_id" if name == "session" else name] == reference
+            if filters["since"] is not None:
+                keep &= start_time >= filters["since"]
+            if filters["until"] is not None:
+                keep &= start_time < filters["until"]
+            rows = np.flatnonzero(keep)
+            
+            chunk = {
+                name: self.categories[name].map_references(column[rows], dictionary)
+                for name, column in references.items()
+            }
+            metadata = columns["metadata"]
+            chunk["class"] = self.categories["class"].lookup_table([metadata[row].get("class") for row in rows.tolist()])
+            chunk["id"] = np.array(columns["id"], dtype=object)[rows]
+            chunk["start_time"] = start_time[rows]
+            chunk["duration"] = np.where(end[rows] > 0, (end[rows] - 1) / 1000, np.nan)
+            self.chunks.append(chunk)
+            
+    def add_ndjson(self, path: str, filters: Dict[str, Any]):
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+            import pyarrow.json as pj
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.add_records(path, filters)
+            return
+            
+        schema = pa.schema(
+            [(name, pa.string()) for name in ("id", "session_id", "operation", "framework", "status")]
+            + [("start_time", pa.float64()), ("duration", pa.float64()), ("metadata", pa.struct([("class", pa.string())]))]
+        )
+        try:
+            table = pj.read_json(
+                path,
+                read_options=pj.ReadOptions(block_size=_JSON_BLOCK_SIZE),
+                parse_options=pj.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore"),
+            )
+        except pa.ArrowInvalid:
+            # A record longer than a block, or a "class" that is not a string
+            self.add_records(path, filters)
+            return
+        predicates = _predicates(filters)
+        if predicates:
+            table = table.filter(pq.filters_to_expression(predicates))
+        columns = {name: table.column(name) for name in table.column_names}
+        columns["class"] = pc.struct_field(columns.pop("metadata"), [0])
+        self._add_arrow(columns)
+        
+    def add_parquet(self, path: str, filters: Dict[str, Any]):
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        
+        table = pq.read_table(
+            path,
+            columns=["id", "session_id", "operation", "framework", "status", "start_time", "duration", "metadata"],
+            filters=_predicates(filters) or None,
+            memory_map=True,
+        )
+        columns = {name: table.column(name) for name in table.column_names}
+        columns["class"] = pc.struct_field(pc.extract_regex(columns.pop("metadata"), _CLASS_PATTERN), [0])
+        self._add_arrow(columns)
+        
+    def _add_arrow(self, columns: Dict[str, Any]):
+        import pyarrow.compute as pc
+        
+        chunk = {}
+        for name in CATEGORICAL_COLUMNS:
+            encoded = columns[name].combine_chunks().dictionary_encode()
+            dictionary = encoded.dictionary.to_pylist() + [None]
+            # Nulls get the extra None entry at the end of the dictionary
+            indices = encoded.indices.fill_null(len(dictionary) - 1).to_numpy(zero_copy_only=False)
+            chunk[name] = self.categories[name].lookup_table(dictionary)[indices]
+        chunk["id"] = columns["id"].to_numpy().astype(object)
+        chunk["start_time"] = columns["start_time"].to_numpy()
+        chunk["duration"] = pc.fill_null(columns["duration"], float("nan")).to_numpy()
+        self.chunks.append(chunk)
+        
+    def build(self) -> SpanTable:
+        def concat(name, dtype):
+            arrays = [chunk[name] for chunk in self.chunks]
+            return np.concatenate(arrays) if arrays else np.array([], dtype=dtype)
+            
+        return SpanTable(
+            ids=concat("id", object),
+            codes={name: concat(name, np.int32) for name in CATEGORICAL_COLUMNS},
+            categories={name: cats.values for name, cats in self.categories.items()},
+            start_time=concat("start_time", np.float64),
+            duration=concat("duration", np.float64),
+        )
+
+
+def load_spans(
+    paths: Sequence[str],
+    session: Optional[str] = None,
+    operation: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None
+) -> SpanTable:
+    """
+    Load span files (or directories of them) into a SpanTable.
+    
+    Only spans matching all given filters are loaded: an exact session ID,
+    an exact operation name and a start time in [since, until).
+    """
+    filters = {"session": session, "operation": operation, "since": since, "until": until}
+    builder = _TableBuilder()
+    for path in span_files(paths):
+        index = SpanFileIndex.load(path)
+        if index is not None and not index.matches(session, operation, since, until):
+            continue
+        if path.endswith(".parquet"):
+            builder.add_parquet(path, filters)
+        elif path.endswith(".fsc"):
+            builder.add_columnar(path, filters)
+        else:
+            builder.add_ndjson(path, filters)
+    return builder.build()
+
+
+def _group(table: SpanTable, keys: Sequence[str]) -> Tuple[np.ndarray, List[Tuple[Any, ...]]]:
+    """Group rows by one or more categorical columns: (group code per row, group labels)."""
+    unknown = [key for key in keys if key not in CATEGORICAL_COLUMNS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)} (expected one of {', '.join(CATEGORICAL_COLUMNS)})")
+    sizes = [max(len(table.categories[key]), 1) for key in keys]
+    combined = np.zeros(len(table), dtype=np.int64)
+    for key, size in zip(keys, sizes):
+        combined = combined * size + table.codes[key]
+    unique, inverse = np.unique(combined, return_inverse=True)
+    
+    # Decode each unique combined code back into per-column codes
+    parts = []
+    remainder = unique
+    for size in reversed(sizes):
+        parts.append(remainder % size)
+        remainder = remainder // size
+    parts.reverse()
+    labels = [
+        tuple(table.categories[key][code] for key, code in zip(keys, codes))
+        for codes in zip(*(part.tolist() for part in parts))
+    ]
+    return inverse.reshape(-1), labels
+
+
+def _grouped_percentiles(groups: np.ndarray, values: np.ndarray, n_groups: int, percentiles: Sequence[float]) -> Dict[float, np.ndarray]:
+    """Per-group percentiles (linear interpolation, like numpy.percentile) from one sort."""
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    nonempty = counts > 0
+    
+    results = {}
+    for q in percentiles:
+        result = np.full(n_groups, np.nan)
+        position = offsets[nonempty] + (counts[nonempty] - 1) * (q / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        result[nonempty] = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+        results[q] = result
+    return results
+
+
+def slowest_spans(table: SpanTable, n: int = 10) -> List[Dict[str, Any]]:
+    """The n slowest finished spans, slowest first."""
+    finished = np.flatnonzero(~np.isnan(table.duration))
+    if finished.size == 0:
+        return []
+    durations = table.duration[finished]
+    n = min(n, finished.size)
+    top = np.argpartition(-durations, n - 1)[:n]
+    rows = finished[top[np.argsort(-durations[top], kind="stable")]]
+    
+    operations = table.values("operation", rows)
+    sessions = table.values("session_id", rows)
+    statuses = table.values("status", rows)
+    return [
+        {
+            "id": table.ids[row],
+            "operation": operations[i],
+            "session_id": sessions[i],
+            "status": statuses[i],
+            "start_time": float(table.start_time[row]),
+            "duration": float(table.duration[row]),
+        }
+        for i, row in enumerate(rows.tolist())
+    ]
+
+
+def latency_percentiles(
+    table: SpanTable,
+    by: Sequence[str] = ("operation",),
+    percentiles: Sequence[float] = (50, 95, 99)
+) -> List[Dict[str, Any]]:
+    """Duration percentiles (ms) of finished spans per group, highest p95 (or last percentile) first."""
+    finished = ~np.isnan(table.duration)
+    groups, labels = _group(table, by)
+    groups = groups[finished]
+    durations = table.duration[finished]
+    n_groups = len(labels)
+    
+    counts = np.bincount(groups, minlength=n_groups)
+    totals = np.bincount(groups, weights=durations, minlength=n_groups)
+    maxima = np.full(n_groups, -np.inf)
+    np.maximum.at(maxima, groups, durations)
+    values = _grouped_percentiles(groups, durations, n_groups, percentiles)
+    
+    rank_by = values[95 if 95 in values else percentiles[-1]]
+    rows = []
+    for g in np.argsort(-np.nan_to_num(rank_by, nan=-np.inf), kind="stable").tolist():
+        if counts[g] == 0:
+            continue
+        row = dict(zip(by, labels[g]))
+        row["count"] = int(counts[g])
+        row["mean"] = float(totals[g] / counts[g])
+        for q in percentiles:
+            row[f"p{q:g}"] = float(values[q][g])
+        row["max"] = float(maxima[g])
+        rows.append(row)
+    return rows
+
+
+def error_rates(table: SpanTable, by: Sequence[str] = ("framework", "class")) -> List[Dict[str, Any]]:
+    """Span and error counts per group, highest error rate first."""
+    groups, labels = _group(table, by)
+    counts = np.bincount(groups, minlength=len(labels))
+    errors = np.bincount(groups, weights=table.is_error, minlength=len(labels))
+    rates = np.divide(errors, counts, out=np.zeros(len(labels)), where=counts > 0)
+    
+    rows = []
+    for g in np.lexsort((-counts, -rates)).tolist():
+        if counts[g] == 0:
+            continue
+        row = dict(zip(by, labels[g]))
+        row.update({"count": int(counts[g]), "errors": int(errors[g]), "error_rate": float(rates[g])})
+        rows.append(row)
+    return rows
+
+
+def session_rollups(table: SpanTable, sort: str = "wall_time") -> List[Dict[str, Any]]:
+    """
+    Per-session totals: span and error counts, operation variety, first and
+    last span start, and wall time (ms) from the first start to the last end.
+    """
+    sessions = table.codes["session_id"]
+    n_sessions = len(table.categories["session_id"])
+    counts = np.bincount(sessions, minlength=n_sessions)
+    errors = np.bincount(sessions, weights=table.is_error, minlength=n_sessions)
+    
+    ends = table.start_time + np.nan_to_num(table.duration) / 1000.0
+    first = np.full(n_sessions, np.inf)
+    last_start = np.full(n_sessions, -np.inf)
+    last_end = np.full(n_sessions, -np.inf)
+    np.minimum.at(first, sessions, table.start_time)
+    np.maximum.at(last_start, sessions, table.start_time)
+    np.maximum.at(last_end, sessions, ends)
+    
+    # Distinct operations per session: count unique (session, operation) pairs
+    pairs = np.unique(sessions.astype(np.int64) * max(len(table.categories["operation"]), 1) + table.codes["operation"])
+    operations = np.bincount(pairs // max(len(table.categories["operation"]), 1), minlength=n_sessions)
+    
+    wall_time = (last_end - first) * 1000.0
+    sort_keys = {"wall_time": wall_time, "spans": counts, "errors": errors}
+    if sort not in sort_keys:
+        raise ValueError(f"Unknown sort key: {sort!r} (expected one of {', '.join(sort_keys)})")
+        
+    rows = []
+    for s in np.argsort(-sort_keys[sort], kind="stable").tolist():
+        if counts[s] == 0:
+            continue
+        rows.append({
+            "session_id": table.categories["session_id"][s],
+            "spans": int(counts[s]),
+            "errors": int(errors[s]),
+            "operations": int(operations[s]),
+            "first_start": float(first[s]),
+            "last_start": float(last_start[s]),
+            "wall_time": float(wall_time[s]),
+        })
+    return rows
+
+
+__all__ = [
+    'SpanTable',
+    'span_files',
+    'build_index',
+    'load_spans',
+    'slowest_spans',
+    'latency_percentiles',
+    'error_rates',
+    'session_rollups',
+]
@@ -1,25 +1,32 @@
 """
 FlowScope Auto-Instrumentation for Python
 
-Provides automatic instrumentation for LangChain, LlamaIndex,
-and other AI/ML frameworks using import hooks and monkey patching.
+Provides automatic instrumentation for LangChain, LlamaIndex, the OpenAI
+and Anthropic SDKs and other AI/ML frameworks using import hooks and monkey
+patching. What gets patched is declared by plugins (flowscope.plugins).
 """
 
 import sys
-import importlib.util
-import importlib.abc
+import time
 import types
-from typing import Any, Dict, List, Optional, Set, Callable
-from functools import wraps
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Callable, Union
+from functools import partial, wraps
 
-from .core import get_global_client
+from .core import get_global_client, _is_coroutine_function
+
+if TYPE_CHECKING:
+    from .plugins import InstrumentationPlugin, MethodTarget
+
+# flowscope.plugins is imported by auto_instrument() and instrument_class(),
+# so importing this module stays cheap until instrumentation is enabled
 
 # Global state for auto-instrumentation
 _auto_instrumentation_enabled = False
 _instrumented_modules: Set[str] = set()
 _original_imports: Dict[str, Any] = {}
+_active_plugins: List["InstrumentationPlugin"] = []
 _config = {
-    "frameworks": ["langchain", "llamaindex"],
+    "frameworks": ["langchain", "llamaindex", "openai", "anthropic"],
     "patch_on_import": True,
     "trace_async": True,
     "include_args": True,
@@ -27,7 +34,10 @@ _config = {
     "ignore_methods": ["__init__", "__repr__", "__str__"],
 }
 
-class FlowScopeImportHook(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+# The hook and loader follow the meta path finder and loader protocols
+# without subclassing importlib.abc, which alone adds ~15ms to import time
+
+class FlowScopeImportHook:
     """Custom import hook for automatic instrumentation."""
     
     def __init__(self, target_modules: List[str]):
@@ -60,7 +70,7 @@ class FlowScopeImportHook(importlib.abc.MetaPathFinder, importlib.abc.Loader):
                 
         return None
 
-class FlowScopeLoader(importlib.abc.Loader):
+class FlowScopeLoader:
     """Custom loader that instruments modules after loading."""
     
     def __init__(self, original_loader, module_name):
@@ -85,71 +95,43 @@ class FlowScopeLoader(importlib.abc.Loader):
             _instrumented_modules.add(self.module_name)
 
 def _instrument_module(module: types.ModuleType, module_name: str):
-    """Instrument a module by patching key classes and methods."""
+    """Instrument a module by patching the classes the active plugins trace in it."""
     print(f"[FlowScope] Auto-instrumenting: {module_name}")
     
-    # LangChain instrumentation
-    if "langchain" in module_name:
-        _instrument_langchain_module(module, module_name)
-    
-    # LlamaIndex instrumentation
-    elif "llama_index" in module_name or "llamaindex" in module_name:
-        _instrument_llamaindex_module(module, module_name)
+    for plugin in _active_plugins:
+        if plugin.watches(module_name):
+            for cls, target in plugin.classes_in(module):
+                _instrument_class(cls, plugin, target)
 
-def _instrument_langchain_module(module: types.ModuleType, module_name: str):
-    """Instrument LangChain-specific classes and methods."""
-    
-    # Common LangChain classes to instrument
-    targets = [
-        "LLMChain", "ConversationChain", "RetrievalQA", "VectorStoreRetriever",
-        "AgentExecutor", "Agent", "BaseLanguageModel", "BaseLLM", "BaseChain"
-    ]
-    
-    for attr_name in dir(module):
-        attr = getattr(module, attr_name)
-        
-        # Check if this is a class we want to instrument
-        if isinstance(attr, type) and attr_name in targets:
-            _instrument_class(attr, f"langchain.{attr_name}")
+def _instrument_class(cls: type, plugin: "InstrumentationPlugin", target: "MethodTarget"):
+    """Instrument the methods of a class that a plugin target lists."""
+    for method_name in target.methods:
+        if hasattr(cls, method_name) and method_name not in _config["ignore_methods"]:
+            _instrument_method(cls, method_name, plugin, target)
 
-def _instrument_llamaindex_module(module: types.ModuleType, module_name: str):
-    """Instrument LlamaIndex-specific classes and methods."""
-    
-    # Common LlamaIndex classes to instrument  
-    targets = [
-        "VectorStoreIndex", "ListIndex", "QueryEngine", "RetrieverQueryEngine",
-        "BaseQueryEngine", "BaseRetriever", "LLMPredictor", "ServiceContext"
-    ]
-    
-    for attr_name in dir(module):
-        attr = getattr(module, attr_name)
-        
-        # Check if this is a class we want to instrument
-        if isinstance(attr, type) and attr_name in targets:
-            _instrument_class(attr, f"llamaindex.{attr_name}")
+def _extract(client, extractor: Callable, *args) -> Any:
+    """Run a plugin extractor; a failing one must never break the traced call."""
+    try:
+        return extractor(*args)
+    except Exception as e:
+        if client.config["verbose"]:
+            print(f"❌ FlowScope plugin extractor failed: {e}")
+        return None
 
-def _instrument_class(cls: type, class_name: str):
-    """Instrument all relevant methods of a class."""
-    
-    # Methods to instrument for different classes
-    method_mappings = {
-        "langchain.LLMChain": ["run", "call", "invoke", "arun", "acall", "ainvoke"],
-        "langchain.ConversationChain": ["run", "predict", "call", "invoke"],
-        "langchain.RetrievalQA": ["run", "call", "invoke"],
-        "langchain.AgentExecutor": ["run", "call", "invoke"],
-        "llamaindex.VectorStoreIndex": ["query", "as_query_engine", "as_retriever"],
-        "llamaindex.QueryEngine": ["query", "aquery"],
-        "llamaindex.BaseRetriever": ["retrieve", "aretrieve"],
-    }
-    
-    # Get methods to instrument for this class
-    methods_to_patch = method_mappings.get(class_name, ["run", "call", "invoke", "query"])
+def _record_metadata(trace, metadata: Optional[Dict[str, Any]]):
+    """Add extracted metadata, and the token throughput it implies."""
+    if not metadata:
+        return
+    trace.add_metadata(metadata)
     
-    for method_name in methods_to_patch:
-        if hasattr(cls, method_name) and method_name not in _config["ignore_methods"]:
-            _instrument_method(cls, method_name, class_name)
+    usage = trace.metadata.get("token_usage") or {}
+    tokens = usage.get("completion_tokens") or trace.metadata.get("token_count")
+    if tokens:
+        elapsed = time.time() - trace.start_time
+        if elapsed > 0:
+            trace.add_metadata(tokens_per_second=tokens / elapsed)
 
-def _instrument_method(cls: type, method_name: str, class_name: str):
+def _instrument_method(cls: type, method_name: str, plugin: "InstrumentationPlugin", target: "MethodTarget"):
     """Instrument a specific method of a class."""
     
     original_method = getattr(cls, method_name)
@@ -157,74 +139,294 @@ def _instrument_method(cls: type, method_name: str, class_name: str):
     # Skip if already instrumented
     if hasattr(original_method, '_flowscope_instrumented'):
         return
+        
+    class_name = f"{plugin.name}.{target.cls}"
+    operation_name = target.operation.format(plugin=plugin.name, cls=target.cls, method=method_name)
     
+    def start_metadata(client, args: tuple, kwargs: dict) -> Dict[str, Any]:
+        metadata = {
+            "framework": plugin.framework,
+            "class": class_name,
+            "method": method_name,
+            "auto_instrumented": True
+        }
+        if target.request_metadata is not None:
+            metadata.update(_extract(client, target.request_metadata, args, kwargs) or {})
+        return metadata
+        
+    def start_stream(client, args: tuple, kwargs: dict):
+        trace = client.start_trace(operation_name, metadata=start_metadata(client, args, kwargs))
+        if trace and _config["include_args"]:
+            trace.set_input({"args": args, "kwargs": kwargs})
+        return trace
+        
+    def finish_call(client, trace, result):
+        if target.response_metadata is not None:
+            _record_metadata(trace, _extract(client, target.response_metadata, result))
+        if _config["include_results"]:
+            trace.set_output(result)
+            
     @wraps(original_method)
     def sync_wrapper(self, *args, **kwargs):
         client = get_global_client()
-        operation_name = f"{class_name}.{method_name}"
         
-        with client.trace(
-            operation_name,
-            metadata={
-                "framework": "langchain" if "langchain" in class_name else "llamaindex",
-                "class": class_name,
-                "method": method_name,
-                "auto_instrumented": True
-            }
-        ) as trace:
+        # Streamed responses are returned right away; their span ends with the stream
+        if target.stream_arg is not None and kwargs.get(target.stream_arg):
+            trace = start_stream(client, args, kwargs)
+            try:
+                stream = original_method(self, *args, **kwargs)
+            except Exception as e:
+                client.finish_trace(trace, success=False, error=str(e))
+                raise
+            if trace is None:
+                return stream
+            client.detach_trace(trace)
+            return _TracedStream(stream, _StreamSpan(client, trace, target))
+            
+        with client.trace(operation_name, metadata=start_metadata(client, args, kwargs)) as trace:
+            inputs = {"args": args, "kwargs": kwargs}
             if trace and _config["include_args"]:
-                trace.set_input({"args": args, "kwargs": kwargs})
+                trace.set_input(inputs)
                 
-            result = original_method(self, *args, **kwargs)
-            
-            if trace and _config["include_results"]:
-                trace.set_output(result)
+            replay = client.get_replay_cache()
+            if replay is not None:
+                result = replay.call(operation_name, inputs, partial(original_method, self, *args, **kwargs), self, trace)
+            else:
+                result = original_method(self, *args, **kwargs)
+                
+            if trace:
+                finish_call(client, trace, result)
                 
             return result
-    
+            
     @wraps(original_method)
     async def async_wrapper(self, *args, **kwargs):
         client = get_global_client()
-        operation_name = f"{class_name}.{method_name}"
         
-        with client.trace(
-            operation_name,
-            metadata={
-                "framework": "langchain" if "langchain" in class_name else "llamaindex", 
-                "class": class_name,
-                "method": method_name,
-                "auto_instrumented": True
-            }
-        ) as trace:
+        if target.stream_arg is not None and kwargs.get(target.stream_arg):
+            trace = start_stream(client, args, kwargs)
+            try:
+                stream = await original_method(self, *args, **kwargs)
+            except Exception as e:
+                client.finish_trace(trace, success=False, error=str(e))
+                raise
+            if trace is None:
+                return stream
+            client.detach_trace(trace)
+            return _TracedAsyncStream(stream, _StreamSpan(client, trace, target))
+            
+        with client.trace(operation_name, metadata=start_metadata(client, args, kwargs)) as trace:
+            inputs = {"args": args, "kwargs": kwargs}
             if trace and _config["include_args"]:
-                trace.set_input({"args": args, "kwargs": kwargs})
+                trace.set_input(inputs)
                 
-            result = await original_method(self, *args, **kwargs)
-            
-            if trace and _config["include_results"]:
-                trace.set_output(result)
+            replay = client.get_replay_cache()
+            if replay is not None:
+                result = await replay.acall(operation_name, inputs, partial(original_method, self, *args, **kwargs), self, trace)
+            else:
+                result = await original_method(self, *args, **kwargs)
+                
+            if trace:
+                finish_call(client, trace, result)
                 
             return result
-    
+            
     # Determine if we need sync or async wrapper
-    import asyncio
-    if asyncio.iscoroutinefunction(original_method):
+    if target.kind == "async" or (target.kind == "auto" and _is_coroutine_function(original_method)):
         wrapper = async_wrapper
     else:
         wrapper = sync_wrapper
-    
+        
     # Mark as instrumented and replace
     wrapper._flowscope_instrumented = True
     setattr(cls, method_name, wrapper)
     
     print(f"[FlowScope] Instrumented: {class_name}.{method_name}")
 
+class _StreamSpan:
+    """The open span of a streamed response, fed chunk by chunk and finished once."""
+    
+    __slots__ = ("client", "trace", "accumulator", "first_token", "done")
+    
+    def __init__(self, client, trace, target: "MethodTarget"):
+        self.client = client
+        self.trace = trace
+        accumulator = _extract(client, target.stream_accumulator)
+        if accumulator is None:
+            from .plugins import StreamAccumulator
+            accumulator = StreamAccumulator()
+        self.accumulator = accumulator
+        self.first_token = True
+        self.done = False
+        
+    def observe(self, chunk: Any):
+        if self.done:
+            return
+        content = _extract(self.client, self.accumulator.add, chunk)
+        if content and self.first_token:
+            self.first_token = False
+            ttft = (time.time() - self.trace.start_time) * 1000
+            self.trace.add_metadata(time_to_first_token=ttft)
+            self.trace.add_event("first_token", {"elapsed_ms": ttft})
+            
+    def finish(self, error: Optional[BaseException] = None):
+        if self.done:
+            return
+        self.done = True
+        client, trace = self.client, self.trace
+        _record_metadata(trace, _extract(client, self.accumulator.metadata))
+        if _config["include_results"]:
+            output = _extract(client, self.accumulator.output)
+            if output is not None:
+                trace.set_output(output)
+        if error is None:
+            client.finish_trace(trace, success=True)
+        else:
+            client.finish_trace(trace, success=False, error=str(error) or type(error).__name__)
+
+class _TracedStream:
+    """
+    A streamed response whose span stays open until it is consumed.
+    
+    Yields the stream's chunks unchanged and finishes the span when the
+    stream is exhausted, fails or is closed (a stream abandoned half-read is
+    left to the client's reaper). Other attributes are the stream's own.
+    """
+    
+    def __init__(self, stream: Any, span: _StreamSpan):
+        self._stream = stream
+        self._span = span
+        self._iterator = None
+        
+    def __iter__(self):
+        return self
+        
+    def __next__(self):
+        if self._iterator is None:
+            self._iterator = iter(self._stream)
+        try:
+            chunk = next(self._iterator)
+        except StopIteration:
+            self._span.finish()
+            raise
+        except BaseException as e:
+            self._span.finish(e)
+            raise
+        self._span.observe(chunk)
+        return chunk
+        
+    def __enter__(self):
+        enter = getattr(self._stream, "__enter__", None)
+        if enter is not None:
+            enter()
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            exit_ = getattr(self._stream, "__exit__", None)
+            return exit_(exc_type, exc, tb) if exit_ is not None else None
+        finally:
+            self._span.finish(exc)
+            
+    def close(self):
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._span.finish()
+            
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+class _TracedAsyncStream:
+    """The asynchronous counterpart of _TracedStream."""
+    
+    def __init__(self, stream: Any, span: _StreamSpan):
+        self._stream = stream
+        self._span = span
+        self._iterator = None
+        
+    def __aiter__(self):
+        return self
+        
+    async def __anext__(self):
+        if self._iterator is None:
+            self._iterator = self._stream.__aiter__()
+        try:
+            chunk = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._span.finish()
+            raise
+        except BaseException as e:
+            self._span.finish(e)
+            raise
+        self._span.observe(chunk)
+        return chunk
+        
+    async def __aenter__(self):
+        enter = getattr(self._stream, "__aenter__", None)
+        if enter is not None:
+            await enter()
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            exit_ = getattr(self._stream, "__aexit__", None)
+            return await exit_(exc_type, exc, tb) if exit_ is not None else None
+        finally:
+            self._span.finish(exc)
+            
+    async def close(self):
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                result = close()
+                if hasattr(result, "__await__"):
+                    await result
+        finally:
+            self._span.finish()
+            
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+def instrument_class(cls: type, plugin: Union[str, "InstrumentationPlugin"], class_name: Optional[str] = None):
+    """
+    Instrument one class the way a plugin describes it, without import hooks.
+    
+    Useful for classes the hooks do not see, and for testing plugins against
+    stub clients:
+        
+        class Completions:  # stands in for openai.resources.chat.Completions
+            def create(self, **kwargs): ...
+        
+        instrument_class(Completions, "openai")
+    
+    Args:
+        cls: Class to patch
+        plugin: Plugin (or plugin name) describing it
+        class_name: Name of the plugin target to apply (defaults to cls.__name__)
+    """
+    if isinstance(plugin, str):
+        from .plugins import get_plugin
+        plugin = get_plugin(plugin)
+    target = plugin.target_for(cls, class_name)
+    if target is None:
+        raise ValueError(f"Plugin {plugin.name!r} has no target for class {class_name or cls.__name__!r}")
+    _instrument_class(cls, plugin, target)
+
+def uninstrument_class(cls: type):
+    """Restore the original methods of a class patched by auto-instrumentation."""
+    for name, attr in list(vars(cls).items()):
+        if getattr(attr, "_flowscope_instrumented", False):
+            setattr(cls, name, attr.__wrapped__)
+
 def auto_instrument(frameworks: Optional[List[str]] = None) -> bool:
     """
     Enable automatic instrumentation for specified frameworks.
     
     Args:
-        frameworks: List of frameworks to instrument ["langchain", "llamaindex"]
+        frameworks: Plugins to enable, e.g. ["langchain", "llamaindex", "openai", "anthropic"]
     
     Returns:
         True if instrumentation was enabled successfully
@@ -235,19 +437,24 @@ def auto_instrument(frameworks: Optional[List[str]] = None) -> bool:
         frameworks = _config["frameworks"]
         
     try:
-        # Install import hook
-        hook = FlowScopeImportHook(frameworks)
+        from .plugins import get_plugin
+        for plugin in (get_plugin(name) for name in frameworks):
+            if plugin not in _active_plugins:
+                _active_plugins.append(plugin)
+                
+        # Install import hook, replacing one from an earlier call
+        hook = FlowScopeImportHook([prefix for plugin in _active_plugins for prefix in plugin.modules])
+        sys.meta_path = [finder for finder in sys.meta_path if not isinstance(finder, FlowScopeImportHook)]
         
         # Insert at the beginning to catch imports early
-        if hook not in sys.meta_path:
-            sys.meta_path.insert(0, hook)
+        sys.meta_path.insert(0, hook)
         
         _auto_instrumentation_enabled = True
         
         print(f"[FlowScope] Auto-instrumentation enabled for: {', '.join(frameworks)}")
         
         # Try to instrument already imported modules
-        _instrument_existing_modules(frameworks)
+        _instrument_existing_modules()
         
         return True
         
@@ -255,27 +462,22 @@ def auto_instrument(frameworks: Optional[List[str]] = None) -> bool:
         print(f"❌ Failed to enable auto-instrumentation: {e}")
         return False
 
-def _instrument_existing_modules(frameworks: List[str]):
+def _instrument_existing_modules():
     """Instrument modules that were imported before auto-instrumentation was enabled."""
     
-    for module_name, module in sys.modules.items():
+    for module_name, module in list(sys.modules.items()):
         if module is None:
             continue
             
         # Check if this module should be instrumented
-        should_instrument = False
-        for framework in frameworks:
-            if module_name.startswith(framework):
-                should_instrument = True
-                break
-                
+        should_instrument = any(plugin.watches(module_name) for plugin in _active_plugins)
+        
         if should_instrument and module_name not in _instrumented_modules:
             _instrument_module(module, module_name)
             _instrumented_modules.add(module_name)
 
 def configure_auto_instrumentation(**kwargs):
     """Configure auto-instrumentation behavior."""
-    global _config
     _config.update(kwargs)
     print(f"[FlowScope] Auto-instrumentation configured: {_config}")
 
@@ -286,6 +488,7 @@ def disable_auto_instrumentation():
     
     # Remove our import hook
     sys.meta_path = [hook for hook in sys.meta_path if not isinstance(hook, FlowScopeImportHook)]
+    _active_plugins.clear()
     
     print("[FlowScope] Auto-instrumentation disabled")
 
@@ -0,0 +1,182 @@
+"""
+FlowScope Batch Tracing
+
+Traces bulk calls (e.g. LangChain's Runnable.batch/abatch) as one parent span
+with a child span per item. Each item records its index, how long it queued
+behind the rest of the batch and which concurrency slot ran it, so traces show
+how well a batch's concurrency settings saturate the provider.
+"""
+
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from .core import FlowScopeClient, TraceData
+
+
+class BatchTrace:
+    """A batch-level span plus bookkeeping for its per-item child spans."""
+    
+    def __init__(
+        self,
+        client: FlowScopeClient,
+        trace: TraceData,
+        size: int,
+        max_concurrency: Optional[int] = None
+    ):
+        self.client = client
+        self.trace = trace
+        self.size = size
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._free_slots: List[int] = []  # min-heap of released slot numbers
+        self._next_slot = 0
+        self._in_flight = 0
+        self._peak_concurrency = 0
+        self._items_started = 0
+        self._items_failed = 0
+        self._total_queue_delay = 0.0
+        self._max_queue_delay = 0.0
+        
+    @property
+    def id(self) -> str:
+        """ID of the batch-level span."""
+        return self.trace.id
+        
+    def start_item(
+        self,
+        index: Optional[int] = None,
+        operation: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        detached: bool = False
+    ) -> Optional[TraceData]:
+        """
+        Start the child span for one batch item.
+        
+        Items take the lowest free concurrency slot, so slot numbers stay within
+        max_concurrency and show how many workers were actually kept busy.
+        Only per-item fields are stored on the child; batch-level metadata stays
+        on the parent span. Without an explicit index, items are numbered in
+        the order they start. Callback integrations start items detached (see
+        FlowScopeClient.start_trace).
+        """
+        now = time.time()
+        queue_delay = (now - self.trace.start_time) * 1000
+        
+        with self._lock:
+            if index is None:
+                index = self._items_started
+            if self._free_slots:
+                slot = heapq.heappop(self._free_slots)
+            else:
+                slot = self._next_slot
+                self._next_slot += 1
+            self._in_flight += 1
+            self._peak_concurrency = max(self._peak_concurrency, self._in_flight)
+            self._items_started += 1
+            self._total_queue_delay += queue_delay
+            self._max_queue_delay = max(self._max_queue_delay, queue_delay)
+            
+        item_metadata = {
+            "batch_index": index,
+            "queue_delay": queue_delay,
+            "concurrency_slot": slot,
+        }
+        framework = self.trace.metadata.get("framework")
+        if framework:
+            item_metadata["framework"] = framework
+        if metadata:
+            item_metadata.update(metadata)
+            
+        item = self.client.start_trace(
+            operation or f"{self.trace.operation}.item",
+            session_id=self.trace.session_id,
+            metadata=item_metadata,
+            parent_id=self.trace.id,
+            detached=detached,
+        )
+        if item is None:
+            self._release_slot(slot)
+        return item
+        
+    def _release_slot(self, slot: int):
+        with self._lock:
+            heapq.heappush(self._free_slots, slot)
+            self._in_flight -= 1
+            
+    def finish_item(self, item: Optional[TraceData], success: bool = True, error: Optional[str] = None):
+        """Finish a batch item's span and free its concurrency slot."""
+        if item is None:
+            return
+            
+        self._release_slot(item.metadata["concurrency_slot"])
+        if not success:
+            with self._lock:
+                self._items_failed += 1
+                
+        self.client.finish_trace(item, success=success, error=error)
+        
+    @contextmanager
+    def item(self, index: int, operation: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        """Context manager tracing one batch item."""
+        item = self.start_item(index, operation, metadata)
+        try:
+            yield item
+            self.finish_item(item, success=True)
+        except Exception as e:
+            self.finish_item(item, success=False, error=str(e))
+            raise
+            
+    def summarize(self):
+        """Record concurrency saturation stats on the batch-level span."""
+        with self._lock:
+            started = self._items_started
+            self.trace.metadata.update({
+                "items_started": started,
+                "items_failed": self._items_failed,
+                "peak_concurrency": self._peak_concurrency,
+                "slots_used": self._next_slot,
+                "mean_queue_delay": self._total_queue_delay / started if started else 0.0,
+                "max_queue_delay": self._max_queue_delay,
+            })
+
+
+@contextmanager
+def trace_batch(
+    client: FlowScopeClient,
+    operation: str,
+    size: int,
+    max_concurrency: Optional[int] = None,
+    session_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+):
+    """
+    Context manager tracing a bulk call as a parent span with per-item children.
+    
+    Usage:
+        with trace_batch(client, "embed_documents", size=len(docs), max_concurrency=8) as batch:
+            for i, doc in enumerate(docs):
+                with batch.item(i):
+                    embed(doc)
+    
+    Yields None when tracing is disabled.
+    """
+    batch_metadata = dict(metadata or {})
+    batch_metadata.update({"batch_size": size, "max_concurrency": max_concurrency})
+    
+    trace = client.start_trace(operation, session_id=session_id, metadata=batch_metadata)
+    if trace is None:
+        yield None
+        return
+        
+    batch = BatchTrace(client, trace, size, max_concurrency)
+    try:
+        yield batch
+        batch.summarize()
+        client.finish_trace(trace, success=True)
+    except Exception as e:
+        batch.summarize()
+        client.finish_trace(trace, success=False, error=str(e))
+        raise
@@ -0,0 +1,298 @@
+"""
+FlowScope Command Line Interface
+
+Usage:
+    flowscope analyze slowest  PATH... [--top 20]
+    flowscope analyze latency  PATH... [--by operation] [--top 20]
+    flowscope analyze errors   PATH... [--by framework,class]
+    flowscope analyze sessions PATH... [--sort wall_time] [--top 20]
+    flowscope analyze critical-path PATH... [--session ID]
+    flowscope analyze index    PATH...
+    flowscope flamegraph PATH... -o FILE [--format speedscope|folded] [--session ID]
+    flowscope replay import PATH... [--cache FILE] [--operation PATTERN]
+    flowscope serve [--port 3001] [--latency-ms MS] [--failure-rate R]
+    flowscope loadgen [--rate 1000] [--duration 10] [--depth 3] [--fanout 3] [--serve | --backend-url URL]
+
+PATH is a span file written by the file exporter or a directory of them.
+Reports accept --session, --operation, --since and --until filters, and
+--json to print machine-readable rows instead of a table.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def _timestamp(value: str) -> float:
+    """Parse epoch seconds or an ISO 8601 datetime (naive values are local time)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected epoch seconds or an ISO 8601 datetime, got {value!r}")
+
+
+def _columns(value: str) -> List[str]:
+    columns = [c.strip() for c in value.split(",") if c.strip()]
+    if not columns:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of columns")
+    return columns
+
+
+# Report fields holding epoch timestamps, printed as local datetimes
+_TIME_FIELDS = {"start_time", "first_start", "last_start"}
+
+
+def _format_cell(name: str, value: Any) -> str:
+    if value is None:
+        return "-"
+    if name in _TIME_FIELDS:
+        return datetime.fromtimestamp(value).isoformat(timespec="milliseconds")
+    if isinstance(value, float):
+        return f"{value:.4f}" if name == "error_rate" else f"{value:.2f}"
+    return str(value)
+
+
+def _print_rows(rows: List[Dict[str, Any]], as_json: bool):
+    if as_json:
+        for row in rows:
+            print(json.dumps(row, default=str))
+        return
+    if not rows:
+        print("No matching spans.")
+        return
+        
+    headers = list(rows[0])
+    cells = [[_format_cell(h, row[h]) for h in headers] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in cells)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(row, widths)))
+
+
+def _critical_path(args: argparse.Namespace) -> int:
+    from .tracetree import compute_self_times, critical_path, load_trees
+    
+    rows = []
+    for root in load_trees(args.paths, session=args.session):
+        compute_self_times(root)
+        seen = set()
+        for node, _, _ in critical_path(root):
+            if node.id in seen:
+                continue
+            seen.add(node.id)
+            rows.append({
+                "trace": root.id,
+                "operation": node.name,
+                "id": node.id,
+                "offset": (node.start - root.start) * 1000,
+                "critical_time": node.critical_time,
+                "self_time": node.self_time,
+                "duration": node.duration,
+            })
+    _print_rows(rows, args.json)
+    return 0
+
+
+def _flamegraph(args: argparse.Namespace) -> int:
+    from .tracetree import load_trees, write_flamegraph
+    
+    roots = load_trees(args.paths, session=args.session)
+    write_flamegraph(roots, args.output, format=args.format)
+    print(f"Wrote {args.format} flame graph of {len(roots)} trace(s) to {args.output}")
+    return 0
+
+
+def _replay(args: argparse.Namespace) -> int:
+    from .replay import ReplayCache
+    
+    # Spans do not record the object a call was made on, so match on arguments alone
+    cache = ReplayCache({"path": args.cache, "operations": args.operation or ["*"], "include_instance": False})
+    try:
+        stored = cache.import_spans(args.paths)
+    finally:
+        cache.close()
+    print(f"Recorded {stored} span output(s) into {args.cache}")
+    return 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    from .ingest_server import serve, server_config
+    
+    return serve(server_config(args))
+
+
+def _loadgen(args: argparse.Namespace) -> int:
+    from .loadgen import run_load, start_server_process
+    
+    load_config = {
+        "rate": args.rate, "duration": args.duration, "depth": args.depth, "fanout": args.fanout,
+        "payload_bytes": args.payload_bytes, "error_rate": args.error_rate, "seed": args.seed,
+    }
+    client_config = {
+        "backend_url": args.backend_url, "batch_size": args.batch_size, "exporter": args.exporter,
+        "http_exporter": {"wire_format": args.wire_format},
+    }
+    server = None
+    if args.serve:
+        server_args = ["--port", "0", "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                       "--failure-rate", str(args.failure_rate), "--failure-status", str(args.failure_status)]
+        if args.retry_after is not None:
+            server_args += ["--retry-after", str(args.retry_after)]
+        server, client_config["backend_url"] = start_server_process(server_args)
+    try:
+        report = run_load(load_config, client_config, drain_timeout=args.drain_timeout)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return 0
+    client_stats = report.pop("client_stats")
+    for name, value in report.items():
+        print(f"{name:<28} {value}")
+    print(f"{'spans_dropped':<28} {client_stats.get('spans_dropped', 0)}")
+    return 0
+
+
+def _analyze(args: argparse.Namespace) -> int:
+    if args.report == "critical-path":
+        return _critical_path(args)
+        
+    if args.report == "index":
+        from .exporters.file import build_index, span_files
+        for path in span_files(args.paths):
+            index = build_index(path)
+            print(f"{path}: {index.rows} spans")
+        return 0
+        
+    try:
+        from . import analysis
+    except ImportError:
+        print("❌ flowscope analyze requires numpy. Install with: pip install flowscope[analysis]", file=sys.stderr)
+        return 1
+        
+    table = analysis.load_spans(
+        args.paths, session=args.session, operation=args.operation, since=args.since, until=args.until
+    )
+    if args.report == "slowest":
+        rows = analysis.slowest_spans(table, args.top)
+    elif args.report == "latency":
+        rows = analysis.latency_percentiles(table, by=args.by)[:args.top]
+    elif args.report == "errors":
+        rows = analysis.error_rates(table, by=args.by)[:args.top]
+    else:
+        rows = analysis.session_rollups(table, sort=args.sort)[:args.top]
+        
+    _print_rows(rows, args.json)
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="flowscope", description="FlowScope command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    analyze = commands.add_parser("analyze", help="Analyze span files written by the file exporter")
+    reports = analyze.add_subparsers(dest="report", required=True)
+    
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("paths", nargs="+", metavar="PATH", help="Span files or directories of span files")
+    filters.add_argument("--session", help="Only spans of this session ID")
+    filters.add_argument("--operation", help="Only spans with this operation name")
+    filters.add_argument("--since", type=_timestamp, help="Only spans starting at or after this time")
+    filters.add_argument("--until", type=_timestamp, help="Only spans starting before this time")
+    filters.add_argument("--json", action="store_true", help="Print one JSON object per row")
+    filters.add_argument("--top", type=int, default=20, help="Maximum rows to print (default: 20)")
+    
+    reports.add_parser("slowest", parents=[filters], help="Slowest individual spans")
+    
+    latency = reports.add_parser("latency", parents=[filters], help="p50/p95/p99 duration per group")
+    latency.add_argument("--by", type=_columns, default=["operation"], help="Columns to group by (default: operation)")
+    
+    errors = reports.add_parser("errors", parents=[filters], help="Error rates per group")
+    errors.add_argument("--by", type=_columns, default=["framework", "class"], help="Columns to group by (default: framework,class)")
+    
+    sessions = reports.add_parser("sessions", parents=[filters], help="Per-session rollups")
+    sessions.add_argument("--sort", choices=["wall_time", "spans", "errors"], default="wall_time")
+    
+    critical = reports.add_parser("critical-path", help="Spans on the critical path of each trace")
+    critical.add_argument("paths", nargs="+", metavar="PATH")
+    critical.add_argument("--session", help="Only traces of this session ID")
+    critical.add_argument("--json", action="store_true", help="Print one JSON object per row")
+    
+    flamegraph = commands.add_parser("flamegraph", help="Export span files as a flame graph")
+    flamegraph.add_argument("paths", nargs="+", metavar="PATH", help="Span files or directories of span files")
+    flamegraph.add_argument("-o", "--output", required=True, help="File to write")
+    flamegraph.add_argument("--format", choices=["speedscope", "folded"], default="speedscope")
+    flamegraph.add_argument("--session", help="Only traces of this session ID")
+    
+    index = reports.add_parser("index", help="(Re)build the sidecar indexes of span files")
+    index.add_argument("paths", nargs="+", metavar="PATH")
+    
+    replay = commands.add_parser("replay", help="Manage record/replay caches")
+    replay_commands = replay.add_subparsers(dest="replay_command", required=True)
+    replay_import = replay_commands.add_parser("import", help="Record span outputs from span files into a replay cache")
+    replay_import.add_argument("paths", nargs="+", metavar="PATH", help="Span files or directories of span files")
+    replay_import.add_argument("--cache", default=".flowscope/replay.db", help="Cache file (default: .flowscope/replay.db)")
+    replay_import.add_argument("--operation", action="append", help="Only operations matching this pattern (repeatable)")
+    
+    from .ingest_server import add_server_arguments
+    
+    serve = commands.add_parser("serve", help="Run a stand-in ingest server with injectable latency and failures")
+    add_server_arguments(serve)
+    
+    loadgen = commands.add_parser("loadgen", help="Generate synthetic trace load and report throughput and export lag")
+    loadgen.add_argument("--rate", type=float, default=1000.0, help="Target spans per second (default: 1000)")
+    loadgen.add_argument("--duration", type=float, default=10.0, help="Seconds of generation (default: 10)")
+    loadgen.add_argument("--depth", type=int, default=3, help="Levels per trace tree (default: 3)")
+    loadgen.add_argument("--fanout", type=int, default=3, help="Children per non-leaf span (default: 3)")
+    loadgen.add_argument("--payload-bytes", type=int, default=512, help="Input/output size per span (default: 512)")
+    loadgen.add_argument("--error-rate", type=float, default=0.01, help="Share of failing leaf spans (default: 0.01)")
+    loadgen.add_argument("--seed", type=int, default=0)
+    loadgen.add_argument("--exporter", default="http", help="Client exporter (default: http)")
+    loadgen.add_argument("--batch-size", type=int, default=100, help="Client batch size (default: 100)")
+    loadgen.add_argument("--wire-format", choices=["json", "columnar"], default="json", help="HTTP exporter wire format")
+    loadgen.add_argument("--drain-timeout", type=float, default=60.0, help="Seconds allowed to drain on shutdown")
+    loadgen.add_argument("--json", action="store_true", help="Print the report as JSON")
+    target = loadgen.add_mutually_exclusive_group()
+    target.add_argument("--backend-url", default="http://localhost:3001", help="Backend or stand-in server to export to")
+    target.add_argument("--serve", action="store_true", help="Start a stand-in ingest server in a subprocess")
+    loadgen.add_argument("--latency-ms", type=float, default=0.0, help="With --serve: latency added to ingest requests")
+    loadgen.add_argument("--jitter-ms", type=float, default=0.0, help="With --serve: +/- variation of the latency")
+    loadgen.add_argument("--failure-rate", type=float, default=0.0, help="With --serve: share of failing requests")
+    loadgen.add_argument("--failure-status", type=int, default=503, help="With --serve: status of injected failures")
+    loadgen.add_argument("--retry-after", type=float, help="With --serve: Retry-After seconds of injected failures")
+    
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the flowscope console script."""
+    args = _build_parser().parse_args(argv)
+    try:
+        if args.command == "analyze":
+            return _analyze(args)
+        if args.command == "flamegraph":
+            return _flamegraph(args)
+        if args.command == "replay":
+            return _replay(args)
+        if args.command == "serve":
+            return _serve(args)
+        if args.command == "loadgen":
+            return _loadgen(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+FlowScope Trace Compaction
+
+Folds highly repetitive child spans into aggregate spans. An agent loop or an
+ingestion job can emit thousands of near-identical children under one parent
+(retriever or embedding calls, tool invocations); buffering and exporting
+each of them costs memory and bandwidth, and nobody reads them one by one.
+
+Once a parent has had more than threshold finished children with the same
+operation, further ones are folded into one aggregate per (parent,
+operation), exported when the parent finishes (or is reaped, or the client
+shuts down). Children that had children of their own are never folded, since
+those would be exported pointing at a parent that was not. Children finishing after their parent, such as fire-and-forget
+tasks, are counted until the client's next reap, which prunes parents no
+longer open. The aggregate keeps the parent link and the first folded
+child's metadata, spans the folded children's wall time, and records
+statistics as tags:
+
+    flowscope.compacted               True
+    flowscope.compacted.count         number of folded spans
+    flowscope.compacted.errors        how many of them failed
+    flowscope.compacted.total_ms      sum of their durations
+    flowscope.compacted.min_ms / max_ms / p50_ms / p95_ms / p99_ms
+    flowscope.compacted.exemplars     IDs of the exemplar spans kept
+
+A few folded spans are still exported in full as exemplars, tagged
+flowscope.exemplar: the first failing ones right away (so they still take
+the express lane), and the slowest ones along with the aggregate.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_COMPACTION_POLICY: Dict[str, Any] = {
+    "threshold": 50,            # Children per (parent, operation) exported verbatim before folding starts
+    "operations": ["*"],        # Operation name patterns (fnmatch) that may be folded
+    "exclude": [],              # Operation name patterns that are never folded
+    "slow_exemplars": 3,        # Slowest folded spans exported in full with each aggregate
+    "error_exemplars": 3,       # Failing folded spans exported in full, per aggregate
+    "max_samples": 1024,        # Durations kept per aggregate for percentiles (reservoir)
+    "max_count": 100_000,       # Folded spans after which an aggregate is exported and a new one started
+}
+
+
+class _Aggregate:
+    """Running statistics of the spans folded for one (parent, operation)."""
+    
+    __slots__ = (
+        "first", "count", "errors", "total", "minimum", "maximum", "start", "end",
+        "samples", "slowest", "error_exemplars",
+    )
+    
+    def __init__(self, first: Any):
+        # Template for the aggregate span; the first span itself is not kept alive
+        self.first = (first.operation, first.session_id, first.parent_id, first.trace_id, dict(first.metadata))
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        self.start = first.start_time
+        self.end = first.end_time
+        self.samples: List[float] = []
+        self.slowest: List[Tuple[float, int, Any]] = []  # Min-heap of the slowest spans
+        self.error_exemplars: List[str] = []
+        
+    def add(self, trace: Any, duration: float, max_samples: int, rng: random.Random):
+        self.count += 1
+        self.total += duration
+        if duration < self.minimum:
+            self.minimum = duration
+        if duration > self.maximum:
+            self.maximum = duration
+        if trace.start_time < self.start:
+            self.start = trace.start_time
+        if trace.end_time is not None and (self.end is None or trace.end_time > self.end):
+            self.end = trace.end_time
+        # Reservoir sampling keeps percentiles cheap for huge aggregates
+        if len(self.samples) < max_samples:
+            self.samples.append(duration)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < max_samples:
+                self.samples[slot] = duration
+                
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+        
+    def to_traces(self) -> List[Any]:
+        """The aggregate span, followed by the slowest exemplars."""
+        from .core import TraceData
+        
+        operation, session_id, parent_id, trace_id, metadata = self.first
+        exemplars = [trace for _, _, trace in sorted(self.slowest, reverse=True)]
+        for trace in exemplars:
+            trace.tags["flowscope.exemplar"] = "slowest"
+            
+        aggregate = TraceData(operation, session_id, parent_id, metadata)
+        aggregate.trace_id = trace_id
+        aggregate.start_time = self.start
+        aggregate.end_time = self.end if self.end is not None else self.start
+        aggregate.duration = (aggregate.end_time - aggregate.start_time) * 1000
+        aggregate.status = "error" if self.errors else "success"
+        if self.errors:
+            aggregate.error = f"{self.errors} of {self.count} compacted span(s) failed"
+        aggregate.tags = {
+            "flowscope.compacted": True,
+            "flowscope.compacted.count": self.count,
+            "flowscope.compacted.errors": self.errors,
+            "flowscope.compacted.total_ms": round(self.total, 3),
+            "flowscope.compacted.min_ms": round(self.minimum, 3),
+            "flowscope.compacted.max_ms": round(self.maximum, 3),
+            "flowscope.compacted.p50_ms": round(self.percentile(0.50), 3),
+            "flowscope.compacted.p95_ms": round(self.percentile(0.95), 3),
+            "flowscope.compacted.p99_ms": round(self.percentile(0.99), 3),
+            "flowscope.compacted.exemplars": self.error_exemplars + [trace.id for trace in exemplars],
+        }
+        return [aggregate] + exemplars
+
+
+class SpanCompactor:
+    """Decides, per finished span, whether it is exported or folded into an aggregate."""
+    
+    def __init__(self, policy: Optional[Dict[str, Any]] = None):
+        self.policy = dict(DEFAULT_COMPACTION_POLICY)
+        if policy:
+            self.policy.update(policy)
+        self.threshold = max(int(self.policy["threshold"]), 0)
+        self.operations = tuple(self.policy["operations"] or ())
+        self.exclude = tuple(self.policy["exclude"] or ())
+        self.slow_exemplars = max(int(self.policy["slow_exemplars"]), 0)
+        self.error_exemplars = max(int(self.policy["error_exemplars"]), 0)
+        self.max_samples = max(int(self.policy["max_samples"]), 1)
+        self.max_count = max(int(self.policy["max_count"]), 1)
+        self.compacted = 0  # Folded spans exported only as part of an aggregate
+        
+        self._eligible: Dict[str, bool] = {}  # Operation -> matches the patterns
+        self._children: Dict[str, Dict[str, int]] = {}  # Parent ID -> operation -> finished children
+        self._aggregates: Dict[str, Dict[str, _Aggregate]] = {}  # Parent ID -> operation -> aggregate
+        self._sequence = itertools.count()  # Tie-breaker for the exemplar heaps
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        
+    def _matches(self, operation: str) -> bool:
+        eligible = self._eligible.get(operation)
+        if eligible is None:
+            eligible = (
+                any(fnmatchcase(operation, pattern) for pattern in self.operations)
+                and not any(fnmatchcase(operation, pattern) for pattern in self.exclude)
+            )
+            if len(self._eligible) < 10_000:
+                self._eligible[operation] = eligible
+        return eligible
+        
+    def process(self, trace: Any) -> List[Any]:
+        """
+        The spans to export in place of a finished span.
+        
+        That is the span itself, unless it is folded into an aggregate
+        (nothing, or the span alone if it is kept as an error exemplar),
+        followed by the aggregates of its own children now that it finished.
+        """
+        released = [trace]
+        with self._lock:
+            parent_id = trace.parent_id
+            if parent_id is not None and self._matches(trace.operation):
+                counts = self._children.get(parent_id)
+                if counts is None:
+                    counts = self._children[parent_id] = {}
+                seen = counts.get(trace.operation, 0) + 1
+                counts[trace.operation] = seen
+                # A span with children of its own is kept, so they are not left without a parent
+                if seen > self.threshold and trace.id not in self._children:
+                    released = self._fold(trace, parent_id)
+            if self._children.pop(trace.id, None) is not None:
+                for aggregate in self._aggregates.pop(trace.id, {}).values():
+                    released += self._emit(aggregate)
+        return released
+        
+    def _fold(self, trace: Any, parent_id: str) -> List[Any]:
+        aggregates = self._aggregates.get(parent_id)
+        if aggregates is None:
+            aggregates = self._aggregates[parent_id] = {}
+        aggregate = aggregates.get(trace.operation)
+        if aggregate is None:
+            aggregate = aggregates[trace.operation] = _Aggregate(trace)
+        duration = trace.duration or 0.0
+        aggregate.add(trace, duration, self.max_samples, self._random)
+        
+        released = []
+        if trace.status != "success":
+            aggregate.errors += 1
+            if len(aggregate.error_exemplars) < self.error_exemplars:
+                # Exported right away, so failures still reach the express lane
+                trace.tags["flowscope.exemplar"] = "error"
+                aggregate.error_exemplars.append(trace.id)
+                released.append(trace)
+        if not released:
+            self.compacted += 1
+            if self.slow_exemplars:
+                entry = (duration, next(self._sequence), trace)
+                if len(aggregate.slowest) < self.slow_exemplars:
+                    heapq.heappush(aggregate.slowest, entry)
+                elif duration > aggregate.slowest[0][0]:
+                    heapq.heapreplace(aggregate.slowest, entry)
+                    
+        if aggregate.count >= self.max_count:
+            del aggregates[trace.operation]
+            released += self._emit(aggregate)
+        return released
+        
+    def prune(self, active: Dict[str, Any]) -> List[Any]:
+        """The pending aggregates of parents no longer in active, whose counters are dropped."""
+        released = []
+        with self._lock:
+            for parent_id in [parent_id for parent_id in self._children if parent_id not in active]:
+                del self._children[parent_id]
+                for aggregate in self._aggregates.pop(parent_id, {}).values():
+                    released += self._emit(aggregate)
+        return released
+        
+    def drain(self) -> List[Any]:
+        """Every pending aggregate, e.g. at shutdown while parents are still open."""
+        released = []
+        with self._lock:
+            for aggregates in self._aggregates.values():
+                for aggregate in aggregates.values():
+                    released += self._emit(aggregate)
+            self._aggregates.clear()
+            self._children.clear()
+        return released
+        
+    def _emit(self, aggregate: _Aggregate) -> List[Any]:
+        # The slowest exemplars are exported after all
+        self.compacted -= len(aggregate.slowest)
+        return aggregate.to_traces()
@@ -5,7 +5,6 @@ Provides context propagation and nested operation tracking
 for complex Python AI/ML workflows.
 """
 
-import asyncio
 import threading
 from contextlib import contextmanager, asynccontextmanager
 from typing import Any, Dict, Optional, Union
@@ -48,7 +47,7 @@ class FlowScopeContext:
         """Add metadata to the context."""
         self.metadata.update(kwargs)
         if self.trace:
-            self.trace.metadata.update(kwargs)
+            self.trace.add_metadata(kwargs)
 
 def get_current_trace() -> Optional[TraceData]:
     """Get the current active trace."""
@@ -5,27 +5,48 @@ Provides the main client for trace capture, session management,
 and communication with the FlowScope backend.
 """
 
-import asyncio
-import json
+import atexit
+import os
+import signal
+import sys
 import time
 import uuid
 import threading
+import weakref
+from collections import deque
 from contextlib import contextmanager, asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union, Callable
-from functools import wraps
+from functools import partial, wraps
 
-try:
-    import httpx
-    import websockets
-except ImportError:
-    httpx = None
-    websockets = None
+from .limits import SpanLimits, TraceBudget, record_drop
+from .payload import PayloadSummarizer
+from .priority import PriorityPolicy
+
+# Transports (httpx, websockets) are imported by the exporters that use them,
+# and asyncio is only consulted once the application has imported it, so that
+# importing the core stays cheap for short-lived processes.
+
+_CO_COROUTINE = 0x80
+
+
+def _is_coroutine_function(func: Callable) -> bool:
+    """asyncio.iscoroutinefunction() without importing asyncio at module load."""
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is not None:
+        return asyncio.iscoroutinefunction(func)
+    while isinstance(func, partial):
+        func = func.func
+    func = getattr(func, "__func__", func)
+    code = getattr(func, "__code__", None)
+    return code is not None and bool(code.co_flags & _CO_COROUTINE)
 
 
 class TraceData:
     """Represents a single trace/span in FlowScope."""
     
+    is_recording = True
+    
     def __init__(
         self,
         operation: str,
@@ -34,6 +55,7 @@ class TraceData:
         metadata: Optional[Dict[str, Any]] = None
     ):
         self.id = str(uuid.uuid4())
+        self.trace_id = uuid.uuid4().hex  # Shared by every span of one tree; start_trace inherits the parent's
         self.operation = operation
         self.session_id = session_id
         self.parent_id = parent_id
@@ -46,6 +68,14 @@ class TraceData:
         self.output_data: Optional[Any] = None
         self.error: Optional[str] = None
         self.tags: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.payload_summarizer: Optional[PayloadSummarizer] = None
+        self.limits: Optional[SpanLimits] = None
+        self.resources: Optional[Dict[str, Any]] = None  # CPU/allocation/GC usage, when attributed
+        self._resource_marks: Optional[tuple] = None
+        self._expedite = False  # Set on ancestors of expedited spans, so they follow them
+        self._registered = False  # Started by a client, which tracks it until finished or reaped
+        self._stacked = False  # On the stack of the thread that started it
         
     def finish(self, success: bool = True, error: Optional[str] = None):
         """Mark the trace as completed."""
@@ -54,19 +84,64 @@ class TraceData:
         self.status = "success" if success else "error"
         if error:
             self.error = error
+        if self.limits is not None:
+            self.limits.trim_metadata(self)
+            
+    def abandon(self, reason: str):
+        """Mark a trace that will never finish normally, keeping its partial duration."""
+        self.end_time = time.time()
+        self.duration = (self.end_time - self.start_time) * 1000
+        self.status = "abandoned"
+        self.error = reason
+        if self.limits is not None:
+            self.limits.trim_metadata(self)
             
     def set_input(self, data: Any):
         """Set input data for the trace."""
+        if self.payload_summarizer is not None:
+            data = self.payload_summarizer.summarize(data)
         self.input_data = data
         
     def set_output(self, data: Any):
         """Set output data for the trace."""
+        if self.payload_summarizer is not None:
+            data = self.payload_summarizer.summarize(data)
         self.output_data = data
         
     def set_tag(self, key: str, value: Any):
         """Set a tag on the trace."""
+        if self.limits is not None and key not in self.tags and len(self.tags) >= self.limits.max_tags:
+            record_drop(self, "tags")
+            return
         self.tags[key] = value
         
+    def add_metadata(self, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        """Add metadata entries to the trace, within the configured key limit."""
+        entries = dict(metadata or {}, **kwargs)
+        if self.limits is None:
+            self.metadata.update(entries)
+            return
+        room = self.limits.max_metadata_keys - len(self.metadata)
+        for key, value in entries.items():
+            if key in self.metadata:
+                self.metadata[key] = value
+            elif room > 0:
+                self.metadata[key] = value
+                room -= 1
+            else:
+                record_drop(self, "metadata")
+        
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Record a timestamped point-in-time event on the trace."""
+        if self.limits is not None and len(self.events) >= self.limits.max_events:
+            record_drop(self, "events")
+            return
+        self.events.append({
+            "name": name,
+            "timestamp": time.time(),
+            "attributes": attributes or {},
+        })
+        
     def to_dict(self) -> Dict[str, Any]:
         """Convert trace to dictionary format."""
         return {
@@ -79,15 +154,94 @@ class TraceData:
             "start_time": datetime.fromtimestamp(self.start_time).isoformat() + "Z",
             "end_time": datetime.fromtimestamp(self.end_time).isoformat() + "Z" if self.end_time else None,
             "duration": self.duration,
+            "resources": self.resources,
             "input": self.input_data,
             "output": self.output_data,
             "metadata": self.metadata,
             "status": self.status,
             "error": self.error,
             "tags": self.tags,
+            "events": self.events,
         }
 
 
+class NonRecordingSpan(TraceData):
+    """
+    Stand-in yielded by FlowScopeClient.trace() for a span the limits refused.
+    
+    It takes the same calls as a recorded span, so code using the span keeps
+    working, but it records nothing and is never exported.
+    """
+    
+    is_recording = False
+    
+    def set_input(self, data: Any):
+        pass
+        
+    def set_output(self, data: Any):
+        pass
+        
+    def set_tag(self, key: str, value: Any):
+        pass
+        
+    def add_metadata(self, metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        pass
+        
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+
+class _ActiveSpan:
+    """
+    Registry entry for an unfinished span.
+    
+    Holds the span only weakly, plus the few fields needed to report it as
+    abandoned if it is garbage-collected unfinished, so the registry never
+    keeps a span's payloads alive.
+    """
+    
+    __slots__ = ("ref", "trace_id", "operation", "session_id", "parent_id", "start_time", "metadata", "children", "budget")
+    
+    def __init__(self, trace: TraceData, collected: deque):
+        span_id = trace.id
+        self.ref = weakref.ref(trace, lambda _, span_id=span_id: collected.append(span_id))
+        self.trace_id = trace.trace_id
+        self.operation = trace.operation
+        self.session_id = trace.session_id
+        self.parent_id = trace.parent_id
+        self.start_time = trace.start_time
+        self.metadata = trace.metadata
+        self.children = 0  # Children started, for the max_children limit
+        self.budget: Optional[TraceBudget] = None  # Spans in the trace tree, when limits apply
+        
+    def to_trace(self, span_id: str) -> TraceData:
+        """Rebuild a payload-free stand-in for a span that was garbage-collected."""
+        trace = TraceData(self.operation, self.session_id, self.parent_id, self.metadata)
+        trace.id = span_id
+        trace.trace_id = self.trace_id
+        trace.start_time = self.start_time
+        return trace
+
+
+class SpanProcessor:
+    """
+    Hooks called synchronously as spans start and finish.
+    
+    on_start runs on the thread starting the span, after it became active;
+    on_end runs on the thread finishing it, after its end time and status
+    are set and before it is queued for export.
+    """
+    
+    def on_start(self, trace: TraceData):
+        pass
+        
+    def on_end(self, trace: TraceData):
+        pass
+        
+    def shutdown(self):
+        """Release resources (threads, files) held by the processor."""
+
+
 class FlowScopeClient:
     """Main FlowScope client for Python applications."""
     
@@ -98,31 +252,321 @@ class FlowScopeClient:
             "session_id": None,
             "auto_flush": True,
             "batch_size": 100,
+            "max_queue_size": 10_000,  # Spans kept for retry after failed exports; the oldest are dropped beyond it
             "flush_interval": 5.0,
             "include_inputs": True,
             "include_outputs": True,
             "include_stack_trace": False,
+            "payload_capture": {},  # Payload policy overrides; None captures payloads verbatim
+            "exporter": "http",  # Exporter name ("http", "file", "otlp") or a SpanExporter instance
+            "file_exporter": {},  # Settings for the file exporter (directory, format, rotation)
+            "http_exporter": {},  # Settings for the HTTP exporter (timeouts, retries, circuit breaker)
+            "otlp_exporter": {},  # Settings for the OTLP exporter (endpoint, compression, resource attributes)
+            "resource_attribution": None,  # Per-span CPU/allocation/GC policy, e.g. {}; None disables
+            "profiler": None,  # Sampling profiler settings for long spans, e.g. {}; None disables
+            "priority": {},  # Express export lane for error/flagged spans (see priority.py); None disables
+            "streaming": None,  # Live span streaming over websocket_url, e.g. {}; None disables
+            "flight_recorder": None,  # Ring buffer of recent spans for incident dumps (see recorder.py), e.g. {}; None disables
+            "replay": None,  # Record/replay cache for instrumented calls, e.g. {"mode": "record"}; None disables
+            "limits": {},  # Caps on tags, metadata, events, children and spans per trace (see limits.py); None disables
+            "compaction": None,  # Fold repetitive child spans into aggregates (see compaction.py), e.g. {}; None disables
+            "span_ttl": 3600.0,  # Seconds before an unfinished span is reaped as abandoned; None disables
+            "reap_interval": 30.0,  # Minimum seconds between checks for abandoned spans
+            "shutdown_timeout": 5.0,  # Seconds shutdown() may spend draining buffered spans
+            "shutdown_workers": 4,  # Batches exported in parallel while draining
+            "spool_directory": None,  # Where spans that could not be drained in time are spilled (NDJSON)
+            "shutdown_hooks": True,  # Drain on interpreter exit and SIGTERM
+            "verbose": True,  # Print a line per finished trace and flush
             "disabled": False,
         }
         if config:
             self.config.update(config)
             
-        self.traces: List[TraceData] = []
-        self.active_traces: Dict[str, TraceData] = {}
-        self.trace_stack: List[str] = []  # Stack of active trace IDs
+        self.traces: List[TraceData] = []  # Harvested spans awaiting export (and failed batches put back)
+        self._local = threading.local()  # Per-thread span stack and finished-span buffer
+        self._thread_state: List[tuple] = []  # (thread, stack, buffer) of every thread that used the client
+        self._buffered = 0  # Approximate count of spans in thread buffers, to trigger batch flushes
+        self.stats: Dict[str, int] = {
+            "spans_expired": 0, "spans_collected": 0, "spans_spilled": 0, "spans_dropped": 0,
+            "spans_expedited": 0, "spans_compacted": 0, "spans_limited": 0,
+        }
+        self._express: List[TraceData] = []  # Finished spans for the express lane
+        self._active: Dict[str, _ActiveSpan] = {}  # Unfinished spans, oldest first
+        self._collected: deque = deque()  # IDs of spans garbage-collected unfinished (appended by weakref callbacks)
+        self._next_reap = time.monotonic() + self.config["reap_interval"]
         self._lock = threading.Lock()
+        self._closed = False
+        self._final_harvest = False  # Set once shutdown has taken the last queued spans
+        self._flushes = 0  # Flushes with a batch out for export
+        self._flush_finished = threading.Condition(self._lock)
         self._flush_timer: Optional[threading.Timer] = None
+        self._express_timer: Optional[threading.Timer] = None
+        self._priority_policy: Optional[PriorityPolicy] = None
+        self._span_limits: Optional[SpanLimits] = None
+        self._replay_cache = None
+        self._compactor = None
+        self._compacted_before = 0  # Spans compacted by compactors replaced through configure()
+        self._payload_summarizer: Optional[PayloadSummarizer] = None
+        self._exporter = None
+        self._resource_tracker = None
+        self._span_processors: List[SpanProcessor] = []
+        self._profiler: Optional[SpanProcessor] = None
+        self._streamer: Optional[SpanProcessor] = None
+        self._recorder: Optional[SpanProcessor] = None
+        self._configure_profiler()
+        self._configure_streamer()
+        self._configure_recorder()
         
         # Session management
         self.current_session_id: Optional[str] = self.config.get("session_id")
         
+        if self.config["shutdown_hooks"]:
+            _register_for_shutdown(self)
+        
     def configure(self, config: Optional[Dict[str, Any]] = None, **kwargs):
         """Update client configuration."""
-        if config:
-            self.config.update(config)
-        self.config.update(kwargs)
+        changes = dict(config or {}, **kwargs)
+        self.config.update(changes)
+        self._payload_summarizer = None
+        self._priority_policy = None
+        self._span_limits = None
+        if self._exporter is not None and changes.keys() & {"exporter", "file_exporter", "http_exporter", "otlp_exporter", "backend_url"}:
+            self._exporter.shutdown()
+            self._exporter = None
+        if self._resource_tracker is not None and "resource_attribution" in changes:
+            self._resource_tracker.close()
+            self._resource_tracker = None
+        if self._replay_cache is not None and "replay" in changes:
+            self._replay_cache.close()
+            self._replay_cache = None
+        if self._compactor is not None and "compaction" in changes:
+            compactor, self._compactor = self._compactor, None
+            self._enqueue(compactor.drain())
+            self._compacted_before += compactor.compacted
+        if "profiler" in changes:
+            self._configure_profiler()
+        if changes.keys() & {"streaming", "websocket_url"}:
+            self._configure_streamer()
+        if "flight_recorder" in changes:
+            self._configure_recorder()
         return self
         
+    @property
+    def active_traces(self) -> Dict[str, TraceData]:
+        """Unfinished spans that are still referenced, by ID."""
+        with self._lock:
+            entries = list(self._active.items())
+        active = {}
+        for span_id, entry in entries:
+            trace = entry.ref()
+            if trace is not None:
+                active[span_id] = trace
+        return active
+        
+    def reap_abandoned(self, ttl: Optional[float] = None, reason: Optional[str] = None) -> int:
+        """
+        Export unfinished spans that will never finish as status "abandoned".
+        
+        Spans from cancelled tasks, abandoned generators or crashed callbacks
+        are never finished. Those garbage-collected while unfinished are reaped
+        on the next call; those still referenced are reaped once older than
+        ttl seconds (the "span_ttl" config entry by default). Runs
+        automatically from start_trace every "reap_interval" seconds. Returns
+        the number of spans reaped; counts accumulate in stats. Compaction
+        counters of parents no longer open are pruned on the way.
+        """
+        if ttl is None:
+            ttl = self.config["span_ttl"]
+        self._next_reap = time.monotonic() + self.config["reap_interval"]
+        
+        abandoned: List[TraceData] = []
+        with self._lock:
+            while self._collected:
+                span_id = self._collected.popleft()
+                entry = self._active.pop(span_id, None)
+                if entry is not None:
+                    trace = entry.to_trace(span_id)
+                    trace.abandon("span was garbage-collected before it finished")
+                    abandoned.append(trace)
+                    self.stats["spans_collected"] += 1
+                    
+            if ttl is not None:
+                # Entries are in start order, so stop at the first span younger than the TTL
+                cutoff = time.time() - ttl
+                expired = []
+                # A snapshot: finish_trace removes entries without taking the lock
+                for span_id, entry in list(self._active.items()):
+                    if entry.start_time > cutoff:
+                        break
+                    expired.append(span_id)
+                for span_id in expired:
+                    entry = self._active.pop(span_id, None)
+                    if entry is None:
+                        continue  # Finished meanwhile
+                    trace = entry.ref()
+                    if trace is None:
+                        # Collected meanwhile; its weakref callback finds no entry now
+                        trace = entry.to_trace(span_id)
+                        trace.abandon("span was garbage-collected before it finished")
+                        abandoned.append(trace)
+                        self.stats["spans_collected"] += 1
+                        continue
+                    trace.abandon(reason or f"span exceeded the {ttl:g}s TTL without finishing")
+                    abandoned.append(trace)
+                    self.stats["spans_expired"] += 1
+                    
+            if abandoned:
+                reaped_ids = {trace.id for trace in abandoned}
+                for _, stack, _ in self._thread_state:
+                    for span_id in [span_id for span_id in stack if span_id in reaped_ids]:
+                        try:
+                            stack.remove(span_id)
+                        except ValueError:
+                            pass  # Finished by its thread meanwhile
+                
+        compactor = self._compactor
+        if compactor is not None:
+            # Counters left by children that finished after their parent
+            pruned = compactor.prune(self._active)
+            self.stats["spans_compacted"] = self._compacted_before + compactor.compacted
+            if pruned:
+                self._enqueue(pruned)
+                
+        if not abandoned:
+            return 0
+            
+        for trace in abandoned:
+            for processor in self._span_processors:
+                processor.on_end(trace)
+                
+        if self.config["verbose"]:
+            print(f"🧹 FlowScope reaped {len(abandoned)} abandoned span(s)")
+        self._enqueue(self._compact(abandoned))
+        return len(abandoned)
+        
+    def add_span_processor(self, processor: SpanProcessor):
+        """Register a processor notified of every span start and finish."""
+        with self._lock:
+            self._span_processors = self._span_processors + [processor]
+            
+    def remove_span_processor(self, processor: SpanProcessor):
+        """Unregister a span processor and shut it down."""
+        with self._lock:
+            self._span_processors = [p for p in self._span_processors if p is not processor]
+        processor.shutdown()
+        
+    def _configure_profiler(self):
+        """(Re)create the sampling profiler from the "profiler" config entry."""
+        if self._profiler is not None:
+            self.remove_span_processor(self._profiler)
+            self._profiler = None
+        if self.config.get("profiler") is not None:
+            from .profiler import SamplingProfiler
+            self._profiler = SamplingProfiler(self.config["profiler"])
+            self.add_span_processor(self._profiler)
+        
+    def _configure_streamer(self):
+        """(Re)create the live streamer from the "streaming" and "websocket_url" config entries."""
+        if self._streamer is not None:
+            self.remove_span_processor(self._streamer)
+            self._streamer = None
+        if self.config.get("streaming") is not None:
+            from .streaming import LiveStreamer
+            self._streamer = LiveStreamer({"url": self.config["websocket_url"], **self.config["streaming"]})
+            self.add_span_processor(self._streamer)
+            
+    def _configure_recorder(self):
+        """(Re)create the flight recorder from the "flight_recorder" config entry."""
+        if self._recorder is not None:
+            self.remove_span_processor(self._recorder)
+            self._recorder = None
+        if self.config.get("flight_recorder") is not None:
+            from .recorder import FlightRecorder
+            self._recorder = FlightRecorder(self.config["flight_recorder"])
+            self.add_span_processor(self._recorder)
+            
+    def get_flight_recorder(self):
+        """The flight recorder holding recent spans, or None if disabled."""
+        return self._recorder
+        
+    def _get_exporter(self):
+        """Get the exporter selected by the "exporter" config entry."""
+        if self._exporter is None:
+            exporter = self.config["exporter"]
+            if isinstance(exporter, str):
+                from .exporters import create_exporter
+                exporter = create_exporter(exporter, self.config)
+            self._exporter = exporter
+        return self._exporter
+        
+    def _get_payload_summarizer(self) -> Optional[PayloadSummarizer]:
+        """Get the summarizer for the configured payload capture policy."""
+        policy = self.config.get("payload_capture")
+        if policy is None:
+            return None
+        if self._payload_summarizer is None:
+            self._payload_summarizer = PayloadSummarizer(policy)
+        return self._payload_summarizer
+        
+    def _get_span_limits(self) -> Optional[SpanLimits]:
+        """Get the configured span and trace limits."""
+        policy = self.config.get("limits")
+        if policy is None:
+            return None
+        if self._span_limits is None:
+            self._span_limits = SpanLimits(policy)
+        return self._span_limits
+        
+    def _get_priority_policy(self) -> Optional[PriorityPolicy]:
+        """Get the matcher for the configured express-lane policy."""
+        policy = self.config.get("priority")
+        if policy is None:
+            return None
+        if self._priority_policy is None:
+            self._priority_policy = PriorityPolicy(policy)
+        return self._priority_policy
+        
+    def get_replay_cache(self):
+        """Get the record/replay cache selected by the "replay" config entry, or None."""
+        policy = self.config.get("replay")
+        if policy is None:
+            return None
+        if self._replay_cache is None:
+            from .replay import ReplayCache
+            self._replay_cache = ReplayCache(policy)
+        return self._replay_cache
+        
+    def _get_compactor(self):
+        """Get the compactor for the configured compaction policy."""
+        policy = self.config.get("compaction")
+        if policy is None:
+            return None
+        if self._compactor is None:
+            from .compaction import SpanCompactor
+            self._compactor = SpanCompactor(policy)
+        return self._compactor
+        
+    def _compact(self, traces: List[TraceData]) -> List[TraceData]:
+        """Replace finished spans by what the compactor exports in their place."""
+        compactor = self._get_compactor()
+        if compactor is None:
+            return traces
+        released = []
+        for trace in traces:
+            released += compactor.process(trace)
+        self.stats["spans_compacted"] = self._compacted_before + compactor.compacted
+        return released
+        
+    def _get_resource_tracker(self):
+        """Get the tracker for the configured resource attribution policy."""
+        policy = self.config.get("resource_attribution")
+        if policy is None:
+            return None
+        if self._resource_tracker is None:
+            from .resources import ResourceTracker
+            self._resource_tracker = ResourceTracker(policy)
+        return self._resource_tracker
+        
     def create_session(self, session_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> str:
         """Create a new debugging session."""
         if session_id is None:
@@ -138,22 +582,55 @@ class FlowScopeClient:
         """Set the active session."""
         self.current_session_id = session_id
         
+    def _thread_locals(self) -> tuple:
+        """The calling thread's span stack and finished-span buffer, registered on first use."""
+        try:
+            return self._local.stack, self._local.buffer
+        except AttributeError:
+            stack: List[str] = []
+            buffer: List[TraceData] = []
+            self._local.stack, self._local.buffer = stack, buffer
+            with self._lock:
+                self._thread_state.append((threading.current_thread(), stack, buffer))
+            return stack, buffer
+            
+    @property
+    def trace_stack(self) -> List[str]:
+        """IDs of the calling thread's active traces, innermost last."""
+        return self._thread_locals()[0]
+        
     def get_current_parent_id(self) -> Optional[str]:
         """Get the ID of the current parent trace."""
-        return self.trace_stack[-1] if self.trace_stack else None
+        stack = self._thread_locals()[0]
+        return stack[-1] if stack else None
         
     def start_trace(
         self,
         operation: str,
         session_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        parent_id: Optional[str] = None,
+        detached: bool = False
     ) -> TraceData:
-        """Start a new trace."""
-        if self.config["disabled"]:
+        """
+        Start a new trace.
+        
+        The parent defaults to the innermost active trace; integrations that
+        receive explicit parent links (e.g. framework callbacks) pass parent_id.
+        A detached trace takes parent_id as given, so None makes it a root, and
+        is not pushed on the calling thread's stack. Callback integrations use
+        it: their runs interleave on one thread under asyncio, so the stack top
+        says nothing about which run a span belongs to.
+        """
+        if self.config["disabled"] or self._closed:
             return None
+        if self._collected or time.monotonic() >= self._next_reap:
+            self.reap_abandoned()
             
         session_id = session_id or self.current_session_id
-        parent_id = self.get_current_parent_id()
+        stack = self._thread_locals()[0]
+        if parent_id is None and stack and not detached:
+            parent_id = stack[-1]
         
         trace = TraceData(
             operation=operation,
@@ -161,40 +638,199 @@ class FlowScopeClient:
             parent_id=parent_id,
             metadata=metadata
         )
+        trace.payload_summarizer = self._get_payload_summarizer()
+        limits = trace.limits = self._get_span_limits()
         
         with self._lock:
-            self.active_traces[trace.id] = trace
-            self.trace_stack.append(trace.id)
+            parent = self._active.get(parent_id) if parent_id is not None else None
+            if parent is not None:
+                if limits is not None and not self._admit_child(parent, limits):
+                    self.stats["spans_limited"] += 1
+                    return None
+                trace.trace_id = parent.trace_id
+            entry = _ActiveSpan(trace, self._collected)
+            if limits is not None:
+                entry.budget = parent.budget if parent is not None and parent.budget is not None else TraceBudget(trace)
+            self._active[trace.id] = entry
+            trace._registered = True
+        if not detached:
+            stack.append(trace.id)
+            trace._stacked = True
+            
+        resource_tracker = self._get_resource_tracker()
+        if resource_tracker is not None:
+            resource_tracker.start(trace)
+        for processor in self._span_processors:
+            processor.on_start(trace)
             
         return trace
         
+    def _admit_child(self, parent: _ActiveSpan, limits: SpanLimits) -> bool:
+        """Whether a new child of parent fits the children and trace limits (caller holds the lock)."""
+        if parent.children >= limits.max_children:
+            parent_trace = parent.ref()
+            if parent_trace is not None:
+                record_drop(parent_trace, "children")
+            return False
+        budget = parent.budget
+        if budget is not None:
+            if budget.spans >= limits.max_spans_per_trace:
+                root = budget.root()
+                if root is not None:
+                    record_drop(root, "spans")
+                return False
+            budget.spans += 1
+        parent.children += 1
+        return True
+        
+    def detach_trace(self, trace: TraceData):
+        """
+        Take an open span off the calling thread's stack without finishing it.
+        
+        For work that outlives the call that started it, such as a streamed
+        response consumed after the call returned: spans started meanwhile
+        are no longer parented to it, and it is finished later, from any
+        thread, with finish_trace().
+        """
+        if trace is None:
+            return
+        stack = self._thread_locals()[0]
+        if trace.id in stack:
+            stack.remove(trace.id)
+            trace._stacked = False
+        
     def finish_trace(self, trace: TraceData, success: bool = True, error: Optional[str] = None):
         """Finish a trace and add it to the batch."""
-        if trace is None or self.config["disabled"]:
+        if trace is None or self.config["disabled"] or self._closed:
             return
+        # No shared lock on this path: removing the registry entry is one
+        # atomic dict operation, and whoever removes it (this or the reaper)
+        # owns the span, so it is exported once
+        if self._active.pop(trace.id, None) is None and trace._registered:
+            return  # Already reaped as abandoned, or finished before
             
         trace.finish(success, error)
+        if trace._resource_marks is not None and self._resource_tracker is not None:
+            self._resource_tracker.finish(trace)
+        for processor in self._span_processors:
+            processor.on_end(trace)
+            
+        # The span goes into this thread's own stack and buffer
+        if trace._stacked:
+            stack = self._thread_locals()[0]
+            if stack and stack[-1] == trace.id:
+                stack.pop()
+            elif trace.id in stack:
+                stack.remove(trace.id)
+            else:
+                self._unstack(trace.id)  # Started on another thread
+            
+        if self.config["verbose"]:
+            print(f"{'✅' if success else '❌'} FlowScope trace: {trace.operation} "
+                  f"({'success' if success else 'error'}, {trace.duration:.2f}ms)")
+                  
+        self._enqueue(self._compact([trace]))
         
+    def _enqueue(self, traces: List[TraceData]):
+        """Queue finished spans for export, in the express lane if the priority policy says so."""
+        policy = self._get_priority_policy()
+        buffer = self._thread_locals()[1]
+        express = []
+        for trace in traces:
+            if policy is not None and (trace._expedite or policy.matches(trace)):
+                express.append(trace)
+            else:
+                buffer.append(trace)
+        # Unsynchronized, so concurrent updates may be lost; it only paces flushes
+        self._buffered += len(traces) - len(express)
+        
+        if express:
+            expedited = len(express)
+            with self._lock:
+                for trace in express:
+                    self._express.append(trace)
+                    if policy.include_ancestors:
+                        expedited += self._expedite_ancestors(trace.parent_id)
+                self.stats["spans_expedited"] += expedited
+                
+        if self.config["auto_flush"]:
+            if express:
+                self._flush_express_async()
+            # Auto-flush if batch is full
+            if self._buffered + len(self.traces) >= self.config["batch_size"]:
+                self._flush_async()
+                
+    def _unstack(self, span_id: str):
+        """Remove a span from the stack of whichever thread started it."""
         with self._lock:
-            # Remove from active traces
-            self.active_traces.pop(trace.id, None)
-            if trace.id in self.trace_stack:
-                self.trace_stack.remove(trace.id)
+            for _, stack, _ in self._thread_state:
+                if span_id in stack:
+                    try:
+                        stack.remove(span_id)
+                    except ValueError:
+                        pass
+                    return
+                    
+    def _harvest(self) -> List[TraceData]:
+        """Take every finished span out of the thread buffers (caller holds the lock)."""
+        harvested = self.traces
+        self.traces = []
+        self._buffered = 0
+        live_state = []
+        for state in self._thread_state:
+            thread, _, buffer = state
+            # Owners only ever append, so the first count items are safe to take
+            count = len(buffer)
+            if count:
+                harvested += buffer[:count]
+                del buffer[:count]
+            if thread.is_alive() or buffer:
+                live_state.append(state)
+        self._thread_state = live_state
+        return harvested
+        
+    def _take_buffered(self, span_id: str) -> Optional[TraceData]:
+        """Remove a finished span from wherever it is buffered (caller holds the lock)."""
+        for buffer in [self.traces] + [state[2] for state in self._thread_state]:
+            for i, trace in enumerate(buffer):
+                if trace.id == span_id:
+                    del buffer[i]
+                    return trace
+        return None
                 
-            # Add to completed traces
-            self.traces.append(trace)
-            
-        print(f"{'✅' if success else '❌'} FlowScope trace: {trace.operation} "
-              f"({'success' if success else 'error'}, {trace.duration:.2f}ms)")
-              
-        # Auto-flush if batch is full
-        if self.config["auto_flush"] and len(self.traces) >= self.config["batch_size"]:
-            self._flush_async()
-            
+    def _expedite_ancestors(self, parent_id: Optional[str]) -> int:
+        """
+        Send an expedited span's ancestors after it (caller holds the lock).
+        
+        Open ancestors are marked to take the express lane when they finish;
+        finished ones still buffered are moved over. The walk stops at an
+        ancestor already expedited, since its own ancestors were handled then.
+        Returns the number of spans moved.
+        """
+        moved = 0
+        while parent_id is not None:
+            entry = self._active.get(parent_id)
+            if entry is not None:
+                parent = entry.ref()
+                if parent is None or parent._expedite:
+                    break
+                parent._expedite = True
+                parent_id = parent.parent_id
+                continue
+            parent = self._take_buffered(parent_id)
+            if parent is None:
+                break  # Already exported or expedited
+            self._express.append(parent)
+            moved += 1
+            parent_id = parent.parent_id
+        return moved
+        
     def _flush_async(self):
         """Flush traces asynchronously."""
-        if self._flush_timer:
-            self._flush_timer.cancel()
+        # A pending flush will pick up these traces too; rescheduling it on
+        # every finished span would postpone it indefinitely under load
+        if self._closed or (self._flush_timer is not None and not self._flush_timer.finished.is_set()):
+            return
             
         def flush_worker():
             try:
@@ -205,38 +841,241 @@ class FlowScopeClient:
         self._flush_timer = threading.Timer(0.1, flush_worker)
         self._flush_timer.start()
         
+    def _flush_express_async(self):
+        """Export the express lane after a short linger that lets related spans join the batch."""
+        if self._closed or (self._express_timer is not None and not self._express_timer.finished.is_set()):
+            return
+            
+        def express_worker():
+            try:
+                self.flush_express()
+            except Exception as e:
+                print(f"❌ FlowScope express flush error: {e}")
+                
+        policy = self._get_priority_policy()
+        self._express_timer = threading.Timer(policy.linger if policy is not None else 0.0, express_worker)
+        self._express_timer.start()
+        
+    def flush_express(self) -> bool:
+        """Export expedited spans now, in small batches."""
+        with self._lock:
+            traces_to_send = self._express
+            self._express = []
+            if not traces_to_send:
+                return True
+            self._flushes += 1
+            
+        try:
+            policy = self._get_priority_policy()
+            batch_size = policy.batch_size if policy is not None else len(traces_to_send)
+            if self.config["verbose"]:
+                print(f"⚡ Expediting {len(traces_to_send)} Python traces...")
+            for start in range(0, len(traces_to_send), batch_size):
+                try:
+                    ok = self._get_exporter().export(traces_to_send[start:start + batch_size])
+                except Exception as e:
+                    print(f"❌ Failed to expedite traces: {e}")
+                    ok = False
+                if not ok:
+                    # Keep them at the front of the lane for the next flush
+                    self._requeue(traces_to_send[start:], "express")
+                    return False
+            return True
+        finally:
+            self._end_flush()
+        
     def flush(self) -> bool:
         """Flush all pending traces to the backend."""
         if self.config["disabled"]:
             return True
+        if not self.flush_express():
+            return False
             
         with self._lock:
-            traces_to_send = self.traces.copy()
-            self.traces.clear()
-            
-        if not traces_to_send:
-            return True
+            traces_to_send = self._harvest()
+            if not traces_to_send:
+                return True
+            self._flushes += 1
             
+        verbose = self.config["verbose"]
         try:
-            # Convert traces to backend format
-            trace_data = [trace.to_dict() for trace in traces_to_send]
-            
-            print(f"🚀 Flushing {len(trace_data)} Python traces...")
-            
-            # In a real implementation, this would send to the backend
-            # For now, just simulate the flush
-            time.sleep(0.1)  # Simulate network delay
-            
-            print(f"✅ Python traces flushed successfully")
+            if verbose:
+                print(f"🚀 Flushing {len(traces_to_send)} Python traces...")
+                
+            if not self._get_exporter().export(traces_to_send):
+                raise RuntimeError("exporter could not deliver the batch")
+                
+            if verbose:
+                print(f"✅ Python traces flushed successfully")
             return True
             
         except Exception as e:
             print(f"❌ Failed to flush traces: {e}")
-            # Put traces back in the queue on failure
-            with self._lock:
-                self.traces.extend(traces_to_send)
+            # Put traces back in the queue on failure, ahead of newer ones
+            self._requeue(traces_to_send, "export")
             return False
             
+        finally:
+            self._end_flush()
+            
+    def _end_flush(self):
+        with self._lock:
+            self._flushes -= 1
+            self._flush_finished.notify_all()
+            
+    def _requeue(self, traces: List[TraceData], name: str):
+        """Put a failed batch back at the front of the export or express queue."""
+        with self._lock:
+            if not self._final_harvest:
+                queue = self._express if name == "express" else self.traces
+                queue[:0] = traces
+                self._cap_queue(queue, name)
+                return
+        # Shutdown has already drained the queues, so nothing would export these
+        self._discard(traces)
+        
+    def _cap_queue(self, queue: List[TraceData], name: str):
+        """Drop the oldest spans of a retry queue beyond max_queue_size (caller holds the lock)."""
+        excess = len(queue) - max(self.config["max_queue_size"], 0)
+        if excess > 0:
+            del queue[:excess]
+            self.stats["spans_dropped"] += excess
+            print(f"❌ FlowScope dropped {excess} span(s) from the full {name} queue")
+            
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting spans and drain buffered ones within timeout seconds.
+        
+        Unfinished spans are exported as abandoned. A flush already exporting
+        is waited for, since a failed batch is put back and drained with the
+        rest. Buffered spans are exported in parallel batches by daemon
+        threads, so a slow or unreachable backend cannot hold up process exit
+        beyond the deadline. Batches not exported by then, including those a
+        still-running flush fails to deliver later, are spilled to
+        "spool_directory" as NDJSON when configured (a batch still in flight
+        at the deadline may then be delivered twice), and dropped otherwise.
+        Returns True if every span was exported.
+        """
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+        if timeout is None:
+            timeout = self.config["shutdown_timeout"]
+        deadline = time.monotonic() + timeout
+        
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        if self._express_timer is not None:
+            self._express_timer.cancel()
+        if not self.config["disabled"]:
+            self.reap_abandoned(ttl=0, reason="client shut down before the span finished")
+        if self._compactor is not None:
+            self._enqueue(self._compactor.drain())
+            self.stats["spans_compacted"] = self._compacted_before + self._compactor.compacted
+        if self._exporter is not None:
+            # Exports already in flight should give up by the deadline too
+            begin_shutdown = getattr(self._exporter, "begin_shutdown", None)
+            if begin_shutdown is not None:
+                begin_shutdown(deadline)
+        with self._lock:
+            # A flush in flight puts its batch back if the export fails; wait, so it is drained too
+            self._flush_finished.wait_for(lambda: self._flushes == 0, max(deadline - time.monotonic(), 0))
+            in_flight = self._flushes
+            # Expedited spans go first, so they are the likeliest to make the deadline
+            pending = self._express + self._harvest()
+            self._express = []
+            self._final_harvest = True
+            processors = self._span_processors
+            self._span_processors = []
+        for processor in processors:
+            processor.shutdown()
+        if self._resource_tracker is not None:
+            self._resource_tracker.close()
+        if self._replay_cache is not None:
+            self._replay_cache.close()
+            self._replay_cache = None
+            
+        remaining = self._drain(pending, deadline) if pending else []
+        
+        if remaining:
+            self._discard(remaining)
+            
+        if self._exporter is not None:
+            try:
+                self._exporter.shutdown()
+            except Exception as e:
+                print(f"❌ FlowScope exporter shutdown error: {e}")
+        _unregister_for_shutdown(self)
+        return not remaining and not in_flight
+        
+    close = shutdown
+    
+    def _drain(self, traces: List[TraceData], deadline: float) -> List[TraceData]:
+        """Export traces in parallel batches until the deadline; return those not exported."""
+        batch_size = max(self.config["batch_size"], 1)
+        batches = [traces[i:i + batch_size] for i in range(0, len(traces), batch_size)]
+        results: List[Optional[bool]] = [None] * len(batches)
+        next_batch = iter(range(len(batches)))
+        claim_lock = threading.Lock()
+        exporter = self._get_exporter()
+        begin_shutdown = getattr(exporter, "begin_shutdown", None)
+        if begin_shutdown is not None:
+            begin_shutdown(deadline)
+        
+        def worker():
+            while time.monotonic() < deadline:
+                with claim_lock:
+                    index = next(next_batch, None)
+                if index is None:
+                    return
+                try:
+                    results[index] = bool(exporter.export(batches[index]))
+                except Exception as e:
+                    print(f"❌ FlowScope shutdown export failed: {e}")
+                    results[index] = False
+                    
+        # Daemon threads: an export still blocked at the deadline must not delay exit
+        workers = [
+            threading.Thread(target=worker, name=f"flowscope-drain-{i}", daemon=True)
+            for i in range(min(max(self.config["shutdown_workers"], 1), len(batches)))
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join(max(deadline - time.monotonic(), 0))
+            
+        return [trace for batch, ok in zip(batches, results) if not ok for trace in batch]
+        
+    def _discard(self, traces: List[TraceData]):
+        """Spill spans that can no longer be exported to "spool_directory", or count them dropped."""
+        spool = self.config.get("spool_directory")
+        if spool and self._spill(traces, spool):
+            self.stats["spans_spilled"] += len(traces)
+        else:
+            self.stats["spans_dropped"] += len(traces)
+            print(f"❌ FlowScope dropped {len(traces)} span(s) at shutdown")
+            
+    def _spill(self, traces: List[TraceData], directory: str) -> bool:
+        """Write traces to an NDJSON spool file; False if that failed."""
+        from .exporters.file import FileExporter
+        try:
+            spool = FileExporter({"file_exporter": {"directory": directory, "format": "ndjson"}})
+            ok = spool.export(traces)
+            spool.shutdown()
+        except OSError as e:
+            print(f"❌ FlowScope could not spill spans to {directory}: {e}")
+            return False
+        if ok and self.config["verbose"]:
+            print(f"💾 FlowScope spilled {len(traces)} span(s) to {directory}")
+        return ok
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        
     @contextmanager
     def trace(
         self,
@@ -255,7 +1094,11 @@ class FlowScopeClient:
         trace = self.start_trace(operation, session_id, metadata)
         
         if trace is None:
-            yield None
+            if self.config["disabled"] or self._closed:
+                yield None
+            else:
+                # Refused by the span limits; code using the span must not break
+                yield NonRecordingSpan(operation, session_id, self.get_current_parent_id(), metadata)
             return
             
         try:
@@ -265,6 +1108,18 @@ class FlowScopeClient:
             self.finish_trace(trace, success=False, error=str(e))
             raise
             
+    def trace_batch(
+        self,
+        operation: str,
+        size: int,
+        max_concurrency: Optional[int] = None,
+        session_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Context manager for a bulk call traced as a parent span with per-item children."""
+        from .batch import trace_batch
+        return trace_batch(self, operation, size, max_concurrency, session_id, metadata)
+        
     def trace_decorator(
         self,
         operation: Optional[str] = None,
@@ -308,7 +1163,7 @@ class FlowScopeClient:
                     return result
                     
             # Return appropriate wrapper based on function type
-            if asyncio.iscoroutinefunction(func):
+            if _is_coroutine_function(func):
                 return async_wrapper
             else:
                 return sync_wrapper
@@ -316,6 +1171,60 @@ class FlowScopeClient:
         return decorator
 
 
+# Clients drained at interpreter exit and on SIGTERM
+_shutdown_clients: "weakref.WeakSet[FlowScopeClient]" = weakref.WeakSet()
+_shutdown_hooks_installed = False
+_previous_sigterm_handler: Any = None
+
+
+def _shutdown_all():
+    for client in list(_shutdown_clients):
+        try:
+            client.shutdown()
+        except Exception as e:
+            print(f"❌ FlowScope shutdown error: {e}")
+
+
+def _handle_sigterm(signum, frame):
+    # The handler runs on the main thread between bytecodes, possibly while it
+    # holds a client's lock, so drain from another thread with a bounded wait
+    clients = list(_shutdown_clients)
+    drainer = threading.Thread(target=_shutdown_all, name="flowscope-sigterm", daemon=True)
+    drainer.start()
+    drainer.join(max((client.config["shutdown_timeout"] for client in clients), default=0) + 1.0)
+    previous = _previous_sigterm_handler
+    if callable(previous):
+        previous(signum, frame)
+    else:
+        # Let the default action terminate the process
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+def _register_for_shutdown(client: FlowScopeClient):
+    """Track a client for draining at exit, installing the process hooks on first use."""
+    global _shutdown_hooks_installed, _previous_sigterm_handler
+    _shutdown_clients.add(client)
+    if _shutdown_hooks_installed:
+        return
+    _shutdown_hooks_installed = True
+    atexit.register(_shutdown_all)
+    
+    # Signal handlers can only be installed from the main thread; an ignored
+    # SIGTERM stays ignored, and an application handler is chained
+    if threading.current_thread() is not threading.main_thread() or not hasattr(signal, "SIGTERM"):
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+    if previous is signal.SIG_IGN or previous is None:
+        return
+    _previous_sigterm_handler = previous
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+
+def _unregister_for_shutdown(client: FlowScopeClient):
+    _shutdown_clients.discard(client)
+
+
 # Global client instance
 _global_client = None
 
@@ -0,0 +1,95 @@
+"""
+FlowScope Span Exporters
+
+Exporters receive batches of finished traces from the client's flush worker
+and deliver them somewhere: the FlowScope backend, local files, an OpenTelemetry collector, etc. The client
+selects one through its "exporter" config entry, either by name or by passing
+an exporter instance.
+"""
+
+import importlib
+from typing import Any, Dict, List, Optional
+
+# Exporter name -> "module:Class", imported only when selected
+EXPORTERS = {
+    "http": "flowscope.exporters.http:HTTPExporter",
+    "file": "flowscope.exporters.file:FileExporter",
+    "otlp": "flowscope.exporters.otlp:OTLPExporter",
+    "memory": "flowscope.exporters.memory:InMemoryExporter",
+}
+
+# Field order of the flat span records written by file-based exporters;
+# new fields are appended so existing column positions stay stable
+RECORD_FIELDS = [
+    "id", "session_id", "parent_id", "operation", "framework",
+    "start_time", "end_time", "duration", "status", "error",
+    "input", "output", "metadata", "tags", "events", "resources",
+]
+
+
+class SpanExporter:
+    """Base class for span exporters."""
+    
+    def export(self, traces: List[Any]) -> bool:
+        """
+        Export a batch of finished traces.
+        
+        Called from the client's flush worker, never from the thread finishing
+        spans. Returns False if the batch should be retried on the next flush.
+        """
+        raise NotImplementedError
+        
+    def begin_shutdown(self, deadline: float):
+        """
+        Called as the client starts draining at shutdown: exports from then on
+        should give up by deadline (a time.monotonic() value) instead of retrying.
+        """
+        
+    def shutdown(self):
+        """Flush buffered data and release resources."""
+
+
+def trace_to_record(trace: Any) -> Dict[str, Any]:
+    """
+    Convert a trace to a flat record with numeric epoch timestamps.
+    
+    Unlike TraceData.to_dict(), times stay as epoch seconds so offline
+    tooling can filter and aggregate without parsing dates.
+    """
+    return {
+        "id": trace.id,
+        "session_id": trace.session_id,
+        "parent_id": trace.parent_id,
+        "operation": trace.operation,
+        "framework": trace.metadata.get("framework", "custom"),
+        "start_time": trace.start_time,
+        "end_time": trace.end_time,
+        "duration": trace.duration,
+        "status": trace.status,
+        "error": trace.error,
+        "input": trace.input_data,
+        "output": trace.output_data,
+        "metadata": trace.metadata,
+        "tags": trace.tags,
+        "events": trace.events,
+        "resources": trace.resources,
+    }
+
+
+def create_exporter(name: str, config: Optional[Dict[str, Any]] = None) -> SpanExporter:
+    """Create a registered exporter by name, passing it the client config."""
+    target = EXPORTERS.get(name)
+    if target is None:
+        raise ValueError(f"Unknown FlowScope exporter: {name!r} (available: {', '.join(EXPORTERS)})")
+    module_name, class_name = target.split(":")
+    exporter_class = getattr(importlib.import_module(module_name), class_name)
+    return exporter_class(config or {})
+
+
+__all__ = [
+    'SpanExporter',
+    'EXPORTERS',
+    'RECORD_FIELDS',
+    'trace_to_record',
+    'create_exporter',
+]
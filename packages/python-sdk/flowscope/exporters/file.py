@@ -0,0 +1,350 @@
+"""
+FlowScope File Exporter
+
+Writes trace batches to rotating local files for load tests and air-gapped
+environments where no backend is available. Three formats are supported:
+
+- "ndjson": one JSON span record per line, gzip-compressed (.ndjson.gz)
+- "parquet": columnar Parquet files with a stable schema (.parquet, requires pyarrow)
+- "columnar": length-prefixed batches in the FlowScope columnar batch format
+  (see flowscope.wire), one per export call (.fsc)
+
+Files are written with a ".part" suffix and renamed once rotated, so readers
+only ever see complete files. Rotation happens by size and by age. Each
+published file gets a small JSON sidecar index (<file>.fsidx) with its time
+range, sessions and operations, which offline analysis uses to skip files.
+"""
+
+import gzip
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from . import RECORD_FIELDS, SpanExporter, trace_to_record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_FILE_EXPORTER_CONFIG: Dict[str, Any] = {
+    "directory": "flowscope-traces",
+    "format": "ndjson",                # "ndjson", "parquet" or "columnar"
+    "max_bytes": 64 * 1024 * 1024,     # Rotate once a file reaches this size on disk
+    "max_age": 300.0,                  # Rotate once a file has been open this many seconds
+    "compresslevel": 1,                # gzip level for NDJSON (1 favours throughput)
+    "row_group_size": 50_000,          # Parquet rows buffered per row group
+}
+
+# Record fields stored as JSON strings in Parquet files
+_JSON_FIELDS = ("input", "output", "metadata", "tags", "events", "resources")
+
+_EXTENSIONS = {"ndjson": ".ndjson.gz", "parquet": ".parquet", "columnar": ".fsc"}
+
+# Shared by every exporter, so files opened in the same second never share a name
+_file_sequence = itertools.count(1)
+SPAN_FILE_EXTENSIONS = tuple(_EXTENSIONS.values())
+
+INDEX_SUFFIX = ".fsidx"
+
+# Files with more distinct sessions than this don't list them in their index
+MAX_INDEXED_SESSIONS = 10_000
+
+
+def parquet_schema():
+    """The stable Arrow schema of FlowScope Parquet span files."""
+    import pyarrow as pa
+    
+    string_fields = ("id", "session_id", "parent_id", "operation", "framework", "status", "error")
+    float_fields = ("start_time", "end_time", "duration")
+    fields = []
+    for name in RECORD_FIELDS:
+        if name in float_fields:
+            fields.append(pa.field(name, pa.float64()))
+        elif name in string_fields or name in _JSON_FIELDS:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+class SpanFileIndex:
+    """Sidecar index summarizing one span file, used to skip files when filtering."""
+    
+    def __init__(self):
+        self.rows = 0
+        self.start_min: Optional[float] = None
+        self.start_max: Optional[float] = None
+        self.sessions: Optional[set] = set()  # None once there are too many to list
+        self.operations: set = set()
+        
+    def add(self, record: Dict[str, Any]):
+        self.rows += 1
+        start = record["start_time"]
+        if self.start_min is None or start < self.start_min:
+            self.start_min = start
+        if self.start_max is None or start > self.start_max:
+            self.start_max = start
+        if self.sessions is not None:
+            self.sessions.add(record["session_id"])
+            if len(self.sessions) > MAX_INDEXED_SESSIONS:
+                self.sessions = None
+        self.operations.add(record["operation"])
+        
+    def matches(
+        self,
+        session: Optional[str] = None,
+        operation: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> bool:
+        """Whether the file may contain spans matching the filters."""
+        if self.rows == 0:
+            return False
+        if session is not None and self.sessions is not None and session not in self.sessions:
+            return False
+        if operation is not None and operation not in self.operations:
+            return False
+        if since is not None and self.start_max < since:
+            return False
+        if until is not None and self.start_min >= until:
+            return False
+        return True
+        
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "rows": self.rows,
+            "start_min": self.start_min,
+            "start_max": self.start_max,
+            "sessions": None if self.sessions is None else sorted(self.sessions, key=str),
+            "operations": sorted(self.operations),
+        }
+        
+    def write(self, data_path: str):
+        """Write the index next to data_path, atomically."""
+        index_path = data_path + INDEX_SUFFIX
+        with open(index_path + ".part", "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(index_path + ".part", index_path)
+        
+    @classmethod
+    def load(cls, data_path: str) -> Optional["SpanFileIndex"]:
+        """Load the sidecar index of data_path, or None if it is missing or unreadable."""
+        try:
+            with open(data_path + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+            
+        index = cls()
+        index.rows = data["rows"]
+        index.start_min = data["start_min"]
+        index.start_max = data["start_max"]
+        index.sessions = None if data["sessions"] is None else set(data["sessions"])
+        index.operations = set(data["operations"])
+        return index
+
+
+def span_files(paths: Sequence[str]) -> List[str]:
+    """Expand files and directories into the published span files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(SPAN_FILE_EXTENSIONS):
+                    files.append(os.path.join(path, name))
+        elif path.endswith(SPAN_FILE_EXTENSIONS):
+            files.append(path)
+        else:
+            raise ValueError(f"Not a FlowScope span file: {path}")
+    return files
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over the span records of a published NDJSON.gz, Parquet or columnar file."""
+    loads = orjson.loads if orjson is not None else json.loads
+    if path.endswith(_EXTENSIONS["columnar"]):
+        from ..wire import decode_batch, split_frames
+        with open(path, "rb") as f:
+            data = f.read()
+        for batch in split_frames(data):
+            yield from decode_batch(batch)
+    elif path.endswith(_EXTENSIONS["parquet"]):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches():
+            for record in batch.to_pylist():
+                for name in _JSON_FIELDS:
+                    if record.get(name) is not None:
+                        record[name] = loads(record[name])
+                yield record
+    else:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+
+
+def build_index(path: str) -> SpanFileIndex:
+    """Scan a span file and write its sidecar index (for files written without one)."""
+    index = SpanFileIndex()
+    for record in read_records(path):
+        index.add(record)
+    index.write(path)
+    return index
+
+
+class FileExporter(SpanExporter):
+    """Exports traces to rotating NDJSON.gz, Parquet or FlowScope columnar (.fsc) files."""
+    
+    def __init__(self, config: Dict[str, Any]):
+        settings = dict(DEFAULT_FILE_EXPORTER_CONFIG)
+        settings.update(config.get("file_exporter") or {})
+        self.settings = settings
+        
+        self.format = settings["format"]
+        if self.format not in _EXTENSIONS:
+            raise ValueError(f"Unsupported file exporter format: {self.format!r}")
+        if self.format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet export requires pyarrow. Install with: pip install pyarrow")
+                
+        self.directory = settings["directory"]
+        self.max_bytes = settings["max_bytes"]
+        self.max_age = settings["max_age"]
+        os.makedirs(self.directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._encoder = json.JSONEncoder(default=str, separators=(",", ":"), ensure_ascii=False)
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._file = None          # gzip stream (NDJSON)
+        self._raw = None           # underlying file object, for on-disk size (and columnar output)
+        self._writer = None        # pyarrow ParquetWriter
+        self._columns: Dict[str, List[Any]] = {}
+        self._index = SpanFileIndex()
+        self.completed_files: List[str] = []
+        
+    def export(self, traces: List[Any]) -> bool:
+        with self._lock:
+            try:
+                if self._path is not None and time.time() - self._opened_at >= self.max_age:
+                    self._rotate()
+                if self._path is None:
+                    self._open()
+                    
+                if self.format == "ndjson":
+                    self._write_ndjson(traces)
+                elif self.format == "columnar":
+                    self._write_columnar(traces)
+                else:
+                    self._write_parquet(traces)
+                    
+                if self._size() >= self.max_bytes:
+                    self._rotate()
+                return True
+            except OSError as e:
+                print(f"❌ FlowScope file export failed: {e}")
+                return False
+                
+    def shutdown(self):
+        with self._lock:
+            if self._path is not None:
+                self._rotate()
+                
+    def _open(self):
+        name = f"flowscope-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_file_sequence):05d}"
+        self._path = os.path.join(self.directory, name + _EXTENSIONS[self.format])
+        self._opened_at = time.time()
+        self._index = SpanFileIndex()
+        
+        if self.format == "ndjson":
+            self._raw = open(self._path + ".part", "wb")
+            self._file = gzip.GzipFile(
+                filename=os.path.basename(self._path)[:-3], mode="wb",
+                compresslevel=self.settings["compresslevel"], fileobj=self._raw,
+            )
+        elif self.format == "columnar":
+            self._raw = open(self._path + ".part", "wb")
+        else:
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self._path + ".part", parquet_schema(), compression="zstd")
+            self._columns = {name: [] for name in RECORD_FIELDS}
+            
+    def _rotate(self):
+        """Close the current file and publish it under its final name."""
+        if self.format == "ndjson":
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+        elif self.format == "columnar":
+            self._raw.close()
+            self._raw = None
+        else:
+            self._flush_row_group()
+            self._writer.close()
+            self._writer = None
+            
+        # Publish the index first, so every visible data file has one
+        self._index.write(self._path)
+        os.replace(self._path + ".part", self._path)
+        self.completed_files.append(self._path)
+        self._path = None
+        
+    def _size(self) -> int:
+        if self._raw is not None:
+            return self._raw.tell()
+        return os.path.getsize(self._path + ".part")
+        
+    def _encode(self, value: Any) -> bytes:
+        """Encode a value as compact JSON, using orjson when it is installed."""
+        if orjson is not None:
+            try:
+                return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits; fall back to the stdlib encoder
+        return self._encoder.encode(value).encode("utf-8")
+        
+    def _write_ndjson(self, traces: List[Any]):
+        encode = self._encode
+        index_add = self._index.add
+        lines = []
+        for trace in traces:
+            record = trace_to_record(trace)
+            index_add(record)
+            lines.append(encode(record))
+        lines.append(b"")
+        self._file.write(b"\n".join(lines))
+        
+    def _write_columnar(self, traces: List[Any]):
+        from ..wire import encode_batch, frame
+        
+        for trace in traces:
+            self._index.add(trace_to_record(trace))
+        self._raw.write(frame(encode_batch(traces)))
+        
+    def _write_parquet(self, traces: List[Any]):
+        columns = self._columns
+        encode = self._encode
+        for trace in traces:
+            record = trace_to_record(trace)
+            self._index.add(record)
+            for name in RECORD_FIELDS:
+                value = record[name]
+                if name in _JSON_FIELDS:
+                    value = None if value is None else encode(value).decode("utf-8")
+                columns[name].append(value)
+                
+        if len(columns["id"]) >= self.settings["row_group_size"]:
+            self._flush_row_group()
+            
+    def _flush_row_group(self):
+        if not self._columns.get("id"):
+            return
+        import pyarrow as pa
+        table = pa.Table.from_pydict(self._columns, schema=self._writer.schema)
+        self._writer.write_table(table)
+        self._columns = {name: [] for name in RECORD_FIELDS}
@@ -0,0 +1,397 @@
+"""
+FlowScope HTTP Exporter
+
+Sends trace batches to the FlowScope backend's bulk ingest route,
+POST /api/sessions/:id/traces/bulk, as one request per session in the batch.
+Spans are sent as the backend's TraceData DTO (see trace_to_backend_record).
+Backend sessions are created on first use (POST /api/sessions) for each SDK
+session, since the backend assigns session IDs itself; with "sessions" set
+to "existing", SDK session IDs are used as backend IDs as they are.
+
+Each request is retried with capped exponential backoff and full jitter on
+transient failures (connection errors, timeouts, 408/425/429/5xx). 404 and
+405 mean the endpoint is misconfigured (backend_url or path), so the batch is
+kept for a later flush; other 4xx responses drop it immediately since
+resending it cannot succeed. A circuit breaker stops network attempts while
+the backend is down, letting a single probe through now and then to detect
+recovery, so exporter CPU and socket usage stay flat during incidents.
+"""
+
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from . import SpanExporter
+
+DEFAULT_HTTP_EXPORTER_CONFIG: Dict[str, Any] = {
+    "path": "/api/sessions/{session_id}/traces/bulk",
+    "sessions_path": "/api/sessions",  # Where backend sessions are created
+    "sessions": "create",          # "create" a backend session per SDK session, or use "existing" backend IDs
+    "default_session_name": "python-sdk",  # Backend session for spans recorded without one ("create" only)
+    "wire_format": "json",         # "json" or "columnar" (flowscope.wire; needs a receiver that decodes it)
+    "timeout": 10.0,               # Seconds per request
+    "headers": {},
+    "api_key": None,               # Sent as a Bearer token
+    "max_retries": 4,              # Retries per batch after the first attempt
+    "initial_backoff": 0.5,        # Seconds before the first retry
+    "max_backoff": 30.0,           # Cap on a single backoff delay
+    "backoff_multiplier": 2.0,
+    "failure_threshold": 5,        # Consecutive failed batches that open the circuit
+    "recovery_timeout": 15.0,      # Seconds the circuit stays open before a probe
+    "max_recovery_timeout": 300.0,  # Cap when failed probes keep doubling it
+}
+
+# Statuses worth retrying; other 4xx responses mean the batch itself is rejected
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Statuses meaning the URL is wrong rather than the batch
+MISCONFIGURED_STATUSES = frozenset({404, 405})
+
+
+class CircuitBreaker:
+    """
+    Closed: requests flow. Open: requests are refused until the recovery
+    timeout passes. Half-open: one probe request is let through; success
+    closes the circuit, failure reopens it with a doubled timeout.
+    """
+    
+    def __init__(self, failure_threshold: int, recovery_timeout: float, max_recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = "half_open"
+                return True  # This caller is the probe
+            return False
+            
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.recovery_timeout = self.base_recovery_timeout
+            
+    def record_failure(self):
+        with self._lock:
+            if self.state == "half_open":
+                self.recovery_timeout = min(self.recovery_timeout * 2, self.max_recovery_timeout)
+                self._open()
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open()
+                
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None, unreachable: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.unreachable = unreachable  # No connection could be made at all
+
+
+class _FatalError(Exception):
+    pass
+
+
+class _ConfigurationError(Exception):
+    pass
+
+
+class _Kept(Exception):
+    """A request failed for now; its spans stay queued for a later flush."""
+
+
+def trace_to_backend_record(trace: Any) -> Dict[str, Any]:
+    """
+    Convert a trace to the backend's TraceData DTO.
+    
+    The backend takes the operation as "type", payloads in "data", the start
+    as epoch milliseconds and the duration as whole milliseconds. Its parentId
+    is a foreign key to row IDs it assigns, so span IDs and the parent link
+    travel in metadata instead.
+    """
+    return {
+        "type": trace.operation,
+        "timestamp": int(trace.start_time * 1000),
+        "duration": int(round(trace.duration)) if trace.duration is not None else None,
+        "status": trace.status,
+        "data": {
+            "input": trace.input_data,
+            "output": trace.output_data,
+            "error": trace.error,
+            "tags": trace.tags,
+            "events": trace.events,
+            "resources": trace.resources,
+        },
+        "metadata": {
+            **trace.metadata,
+            "spanId": trace.id,
+            "traceId": trace.trace_id,
+            "parentSpanId": trace.parent_id,
+            "language": "python",
+            "framework": trace.metadata.get("framework", "custom"),
+        },
+    }
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (HTTP dates are ignored)."""
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+
+class HTTPExporter(SpanExporter):
+    """
+    Exports traces to the FlowScope backend over HTTP.
+    
+    Subclasses for other HTTP protocols override the class attributes below,
+    _endpoint(), _requests(), _request_url() and _encode(), and inherit
+    retries and the circuit breaker.
+    """
+    
+    config_key = "http_exporter"         # Client config entry holding the settings
+    default_settings = DEFAULT_HTTP_EXPORTER_CONFIG
+    content_type = "application/json"
+    
+    def __init__(self, config: Dict[str, Any]):
+        settings = dict(self.default_settings)
+        settings.update(config.get(self.config_key) or {})
+        self.settings = settings
+        self.url = self._endpoint(config)
+        if settings.get("sessions", "existing") not in ("create", "existing"):
+            raise ValueError(f"Unsupported HTTP exporter sessions mode: {settings['sessions']!r}")
+        
+        self.wire_format = settings.get("wire_format", "json")
+        if self.wire_format not in ("json", "columnar"):
+            raise ValueError(f"Unsupported HTTP exporter wire format: {self.wire_format!r}")
+        if self.wire_format == "columnar":
+            from ..wire import CONTENT_TYPE
+            self.content_type = CONTENT_TYPE
+            
+        self.headers = {"Content-Type": self.content_type, **settings["headers"]}
+        if settings["api_key"]:
+            self.headers["Authorization"] = f"Bearer {settings['api_key']}"
+            
+        self.breaker = CircuitBreaker(
+            settings["failure_threshold"], settings["recovery_timeout"], settings["max_recovery_timeout"]
+        )
+        self.stats: Dict[str, int] = {
+            "batches_sent": 0, "batches_failed": 0, "batches_rejected": 0,
+            "retries": 0, "circuit_open_skips": 0, "sessions_created": 0, "spans_without_session": 0,
+        }
+        self._stopping = threading.Event()  # Interrupts backoff sleeps on shutdown
+        self._deadline: Optional[float] = None  # Monotonic time exports give up by, once the client drains
+        self._delivered: Set[str] = set()  # IDs of spans already sent from batches that will be retried
+        self._delivered_lock = threading.Lock()
+        self._sessions: Dict[Optional[str], str] = {}  # SDK session ID -> backend session ID ("create" mode)
+        self._sessions_lock = threading.Lock()
+        self._client = None
+        
+        try:
+            import httpx
+        except ImportError:
+            httpx = None
+        if httpx is not None:
+            # One pooled client, so retries and batches reuse connections
+            self._client = httpx.Client(timeout=settings["timeout"], headers=self.headers)
+            
+    def _endpoint(self, config: Dict[str, Any]) -> str:
+        self.backend_url = (config.get("backend_url") or "").rstrip("/")
+        return self.backend_url + self.settings["path"]
+        
+    def _requests(self, traces: List[Any]) -> List[Tuple[Optional[str], List[Any]]]:
+        """(session ID, traces) of the requests a batch is sent as: one per session, as the bulk route is per session."""
+        by_session: Dict[Optional[str], List[Any]] = {}
+        for trace in traces:
+            by_session.setdefault(trace.session_id, []).append(trace)
+        if None in by_session and self.settings["sessions"] == "existing":
+            orphans = by_session.pop(None)
+            self.stats["spans_without_session"] += len(orphans)
+            print(f"❌ FlowScope dropped {len(orphans)} trace(s) without a session; "
+                  f"set a session or use the HTTP exporter's \"create\" sessions mode")
+        return list(by_session.items())
+        
+    def _request_url(self, session_id: Optional[str]) -> str:
+        """URL of the request for a session, creating the backend session first if needed."""
+        if self.settings["sessions"] == "create":
+            session_id = self._sessions.get(session_id) or self._create_session(session_id)
+        return self.url.replace("{session_id}", quote(str(session_id), safe=""))
+        
+    def _create_session(self, session_id: Optional[str]) -> str:
+        """Create the backend session standing for an SDK session, once; returns its backend ID."""
+        with self._sessions_lock:
+            backend_id = self._sessions.get(session_id)
+            if backend_id is not None:
+                return backend_id
+            name = session_id or self.settings["default_session_name"]
+            body = json.dumps({
+                "name": name,
+                "metadata": {"source": "flowscope-python", "sdkSessionId": session_id},
+            }).encode("utf-8")
+            content = self._send(self.backend_url + self.settings["sessions_path"], body, f"request to create session {name!r}")
+            try:
+                backend_id = json.loads(content)["id"]
+            except (ValueError, KeyError, TypeError):
+                print(f"❌ FlowScope backend returned no ID for session {name!r}")
+                raise _Kept()
+            self._sessions[session_id] = backend_id
+            self.stats["sessions_created"] += 1
+            return backend_id
+        
+    def _encode(self, traces: List[Any]) -> bytes:
+        if self.wire_format == "columnar":
+            from ..wire import encode_batch
+            return encode_batch(traces)
+        return json.dumps([trace_to_backend_record(trace) for trace in traces], default=str).encode("utf-8")
+        
+    def export(self, traces: List[Any]) -> bool:
+        """
+        Send one batch, retrying transient failures with backoff.
+        
+        Returns False (keep the batch for a later flush) when retries are
+        exhausted, the endpoint is misconfigured or the circuit is open, and
+        True once the batch is delivered or rejected outright by the backend.
+        Spans of a kept batch that were already delivered (their session's
+        request succeeded) are skipped when it is exported again.
+        """
+        if not self.breaker.allow_request():
+            self.stats["circuit_open_skips"] += 1
+            return False
+            
+        if self._delivered:
+            with self._delivered_lock:
+                sent = [trace for trace in traces if trace.id in self._delivered]
+                self._delivered.difference_update(trace.id for trace in sent)
+            if sent:
+                sent_ids = {trace.id for trace in sent}
+                traces = [trace for trace in traces if trace.id not in sent_ids]
+                
+        delivered: List[Any] = []
+        for session_id, group in self._requests(traces):
+            try:
+                self._send(self._request_url(session_id), self._encode(group), f"batch of {len(group)} traces")
+                self.stats["batches_sent"] += 1
+            except _FatalError:
+                pass  # Rejected; resending cannot succeed
+            except _Kept:
+                if delivered:
+                    with self._delivered_lock:
+                        self._delivered.update(trace.id for trace in delivered)
+                return False
+            delivered += group
+        return True
+        
+    def _send(self, url: str, body: bytes, what: str) -> bytes:
+        """
+        POST body, retrying transient failures; returns the response body.
+        
+        Raises _FatalError if the backend rejected the request, and _Kept if
+        it should be retried on a later flush.
+        """
+        settings = self.settings
+        attempt = 0
+        while True:
+            timeout = settings["timeout"]
+            if self._deadline is not None:
+                timeout = min(timeout, self._deadline - time.monotonic())
+                if timeout <= 0:
+                    self.stats["batches_failed"] += 1
+                    raise _Kept()
+            try:
+                content = self._post(url, body, timeout)
+                self.breaker.record_success()
+                return content
+            except _FatalError as e:
+                # The backend answered, so it is up; the request itself is bad
+                self.breaker.record_success()
+                self.stats["batches_rejected"] += 1
+                print(f"❌ FlowScope backend rejected a {what}: {e}")
+                raise
+            except _ConfigurationError as e:
+                # Resending will not help until the URL is fixed, but the spans are fine
+                self.breaker.record_failure()
+                self.stats["batches_failed"] += 1
+                print(f"❌ FlowScope export endpoint {url} answered {e}; check backend_url and the exporter path")
+                raise _Kept()
+            except _RetryableError as e:
+                # Capped exponential backoff with full jitter
+                ceiling = min(settings["max_backoff"], settings["initial_backoff"] * settings["backoff_multiplier"] ** attempt)
+                delay = random.uniform(0, ceiling)
+                if e.retry_after is not None:
+                    delay = max(delay, min(e.retry_after, settings["max_backoff"]))
+                    
+                # While draining, an unreachable backend will not come back before the deadline
+                out_of_time = self._deadline is not None and (
+                    e.unreachable or time.monotonic() + delay >= self._deadline
+                )
+                if attempt >= settings["max_retries"] or self.breaker.state == "half_open" or out_of_time:
+                    self.breaker.record_failure()
+                    self.stats["batches_failed"] += 1
+                    print(f"❌ FlowScope export failed after {attempt + 1} attempt(s): {e}")
+                    raise _Kept()
+                    
+                attempt += 1
+                self.stats["retries"] += 1
+                if self._stopping.wait(delay):
+                    self.breaker.record_failure()
+                    raise _Kept()
+                    
+    def _post(self, url: str, body: bytes, timeout: float) -> bytes:
+        if self._client is not None:
+            import httpx
+            try:
+                response = self._client.post(url, content=body, timeout=timeout)
+            except httpx.TransportError as e:
+                raise _RetryableError(f"{type(e).__name__}: {e}", unreachable=isinstance(e, httpx.ConnectError))
+            status, retry_after, content = response.status_code, response.headers.get("Retry-After"), response.content
+        else:
+            status, retry_after, content = self._post_urllib(url, body, timeout)
+            
+        if status < 300:
+            return content
+        if status in RETRYABLE_STATUSES:
+            raise _RetryableError(f"HTTP {status}", _retry_after(retry_after))
+        if status in MISCONFIGURED_STATUSES:
+            raise _ConfigurationError(f"HTTP {status}")
+        raise _FatalError(f"HTTP {status}")
+        
+    def _post_urllib(self, url: str, body: bytes, timeout: float):
+        """Fallback transport when httpx is not installed."""
+        import urllib.error
+        import urllib.request
+        
+        request = urllib.request.Request(url, data=body, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.status, response.headers.get("Retry-After"), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get("Retry-After"), b""
+        except (urllib.error.URLError, OSError) as e:
+            reason = getattr(e, "reason", e)
+            raise _RetryableError(f"{type(e).__name__}: {e}", unreachable=isinstance(reason, ConnectionRefusedError))
+            
+    def begin_shutdown(self, deadline: float):
+        self._deadline = deadline
+        
+    def shutdown(self):
+        self._stopping.set()
+        if self._client is not None:
+            self._client.close()
@@ -0,0 +1,32 @@
+"""
+FlowScope In-Memory Exporter
+
+Keeps exported traces in a list instead of sending them anywhere, for tests
+(the pytest plugin installs one per test) and for inspecting what a client
+would export.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from . import SpanExporter
+
+
+class InMemoryExporter(SpanExporter):
+    """Collects exported traces in memory."""
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.spans: List[Any] = []
+        self.batches = 0
+        self._lock = threading.Lock()
+        
+    def export(self, traces: List[Any]) -> bool:
+        with self._lock:
+            self.spans.extend(traces)
+            self.batches += 1
+        return True
+        
+    def clear(self):
+        with self._lock:
+            self.spans = []
+            self.batches = 0
@@ -0,0 +1,439 @@
+"""
+FlowScope OTLP Exporter
+
+Sends spans to an OpenTelemetry collector (or any OTLP/HTTP receiver) as
+binary protobuf ExportTraceServiceRequest messages, optionally gzipped.
+Retries and the circuit breaker are the HTTP exporter's.
+
+The handful of OTLP messages involved are encoded directly, so no protobuf
+runtime or opentelemetry package is needed. Spans are grouped into one
+ResourceSpans per session (resource attribute session.id); a TraceData maps to
+an OTLP span as follows:
+
+    trace_id, id, parent_id   trace_id, span_id, parent_span_id (span IDs are
+                              the first 8 bytes of the UUID)
+    operation                 name (kind INTERNAL)
+    status, error             status code OK / ERROR with the error as message;
+                              the FlowScope status also as flowscope.status
+    tags                      attributes, under their own keys
+    metadata                  framework -> flowscope.framework, class ->
+                              code.namespace, method -> code.function, other
+                              keys -> flowscope.metadata.<key>
+    resources                 flowscope.resources.<key>
+    events                    span events
+    input, output             flowscope.input / flowscope.output as JSON
+                              strings, only with include_payloads
+
+decode_export_request() reads such requests back, for the stand-in ingest
+server and tests.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import struct
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .http import HTTPExporter
+
+DEFAULT_OTLP_EXPORTER_CONFIG: Dict[str, Any] = {
+    "endpoint": None,              # Defaults to $OTEL_EXPORTER_OTLP_TRACES_ENDPOINT, then http://localhost:4318/v1/traces
+    "compression": "gzip",         # "gzip" or None
+    "service_name": "flowscope",   # Resource attribute service.name
+    "resource_attributes": {},     # Extra resource attributes for every span
+    "include_payloads": False,     # Send inputs and outputs as JSON string attributes
+    "max_attribute_length": 4096,  # Longer string attributes are truncated
+    "timeout": 10.0,
+    "headers": {},
+    "api_key": None,               # Sent as a Bearer token
+    "max_retries": 4,
+    "initial_backoff": 0.5,
+    "max_backoff": 30.0,
+    "backoff_multiplier": 2.0,
+    "failure_threshold": 5,
+    "recovery_timeout": 15.0,
+    "max_recovery_timeout": 300.0,
+}
+
+_SPAN_KIND_INTERNAL = 1
+_STATUS_UNSET, _STATUS_OK, _STATUS_ERROR = 0, 1, 2
+_STATUS_CODES = {"success": _STATUS_OK, "error": _STATUS_ERROR, "abandoned": _STATUS_ERROR}
+_METADATA_ATTRIBUTES = {"framework": "flowscope.framework", "class": "code.namespace", "method": "code.function"}
+_MAX_VALUE_DEPTH = 8
+_MAX_CACHED_ATTRIBUTES = 4096  # Encoded scalar attributes kept for reuse across spans
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+# Protobuf wire format: just enough for the OTLP trace messages
+
+_SMALL_VARINTS = [bytes([i]) for i in range(0x80)]
+
+
+def _varint(value: int) -> bytes:
+    if 0 <= value < 0x80:
+        return _SMALL_VARINTS[value]
+    value &= 0xFFFFFFFFFFFFFFFF  # Negative int64 values take ten bytes
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _tag(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _message(field: int, payload: bytes) -> bytes:
+    """A length-delimited field (embedded message, string or bytes)."""
+    return _tag(field, 2) + _varint(len(payload)) + payload
+
+
+def _string(field: int, value: str) -> bytes:
+    return _message(field, value.encode("utf-8"))
+
+
+def _fixed64(field: int, value: int) -> bytes:
+    return _tag(field, 1) + struct.pack("<Q", value)
+
+
+def _unix_nanos(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _fields(data: bytes) -> Iterator[Tuple[int, Any]]:
+    """(field, value) pairs of a message: varints as ints, other wire types as raw bytes."""
+    pos, end = 0, len(data)
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type in (1, 2, 5):
+            if wire_type == 2:
+                length, pos = _read_varint(data, pos)
+            else:
+                length = 8 if wire_type == 1 else 4
+            value = data[pos:pos + length]
+            pos += length
+            if pos > end:
+                raise ValueError(f"field {field} runs past the end of its message")
+        else:
+            raise ValueError(f"unsupported wire type {wire_type} (field {field})")
+        yield field, value
+
+
+# Span field tags, precomputed since every span repeats them
+_SPAN_KIND = _tag(6, 0) + _varint(_SPAN_KIND_INTERNAL)
+_START_TIME = _tag(7, 1)
+_END_TIME = _tag(8, 1)
+
+
+class OTLPExporter(HTTPExporter):
+    """Exports traces as OTLP/HTTP protobuf."""
+    
+    config_key = "otlp_exporter"
+    default_settings = DEFAULT_OTLP_EXPORTER_CONFIG
+    content_type = "application/x-protobuf"
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        compression = self.settings["compression"]
+        if compression not in ("gzip", None):
+            raise ValueError(f"Unsupported OTLP compression: {compression!r}")
+        if compression == "gzip":
+            self.headers["Content-Encoding"] = "gzip"
+            if self._client is not None:
+                self._client.headers["Content-Encoding"] = "gzip"
+                
+        from .. import __version__
+        self._resource_attributes = {
+            "service.name": self.settings["service_name"],
+            "telemetry.sdk.name": "flowscope",
+            "telemetry.sdk.language": "python",
+            "telemetry.sdk.version": __version__,
+            **self.settings["resource_attributes"],
+        }
+        self._scope = _string(1, "flowscope") + _string(2, __version__)
+        self._max_length = self.settings["max_attribute_length"]
+        self._key_cache: Dict[str, bytes] = {}
+        self._attribute_cache: Dict[tuple, bytes] = {}  # (field, key, type, value) -> encoded KeyValue
+        
+    def _endpoint(self, config: Dict[str, Any]) -> str:
+        endpoint = self.settings["endpoint"] or os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+        if endpoint:
+            return endpoint
+        base = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+        if base:
+            return base.rstrip("/") + "/v1/traces"
+        return "http://localhost:4318/v1/traces"
+        
+    def _requests(self, traces: List[Any]) -> List[tuple]:
+        # One request per batch; sessions become separate resources within it
+        return [(None, traces)]
+        
+    def _request_url(self, session_id: Optional[str]) -> str:
+        return self.url
+        
+    def _encode(self, traces: List[Any]) -> bytes:
+        by_session: Dict[Optional[str], List[bytes]] = {}
+        for trace in traces:
+            by_session.setdefault(trace.session_id, []).append(self._span(trace))
+            
+        body = bytearray()
+        for session_id, spans in by_session.items():
+            attributes = dict(self._resource_attributes)
+            if session_id is not None:
+                attributes["session.id"] = session_id
+            resource = b"".join(self._attribute(1, key, value) for key, value in attributes.items())
+            scope_spans = _message(1, self._scope) + b"".join(_message(2, span) for span in spans)
+            body += _message(1, _message(1, resource) + _message(2, scope_spans))
+            
+        if self.settings["compression"] == "gzip":
+            return gzip.compress(bytes(body), compresslevel=6)
+        return bytes(body)
+        
+    # Message encoders
+    
+    def _span(self, trace: Any) -> bytes:
+        out = bytearray()
+        out += _message(1, self._trace_id(trace))
+        out += _message(2, self._span_id(trace.id))
+        if trace.parent_id:
+            out += _message(4, self._span_id(trace.parent_id))
+        out += _string(5, trace.operation)
+        out += _SPAN_KIND
+        out += _START_TIME + struct.pack("<Q", _unix_nanos(trace.start_time))
+        out += _END_TIME + struct.pack("<Q", _unix_nanos(trace.end_time or trace.start_time))
+        
+        attribute = self._attribute
+        out += attribute(9, "flowscope.status", trace.status)
+        for key, value in trace.tags.items():
+            out += attribute(9, str(key), value)
+        for key, value in trace.metadata.items():
+            out += attribute(9, _METADATA_ATTRIBUTES.get(key) or f"flowscope.metadata.{key}", value)
+        for key, value in (trace.resources or {}).items():
+            out += attribute(9, f"flowscope.resources.{key}", value)
+        if self.settings["include_payloads"]:
+            for key, value in (("flowscope.input", trace.input_data), ("flowscope.output", trace.output_data)):
+                if value is not None:
+                    out += attribute(9, key, json.dumps(value, default=str))
+                    
+        for event in trace.events:
+            encoded = _fixed64(1, _unix_nanos(event["timestamp"])) + _string(2, event["name"])
+            for key, value in (event.get("attributes") or {}).items():
+                encoded += attribute(3, str(key), value)
+            out += _message(11, encoded)
+            
+        status = b""
+        if trace.error:
+            status += _string(2, self._truncate(str(trace.error)))
+        code = _STATUS_CODES.get(trace.status, _STATUS_UNSET)
+        if code:
+            status += _tag(3, 0) + _varint(code)
+        out += _message(15, status)
+        return bytes(out)
+        
+    def _attribute(self, field: int, key: str, value: Any) -> bytes:
+        """A KeyValue message as the given field."""
+        # Short scalar values (statuses, frameworks, model names) repeat across spans
+        cacheable = type(value) in (str, int, float, bool) and (type(value) is not str or len(value) <= 64)
+        if cacheable:
+            cache_key = (field, key, type(value), value)
+            encoded = self._attribute_cache.get(cache_key)
+            if encoded is not None:
+                return encoded
+                
+        encoded_key = self._key_cache.get(key)
+        if encoded_key is None:
+            if len(self._key_cache) >= _MAX_CACHED_ATTRIBUTES:
+                self._key_cache.clear()
+            encoded_key = self._key_cache[key] = _string(1, key)
+        encoded = _message(field, encoded_key + _message(2, self._any_value(value, 0)))
+        
+        if cacheable:
+            if len(self._attribute_cache) >= _MAX_CACHED_ATTRIBUTES:
+                self._attribute_cache.clear()
+            self._attribute_cache[cache_key] = encoded
+        return encoded
+        
+    def _any_value(self, value: Any, depth: int) -> bytes:
+        if isinstance(value, str):
+            return _string(1, self._truncate(value))
+        if isinstance(value, bool):
+            return _tag(2, 0) + _varint(int(value))
+        if isinstance(value, int) and _INT64_MIN <= value <= _INT64_MAX:
+            return _tag(3, 0) + _varint(value)
+        if isinstance(value, float):
+            return _tag(4, 1) + struct.pack("<d", value)
+        if value is None:
+            return b""
+        if isinstance(value, (bytes, bytearray)):
+            return _message(7, bytes(value))
+        if depth < _MAX_VALUE_DEPTH:
+            if isinstance(value, dict):
+                pairs = b"".join(
+                    _message(1, _string(1, str(k)) + _message(2, self._any_value(v, depth + 1)))
+                    for k, v in value.items()
+                )
+                return _message(6, pairs)
+            if isinstance(value, (list, tuple)):
+                return _message(5, b"".join(_message(1, self._any_value(v, depth + 1)) for v in value))
+        return _string(1, self._truncate(str(value)))
+        
+    def _truncate(self, value: str) -> str:
+        if self._max_length and len(value) > self._max_length:
+            return value[:self._max_length]
+        return value
+        
+    @staticmethod
+    def _span_id(span_id: str) -> bytes:
+        """The first 8 bytes of a UUID span ID; other IDs are hashed."""
+        if len(span_id) == 36 and span_id[8] == "-" and span_id[13] == "-":
+            try:
+                return bytes.fromhex(span_id[:8] + span_id[9:13] + span_id[14:18])
+            except ValueError:
+                pass
+        return hashlib.blake2b(span_id.encode("utf-8"), digest_size=8).digest()
+        
+    @staticmethod
+    def _trace_id(trace: Any) -> bytes:
+        trace_id = getattr(trace, "trace_id", None) or trace.id
+        if len(trace_id) == 32:
+            try:
+                return bytes.fromhex(trace_id)
+            except ValueError:
+                pass
+        try:
+            return uuid.UUID(trace_id).bytes
+        except ValueError:
+            return hashlib.blake2b(trace_id.encode("utf-8"), digest_size=16).digest()
+
+
+# Decoding, the inverse of OTLPExporter's encoders
+
+def decode_export_request(body: bytes) -> List[Dict[str, Any]]:
+    """
+    Decode an (uncompressed) ExportTraceServiceRequest into span dicts.
+    
+    Spans use the OTLP/JSON field names, with IDs as hex strings and
+    attributes as plain dicts; each also carries its "resource" attributes
+    and instrumentation "scope". Raises ValueError on malformed input.
+    """
+    try:
+        return [
+            span
+            for field, resource_spans in _fields(body) if field == 1
+            for span in _decode_resource_spans(resource_spans)
+        ]
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"malformed OTLP request: {e}")
+
+
+def _decode_resource_spans(data: bytes) -> List[Dict[str, Any]]:
+    resource: Dict[str, Any] = {}
+    spans = []
+    for field, value in _fields(data):
+        if field == 1:
+            resource = _decode_attributes(value, 1)
+        elif field == 2:
+            scope: Dict[str, Any] = {}
+            for scope_field, scope_value in _fields(value):
+                if scope_field == 1:
+                    scope = {
+                        ("name", "version")[f - 1]: v.decode("utf-8")
+                        for f, v in _fields(scope_value) if f in (1, 2)
+                    }
+                elif scope_field == 2:
+                    spans.append(dict(_decode_span(scope_value), scope=scope))
+    for span in spans:
+        span["resource"] = resource
+    return spans
+
+
+def _decode_span(data: bytes) -> Dict[str, Any]:
+    span: Dict[str, Any] = {"parentSpanId": None, "attributes": {}, "events": [], "status": {}}
+    for field, value in _fields(data):
+        if field == 1:
+            span["traceId"] = value.hex()
+        elif field == 2:
+            span["spanId"] = value.hex()
+        elif field == 4:
+            span["parentSpanId"] = value.hex() or None
+        elif field == 5:
+            span["name"] = value.decode("utf-8")
+        elif field == 6:
+            span["kind"] = value
+        elif field == 7:
+            span["startTimeUnixNano"] = int.from_bytes(value, "little")
+        elif field == 8:
+            span["endTimeUnixNano"] = int.from_bytes(value, "little")
+        elif field == 9:
+            key, attribute = _decode_key_value(value)
+            span["attributes"][key] = attribute
+        elif field == 11:
+            event: Dict[str, Any] = {"attributes": {}}
+            for event_field, event_value in _fields(value):
+                if event_field == 1:
+                    event["timeUnixNano"] = int.from_bytes(event_value, "little")
+                elif event_field == 2:
+                    event["name"] = event_value.decode("utf-8")
+                elif event_field == 3:
+                    key, attribute = _decode_key_value(event_value)
+                    event["attributes"][key] = attribute
+            span["events"].append(event)
+        elif field == 15:
+            for status_field, status_value in _fields(value):
+                if status_field == 2:
+                    span["status"]["message"] = status_value.decode("utf-8")
+                elif status_field == 3:
+                    span["status"]["code"] = status_value
+    return span
+
+
+def _decode_attributes(data: bytes, field_number: int) -> Dict[str, Any]:
+    return dict(_decode_key_value(value) for field, value in _fields(data) if field == field_number)
+
+
+def _decode_key_value(data: bytes) -> Tuple[str, Any]:
+    key, value = "", None
+    for field, field_value in _fields(data):
+        if field == 1:
+            key = field_value.decode("utf-8")
+        elif field == 2:
+            value = _decode_any_value(field_value)
+    return key, value
+
+
+def _decode_any_value(data: bytes) -> Any:
+    value = None
+    for field, field_value in _fields(data):
+        if field == 1:
+            value = field_value.decode("utf-8")
+        elif field == 2:
+            value = bool(field_value)
+        elif field == 3:
+            value = field_value - (1 << 64) if field_value > _INT64_MAX else field_value
+        elif field == 4:
+            value = struct.unpack("<d", field_value)[0]
+        elif field == 5:
+            value = [_decode_any_value(v) for f, v in _fields(field_value) if f == 1]
+        elif field == 6:
+            value = _decode_attributes(field_value, 1)
+        elif field == 7:
+            value = bytes(field_value)
+    return value
@@ -0,0 +1,360 @@
+"""
+FlowScope Stand-in Ingest Server
+
+A lightweight asyncio HTTP server emulating the backend's trace ingestion
+endpoints, for load tests and exporter development without the full stack:
+
+    POST /api/sessions                   {"name": ...}  creates a session, answering its "id"
+    POST /api/sessions/:id/traces/bulk   [...]  (the SDK's HTTP exporter), or a columnar
+                                         batch (flowscope.wire) with its content type
+    POST /api/sessions/:id/traces        {...}
+    POST /v1/traces                      OTLP/HTTP protobuf (the SDK's OTLP exporter)
+    GET  /stats                          counters and export lag percentiles
+
+Trace records are checked the way the backend's database would store them:
+the session must exist, "data" is required, "duration" must be a whole
+number of milliseconds, "timestamp" epoch milliseconds, and "parentId" a row
+ID the backend assigned (the stand-in assigns none, so any parentId fails).
+Like the backend, violations answer 500. OTLP requests are decoded like a
+collector would, and spans without a valid trace or span ID answer 400.
+
+Latency (with jitter) and failures (a status such as 503, optionally with
+Retry-After) can be injected to see how exporters behave against a slow or
+flaky backend. Export lag is the time from a span's end to its arrival.
+
+Run with "flowscope serve" or "python -m flowscope.ingest_server".
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .exporters.otlp import decode_export_request
+from .wire import CONTENT_TYPE, WireFormatError, decode_batch
+
+DEFAULT_SERVER_CONFIG: Dict[str, Any] = {
+    "host": "127.0.0.1",
+    "port": 3001,
+    "latency_ms": 0.0,         # Added to every ingest request
+    "jitter_ms": 0.0,          # Uniform +/- variation of the latency
+    "failure_rate": 0.0,       # Share of ingest requests answered with failure_status
+    "failure_status": 503,
+    "retry_after": None,       # Retry-After seconds sent with injected failures
+    "max_lag_samples": 100_000,  # Export lag samples kept for percentiles (reservoir)
+}
+
+_TRACES_PATH = re.compile(r"^/api/sessions/([^/]+)/traces(/bulk)?$")
+_OTLP_PATH = "/v1/traces"
+_PROTOBUF = "application/x-protobuf"
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 415: "Unsupported Media Type",
+            429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway",
+            503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+def _invalid_record(record: Any) -> Optional[str]:
+    """Why the backend could not store a trace record, or None if it could."""
+    if not isinstance(record, dict):
+        return "trace record is not an object"
+    if record.get("data") is None:
+        return "Argument `data` is missing."
+    duration = record.get("duration")
+    if duration is not None and (isinstance(duration, bool) or not isinstance(duration, int)):
+        return f"Invalid value for argument `duration`: expected Int, got {duration!r}."
+    timestamp = record.get("timestamp")
+    if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))):
+        return f"Invalid value for argument `timestamp`: expected epoch milliseconds, got {timestamp!r}."
+    if record.get("parentId") is not None:
+        return "Foreign key constraint failed on the field: `parent_id`"
+    return None
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """Epoch seconds of a span timestamp: a number, or the SDK's ISO format (local time with a "Z")."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.rstrip("Z")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class IngestServer:
+    """Stand-in for the backend's trace ingestion endpoints."""
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_SERVER_CONFIG)
+        if config:
+            self.config.update(config)
+        self.stats: Dict[str, Any] = {
+            "requests": 0, "spans": 0, "bytes": 0, "failures_injected": 0, "bad_requests": 0,
+            "sessions_created": 0, "invalid_requests": 0,
+            "first_request": None, "last_request": None,
+        }
+        self._lag: List[float] = []
+        self._lag_seen = 0
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        
+    @property
+    def port(self) -> int:
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self.config["port"]
+        
+    @property
+    def url(self) -> str:
+        return f"http://{self.config['host']}:{self.port}"
+        
+    # Accounting
+    
+    def _record_lag(self, lag: float):
+        # Reservoir sampling keeps memory flat on long runs
+        self._lag_seen += 1
+        if len(self._lag) < self.config["max_lag_samples"]:
+            self._lag.append(lag)
+        else:
+            slot = random.randrange(self._lag_seen)
+            if slot < len(self._lag):
+                self._lag[slot] = lag
+                
+    def _ingest(self, spans: List[Dict[str, Any]], received: float):
+        self.stats["spans"] += len(spans)
+        for span in spans:
+            if not isinstance(span, dict):
+                continue
+            if isinstance(span.get("timestamp"), (int, float)) and isinstance(span.get("duration"), int):
+                ended = (span["timestamp"] + span["duration"]) / 1000
+            elif "endTimeUnixNano" in span:
+                ended = span["endTimeUnixNano"] / 1e9
+            else:
+                ended = _epoch(span.get("end_time"))
+            if ended is not None:
+                self._record_lag((received - ended) * 1000)
+                
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus export lag percentiles (ms)."""
+        stats = dict(self.stats)
+        lag = sorted(self._lag)
+        for name, q in (("lag_p50_ms", 0.50), ("lag_p95_ms", 0.95), ("lag_p99_ms", 0.99)):
+            stats[name] = round(lag[min(int(q * len(lag)), len(lag) - 1)], 2) if lag else None
+        stats["lag_max_ms"] = round(lag[-1], 2) if lag else None
+        return stats
+        
+    # HTTP
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                if headers.get("content-encoding") == "gzip":
+                    body = gzip.decompress(body)
+                    
+                content_type = headers.get("content-type", "")
+                status, payload, extra = await self._respond(method, path.split("?", 1)[0], body, content_type)
+                if isinstance(payload, bytes):
+                    data, response_type = payload, _PROTOBUF
+                else:
+                    data, response_type = json.dumps(payload).encode("utf-8"), "application/json"
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Status')}", f"Content-Type: {response_type}",
+                        f"Content-Length: {len(data)}"]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+            
+    async def _respond(self, method: str, path: str, body: bytes, content_type: str = "") -> Tuple[int, Any, Dict[str, str]]:
+        if method == "GET" and path == "/stats":
+            return 200, self.snapshot(), {}
+        if method == "POST" and path == "/api/sessions":
+            return self._create_session(body)
+        traces_path = _TRACES_PATH.match(path)
+        if method != "POST" or not (traces_path or path == _OTLP_PATH):
+            return 404, {"message": f"Cannot {method} {path}"}, {}
+            
+        received = time.time()
+        self.stats["requests"] += 1
+        self.stats["bytes"] += len(body)
+        self.stats["first_request"] = self.stats["first_request"] or received
+        self.stats["last_request"] = received
+        
+        latency = self.config["latency_ms"] + random.uniform(-1, 1) * self.config["jitter_ms"]
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        if self.config["failure_rate"] and random.random() < self.config["failure_rate"]:
+            self.stats["failures_injected"] += 1
+            extra = {"Retry-After": str(self.config["retry_after"])} if self.config["retry_after"] is not None else {}
+            return self.config["failure_status"], {"message": "injected failure"}, extra
+            
+        if traces_path is None:
+            return self._otlp(body, content_type, received)
+        if traces_path.group(1) not in self.sessions:
+            # A foreign key violation on traces.session_id, which the backend answers with 500
+            self.stats["invalid_requests"] += 1
+            return 500, {"statusCode": 500, "message": "Foreign key constraint failed on the field: `session_id`"}, {}
+            
+        if content_type.startswith(CONTENT_TYPE):
+            try:
+                spans = decode_batch(body)
+            except WireFormatError as e:
+                self.stats["bad_requests"] += 1
+                return 400, {"message": str(e)}, {}
+            self._ingest(spans, received)
+            return 201, {"received": len(spans)}, {}
+        try:
+            document = json.loads(body)
+        except ValueError:
+            self.stats["bad_requests"] += 1
+            return 400, {"message": "invalid JSON"}, {}
+        if traces_path.group(2):
+            if not isinstance(document, list):
+                self.stats["bad_requests"] += 1
+                return 400, {"message": "expected an array of traces"}, {}
+            spans = document
+        else:
+            spans = [document]
+        for span in spans:
+            problem = _invalid_record(span)
+            if problem is not None:
+                self.stats["invalid_requests"] += 1
+                return 500, {"statusCode": 500, "message": problem}, {}
+        self._ingest(spans, received)
+        return 201, {"received": len(spans)}, {}
+        
+    def _otlp(self, body: bytes, content_type: str, received: float) -> Tuple[int, Any, Dict[str, str]]:
+        if not content_type.startswith(_PROTOBUF):
+            self.stats["bad_requests"] += 1
+            return 415, {"message": f"expected {_PROTOBUF}"}, {}
+        try:
+            spans = decode_export_request(body)
+        except ValueError as e:
+            self.stats["bad_requests"] += 1
+            return 400, {"message": str(e)}, {}
+        for span in spans:
+            if len(span.get("traceId", "")) != 32 or len(span.get("spanId", "")) != 16:
+                self.stats["invalid_requests"] += 1
+                return 400, {"message": f"span {span.get('name')!r} has an invalid trace or span ID"}, {}
+        self._ingest(spans, received)
+        # An empty ExportTraceServiceResponse: everything was accepted
+        return 200, b"", {}
+        
+    def _create_session(self, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        try:
+            document = json.loads(body or b"{}")
+        except ValueError:
+            self.stats["bad_requests"] += 1
+            return 400, {"message": "invalid JSON"}, {}
+        if not isinstance(document, dict):
+            self.stats["bad_requests"] += 1
+            return 400, {"message": "expected a session object"}, {}
+        session = {
+            "id": uuid.uuid4().hex,
+            "name": document.get("name"),
+            "startTime": int(time.time() * 1000),
+            "status": "active",
+            "metadata": document.get("metadata"),
+            "traces": [],
+        }
+        self.sessions[session["id"]] = session
+        self.stats["sessions_created"] += 1
+        return 201, session, {}
+        
+    # Lifecycle
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.config["host"], self.config["port"])
+        
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+            
+    def start_in_thread(self) -> "IngestServer":
+        """Serve from a daemon thread; returns once listening."""
+        ready = threading.Event()
+        
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+            
+        self._thread = threading.Thread(target=run, name="flowscope-ingest-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+        
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default=DEFAULT_SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_CONFIG["port"], help="0 picks a free port")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to ingest requests")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- variation of the latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of ingest requests that fail (0-1)")
+    parser.add_argument("--failure-status", type=int, default=503, help="Status of injected failures")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected failures")
+
+
+def server_config(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "host": args.host, "port": args.port, "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+        "failure_rate": args.failure_rate, "failure_status": args.failure_status, "retry_after": args.retry_after,
+    }
+
+
+def serve(config: Dict[str, Any]) -> int:
+    """Run a server in the foreground until interrupted."""
+    server = IngestServer(config)
+    
+    async def main():
+        await server.start()
+        # Parent processes (flowscope loadgen --serve) read the URL from this line
+        print(f"FlowScope stand-in ingest server listening on {server.url}", flush=True)
+        await server.serve_forever()
+        
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FlowScope stand-in ingest server")
+    add_server_arguments(parser)
+    sys.exit(serve(server_config(parser.parse_args())))
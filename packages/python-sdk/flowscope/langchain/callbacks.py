@@ -0,0 +1,445 @@
+"""
+FlowScope LangChain Callback Handler
+
+Builds FlowScope traces from LangChain's callback events instead of wrapping
+individual classes. Every run LangChain reports - LCEL sequences, chat models,
+LLMs, tools, retrievers and agents - becomes a span, and the run_id/parent_run_id
+links LangChain provides are used to reconstruct the full run tree.
+
+Usage:
+    from flowscope.langchain.callbacks import FlowScopeCallbackHandler
+    
+    chain.invoke(inputs, config={"callbacks": [FlowScopeCallbackHandler()]})
+    
+    # Or trace every run started from the current context:
+    from flowscope.langchain.callbacks import register_global_handler
+    register_global_handler()
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from ..batch import BatchTrace
+from ..core import FlowScopeClient, TraceData, get_global_client
+from . import _safe_import
+
+_BaseCallbackHandler = (
+    _safe_import('langchain_core.callbacks', 'BaseCallbackHandler')
+    or _safe_import('langchain.callbacks.base', 'BaseCallbackHandler')
+    or object
+)
+
+# Context variable consulted by LangChain's callback manager when a global
+# handler has been registered via register_global_handler()
+_global_handler_var: ContextVar[Optional["FlowScopeCallbackHandler"]] = ContextVar(
+    'flowscope_callback_handler', default=None
+)
+_configure_hook_registered = False
+
+# Metadata keys used to tag each batch item's config with its batch and index
+_BATCH_ID_KEY = "flowscope_batch_id"
+_BATCH_INDEX_KEY = "flowscope_batch_index"
+_MISSING = object()
+
+
+def _run_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+    """Resolve a human readable name for a LangChain run."""
+    name = kwargs.get("name")
+    if name:
+        return name
+    if serialized:
+        if serialized.get("name"):
+            return serialized["name"]
+        if serialized.get("id"):
+            return serialized["id"][-1]
+    return default
+
+
+def _token_usage(response: Any) -> Optional[Dict[str, Any]]:
+    """Extract token usage from an LLMResult, if the provider reported it."""
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage")
+    if usage:
+        return dict(usage)
+        
+    # Chat models report usage on the generated message instead
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                return dict(usage)
+    return None
+
+
+class FlowScopeCallbackHandler(_BaseCallbackHandler):
+    """
+    LangChain callback handler that records every run as a FlowScope trace.
+    
+    Open runs are kept in a dict keyed by LangChain's run_id, so each event is
+    matched to its span in O(1) regardless of how deep or wide the run tree is.
+    """
+    
+    # Run synchronously in the caller's thread/event loop: the handler never
+    # blocks, so dispatching it to an executor would only add overhead
+    run_inline = True
+    raise_error = False
+    
+    def __init__(
+        self,
+        client: Optional[FlowScopeClient] = None,
+        session_id: Optional[str] = None,
+        include_inputs: Optional[bool] = None,
+        include_outputs: Optional[bool] = None
+    ):
+        super().__init__()
+        self._client = client
+        self.session_id = session_id
+        self.include_inputs = include_inputs
+        self.include_outputs = include_outputs
+        self._runs: Dict[UUID, TraceData] = {}
+        self._batches: Dict[str, BatchTrace] = {}
+        self._batch_items: Dict[UUID, BatchTrace] = {}
+        
+    @property
+    def client(self) -> FlowScopeClient:
+        """The client spans are reported to (the global client by default)."""
+        return self._client or get_global_client()
+        
+    def get_trace(self, run_id: UUID) -> Optional[TraceData]:
+        """Get the open trace for a LangChain run, if any."""
+        return self._runs.get(run_id)
+        
+    def _start_run(
+        self,
+        run_type: str,
+        name: str,
+        inputs: Any,
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        tags: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[TraceData]:
+        """
+        Open a span for a LangChain run, linked to its parent run.
+        
+        Spans are detached from the thread's stack: a run without a parent run
+        is a root even if some unrelated span is open on the thread, and spans
+        started while the run is open are not parented to it.
+        """
+        client = self.client
+        parent = self._runs.get(parent_run_id) if parent_run_id else None
+        
+        batch = None
+        if metadata and _BATCH_ID_KEY in metadata:
+            batch_id = metadata[_BATCH_ID_KEY]
+            batch_index = metadata[_BATCH_INDEX_KEY]
+            metadata = self._compact_metadata(metadata, self._batches.get(batch_id))
+            if parent is None:
+                batch = self._batches.get(batch_id)
+                
+        if batch is not None:
+            item_metadata = {"class": name, "run_type": run_type, "run_id": str(run_id)}
+            if metadata:
+                item_metadata["langchain_metadata"] = metadata
+            trace = batch.start_item(batch_index, f"langchain.{name}", item_metadata, detached=True)
+        else:
+            trace_metadata = {
+                "framework": "langchain",
+                "class": name,
+                "run_type": run_type,
+                "run_id": str(run_id),
+                "callback_handler": True,
+            }
+            if metadata:
+                trace_metadata["langchain_metadata"] = metadata
+                
+            trace = client.start_trace(
+                f"langchain.{name}",
+                session_id=self.session_id,
+                metadata=trace_metadata,
+                parent_id=parent.id if parent else None,
+                detached=True,
+            )
+        if trace is None:
+            return None
+            
+        if tags:
+            trace.set_tag("langchain_tags", list(tags))
+            
+        include_inputs = self.include_inputs
+        if include_inputs is None:
+            include_inputs = client.config["include_inputs"]
+        if include_inputs:
+            trace.set_input(inputs)
+            
+        self._runs[run_id] = trace
+        if batch is not None:
+            self._batch_items[run_id] = batch
+        return trace
+        
+    @staticmethod
+    def _compact_metadata(metadata: Dict[str, Any], batch: Optional[BatchTrace]) -> Dict[str, Any]:
+        """
+        Strip batch routing keys and batch-level config metadata from a run's metadata.
+        
+        LangChain copies the batch config's metadata onto every run of every
+        item; it is recorded once on the batch span instead.
+        """
+        batch_metadata = (batch.trace.metadata.get("langchain_metadata") if batch else None) or {}
+        return {
+            key: value for key, value in metadata.items()
+            if key not in (_BATCH_ID_KEY, _BATCH_INDEX_KEY) and batch_metadata.get(key, _MISSING) != value
+        }
+        
+    def _end_run(self, run_id: UUID, outputs: Any = None, error: Optional[BaseException] = None):
+        """Close the span for a LangChain run."""
+        trace = self._runs.pop(run_id, None)
+        if trace is None:
+            return
+            
+        client = self.client
+        include_outputs = self.include_outputs
+        if include_outputs is None:
+            include_outputs = client.config["include_outputs"]
+        if include_outputs and outputs is not None:
+            trace.set_output(outputs)
+            
+        token_count = trace.metadata.get("token_count")
+        if token_count:
+            elapsed = time.time() - trace.start_time
+            if elapsed > 0:
+                trace.metadata["tokens_per_second"] = token_count / elapsed
+                
+        batch = self._batch_items.pop(run_id, None)
+        if batch is not None:
+            if error is None:
+                batch.finish_item(trace, success=True)
+            else:
+                batch.finish_item(trace, success=False, error=str(error))
+        elif error is None:
+            client.finish_trace(trace, success=True)
+        else:
+            client.finish_trace(trace, success=False, error=str(error))
+            
+    def _batch_configs(self, batch: BatchTrace, config: Optional[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+        """Build one config per batch item that routes its root run to the batch span."""
+        config = dict(config or {})
+        callbacks = config.get("callbacks")
+        if callbacks is None:
+            callbacks = [self]
+        elif isinstance(callbacks, list):
+            callbacks = callbacks if self in callbacks else callbacks + [self]
+        else:
+            # A callback manager: copy it per item with this handler attached
+            callbacks = callbacks.copy()
+            callbacks.add_handler(self, inherit=True)
+            
+        base_metadata = config.get("metadata") or {}
+        configs = []
+        for index in range(size):
+            item_config = dict(config)
+            item_config["callbacks"] = callbacks
+            item_config["metadata"] = dict(base_metadata, **{_BATCH_ID_KEY: batch.id, _BATCH_INDEX_KEY: index})
+            configs.append(item_config)
+        return configs
+        
+    def _open_batch(self, runnable: Any, inputs: List[Any], config: Optional[Dict[str, Any]], method: str):
+        name = getattr(runnable, "name", None) or runnable.__class__.__name__
+        config = config or {}
+        metadata = {
+            "framework": "langchain",
+            "class": name,
+            "method": method,
+            "callback_handler": True,
+        }
+        if config.get("metadata"):
+            metadata["langchain_metadata"] = config["metadata"]
+        return self.client.trace_batch(
+            f"langchain.{name}.{method}",
+            size=len(inputs),
+            max_concurrency=config.get("max_concurrency"),
+            session_id=self.session_id,
+            metadata=metadata,
+        )
+        
+    def batch(self, runnable: Any, inputs: List[Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        """
+        Run runnable.batch() traced as one batch span with a child span per input.
+        
+        Items record their batch index, queueing delay and concurrency slot.
+        """
+        with self._open_batch(runnable, inputs, config, "batch") as batch:
+            if batch is None:
+                return runnable.batch(inputs, config, **kwargs)
+            self._batches[batch.id] = batch
+            try:
+                return runnable.batch(inputs, self._batch_configs(batch, config, len(inputs)), **kwargs)
+            finally:
+                self._batches.pop(batch.id, None)
+                
+    async def abatch(self, runnable: Any, inputs: List[Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        """Async counterpart of batch(), tracing runnable.abatch()."""
+        with self._open_batch(runnable, inputs, config, "abatch") as batch:
+            if batch is None:
+                return await runnable.abatch(inputs, config, **kwargs)
+            self._batches[batch.id] = batch
+            try:
+                return await runnable.abatch(inputs, self._batch_configs(batch, config, len(inputs)), **kwargs)
+            finally:
+                self._batches.pop(batch.id, None)
+                
+    # Chains and LCEL runnables
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = _run_name(serialized, kwargs, "Chain")
+        self._start_run("chain", name, inputs, run_id, parent_run_id, tags, metadata)
+        
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._end_run(run_id, outputs)
+        
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._end_run(run_id, error=error)
+        
+    # LLMs and chat models
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = _run_name(serialized, kwargs, "LLM")
+        self._start_run("llm", name, {"prompts": prompts}, run_id, parent_run_id, tags, metadata)
+        
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = _run_name(serialized, kwargs, "ChatModel")
+        self._start_run("chat_model", name, {"messages": messages}, run_id, parent_run_id, tags, metadata)
+        
+    def on_llm_new_token(self, token, *, chunk=None, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is None:
+            return
+            
+        token_count = trace.metadata.get("token_count", 0)
+        if token_count == 0:
+            ttft = (time.time() - trace.start_time) * 1000
+            trace.metadata["time_to_first_token"] = ttft
+            trace.add_event("first_token", {"elapsed_ms": ttft})
+        trace.metadata["token_count"] = token_count + 1
+        
+    def on_llm_end(self, response, *, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            usage = _token_usage(response)
+            if usage:
+                trace.metadata["token_usage"] = usage
+        self._end_run(run_id, response)
+        
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._end_run(run_id, error=error)
+        
+    # Tools
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, tags=None, metadata=None, inputs=None, **kwargs):
+        name = _run_name(serialized, kwargs, "Tool")
+        self._start_run("tool", name, inputs if inputs is not None else input_str, run_id, parent_run_id, tags, metadata)
+        
+    def on_tool_end(self, output, *, run_id, parent_run_id=None, **kwargs):
+        self._end_run(run_id, output)
+        
+    def on_tool_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._end_run(run_id, error=error)
+        
+    # Retrievers
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = _run_name(serialized, kwargs, "Retriever")
+        self._start_run("retriever", name, {"query": query}, run_id, parent_run_id, tags, metadata)
+        
+    def on_retriever_end(self, documents, *, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            trace.metadata["document_count"] = len(documents)
+        self._end_run(run_id, documents)
+        
+    def on_retriever_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._end_run(run_id, error=error)
+        
+    # Point-in-time events recorded on the owning run's span
+    def on_agent_action(self, action, *, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            trace.add_event("agent_action", {
+                "tool": getattr(action, "tool", None),
+                "tool_input": getattr(action, "tool_input", None),
+            })
+            
+    def on_agent_finish(self, finish, *, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            trace.add_event("agent_finish", {"return_values": getattr(finish, "return_values", None)})
+            
+    def on_retry(self, retry_state, *, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            trace.add_event("retry", {"attempt": getattr(retry_state, "attempt_number", None)})
+            
+    def on_text(self, text, *, run_id, parent_run_id=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            trace.add_event("text", {"text": text})
+            
+    def on_custom_event(self, name, data, *, run_id, tags=None, metadata=None, **kwargs):
+        trace = self._runs.get(run_id)
+        if trace is not None:
+            trace.add_event(name, {"data": data})
+
+
+def register_global_handler(handler: Optional[FlowScopeCallbackHandler] = None) -> FlowScopeCallbackHandler:
+    """
+    Attach a FlowScope handler to every LangChain run started from the current context.
+    
+    Uses LangChain's configure hooks, so no framework classes are patched. The
+    handler is inherited by child runs and by asyncio tasks created afterwards.
+    
+    Returns:
+        The registered handler
+    """
+    global _configure_hook_registered
+    
+    register_configure_hook = _safe_import('langchain_core.tracers.context', 'register_configure_hook')
+    if register_configure_hook is None:
+        raise ImportError("LangChain not available. Install with: pip install langchain")
+        
+    if not _configure_hook_registered:
+        register_configure_hook(_global_handler_var, True)
+        _configure_hook_registered = True
+        
+    handler = handler or FlowScopeCallbackHandler()
+    _global_handler_var.set(handler)
+    return handler
+
+
+def traced_batch(runnable: Any, inputs: List[Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+    """
+    Batch-aware replacement for runnable.batch(inputs, config).
+    
+    Usage:
+        results = traced_batch(chain, inputs, {"max_concurrency": 8})
+    """
+    handler = _global_handler_var.get() or FlowScopeCallbackHandler()
+    return handler.batch(runnable, inputs, config, **kwargs)
+
+
+async def traced_abatch(runnable: Any, inputs: List[Any], config: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+    """Batch-aware replacement for await runnable.abatch(inputs, config)."""
+    handler = _global_handler_var.get() or FlowScopeCallbackHandler()
+    return await handler.abatch(runnable, inputs, config, **kwargs)
+
+
+def unregister_global_handler():
+    """Stop attaching the global FlowScope handler to new LangChain runs."""
+    _global_handler_var.set(None)
+
+
+__all__ = [
+    'FlowScopeCallbackHandler',
+    'register_global_handler',
+    'unregister_global_handler',
+    'traced_batch',
+    'traced_abatch',
+]
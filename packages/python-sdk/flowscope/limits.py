@@ -0,0 +1,77 @@
+"""
+FlowScope Span Limits
+
+Caps on how much a single span and a single trace can grow, so a runaway
+agent loop or an integration tagging every token cannot exhaust client
+memory or flood the exporter:
+
+- max_tags / max_metadata_keys: further new keys are dropped (existing keys
+  can still be updated); metadata written directly into trace.metadata is
+  trimmed to the first keys when the span finishes
+- max_events: further events are dropped
+- max_children: spans started under a parent that already has this many
+  children are not recorded (start_trace returns None, and trace() yields
+  a NonRecordingSpan)
+- max_spans_per_trace: likewise once a trace tree has this many spans
+
+Each check is a length comparison at capture time. What was dropped is
+counted on the span that lost it, as flowscope.dropped.<kind> tags (tags,
+metadata, events, children); spans refused for the trace budget are
+counted on the trace's root span as flowscope.dropped.spans.
+"""
+
+import weakref
+from typing import Any, Dict, Optional
+
+DEFAULT_SPAN_LIMITS: Dict[str, Any] = {
+    "max_tags": 128,                # Tag keys per span
+    "max_metadata_keys": 128,       # Metadata keys per span
+    "max_events": 256,              # Events per span
+    "max_children": 10_000,         # Direct children per span
+    "max_spans_per_trace": 100_000,  # Spans per trace tree
+}
+
+DROPPED_TAG_PREFIX = "flowscope.dropped."
+
+
+def record_drop(trace: Any, kind: str, count: int = 1):
+    """Count dropped items of a kind on the span that lost them."""
+    key = DROPPED_TAG_PREFIX + kind
+    trace.tags[key] = trace.tags.get(key, 0) + count
+
+
+class TraceBudget:
+    """Spans recorded so far in one trace tree, shared by its registry entries."""
+    
+    __slots__ = ("spans", "root")
+    
+    def __init__(self, root: Any):
+        self.spans = 1
+        self.root = weakref.ref(root)
+
+
+class SpanLimits:
+    """The configured limits, checked by TraceData and the client as spans grow."""
+    
+    def __init__(self, policy: Optional[Dict[str, Any]] = None):
+        self.policy = dict(DEFAULT_SPAN_LIMITS)
+        if policy:
+            self.policy.update(policy)
+        self.max_tags = self._limit("max_tags")
+        self.max_metadata_keys = self._limit("max_metadata_keys")
+        self.max_events = self._limit("max_events")
+        self.max_children = self._limit("max_children")
+        self.max_spans_per_trace = self._limit("max_spans_per_trace")
+        
+    def _limit(self, name: str) -> float:
+        value = self.policy[name]
+        return float("inf") if value is None else max(int(value), 0)
+        
+    def trim_metadata(self, trace: Any):
+        """Drop metadata keys beyond the limit (keys written directly into trace.metadata)."""
+        metadata = trace.metadata
+        excess = len(metadata) - self.max_metadata_keys
+        if excess > 0:
+            for key in list(metadata)[-excess:]:
+                del metadata[key]
+            record_drop(trace, "metadata", excess)
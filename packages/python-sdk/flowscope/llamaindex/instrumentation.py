@@ -0,0 +1,388 @@
+"""
+FlowScope LlamaIndex Instrumentation
+
+Integrates with LlamaIndex's native instrumentation dispatcher instead of
+wrapping individual query engines. Dispatcher spans are turned into FlowScope
+spans for each RAG stage - embedding, retrieval/vector search, postprocessing
+and rerank, synthesis and LLM calls - and dispatcher events attach stage
+metrics (node counts, top-k scores, payload sizes) to the matching span.
+
+Usage:
+    from flowscope.llamaindex.instrumentation import instrument_dispatcher
+    instrument_dispatcher()
+    
+    index.as_query_engine().query("...")  # every stage is traced
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..batch import BatchTrace
+from ..core import FlowScopeClient, TraceData, get_global_client
+from . import _safe_import
+
+_get_dispatcher = _safe_import('llama_index.core.instrumentation', 'get_dispatcher')
+_BaseSpanHandler = _safe_import('llama_index.core.instrumentation.span_handlers', 'BaseSpanHandler')
+_BaseEventHandler = _safe_import('llama_index.core.instrumentation.event_handlers', 'BaseEventHandler')
+_SimpleSpan = _safe_import('llama_index.core.instrumentation.span', 'SimpleSpan')
+
+# Base class name -> RAG stage, checked in MRO order of the instrumented instance
+_STAGE_BASES = {
+    "BaseEmbedding": "embedding",
+    "BaseRetriever": "retrieval",
+    "BaseNodePostprocessor": "postprocess",
+    "BaseSynthesizer": "synthesis",
+    "BaseLLM": "llm",
+    "BaseQueryEngine": "query",
+    "BaseChatEngine": "chat",
+    "BaseAgent": "agent",
+}
+
+_BATCH_EMBEDDING_METHODS = ("get_text_embedding_batch", "aget_text_embedding_batch")
+
+# Number of highest scores recorded for retrieval and rerank results
+_TOP_K_SCORES = 5
+
+
+def _classify(instance: Any, cache: Dict[type, Optional[str]]) -> Optional[str]:
+    """Map an instrumented instance to its RAG stage (cached per class)."""
+    if instance is None:
+        return None
+    cls = type(instance)
+    if cls not in cache:
+        stage = None
+        for base in cls.__mro__:
+            stage = _STAGE_BASES.get(base.__name__)
+            if stage:
+                break
+        if stage == "retrieval" and "Vector" in cls.__name__:
+            stage = "vector_search"
+        elif stage == "postprocess" and "rerank" in cls.__name__.lower():
+            stage = "rerank"
+        cache[cls] = stage
+    return cache[cls]
+
+
+def _node_stats(nodes: Optional[List[Any]]) -> Dict[str, Any]:
+    """Summarize a list of NodeWithScore: count, top-k scores and text size."""
+    nodes = nodes or []
+    scores = sorted((n.score for n in nodes if getattr(n, "score", None) is not None), reverse=True)
+    text_size = 0
+    for node in nodes:
+        get_content = getattr(node, "get_content", None)
+        if get_content is not None:
+            try:
+                text_size += len(get_content())
+            except Exception:
+                pass
+    return {
+        "node_count": len(nodes),
+        "top_scores": scores[:_TOP_K_SCORES],
+        "payload_chars": text_size,
+    }
+
+
+class LlamaIndexDispatcherBridge:
+    """
+    Translates dispatcher span and event callbacks into FlowScope traces.
+    
+    Only spans belonging to a RAG stage are recorded by default; other
+    dispatcher spans are aliased to their nearest recorded ancestor so events
+    and child stages still attach to the right FlowScope span. Spans are
+    parented by the dispatcher's parent IDs alone and kept off the thread's
+    stack, since concurrent async queries interleave on one thread.
+    """
+    
+    def __init__(
+        self,
+        client: Optional[FlowScopeClient] = None,
+        record_all_spans: bool = False,
+        include_inputs: Optional[bool] = None,
+        include_outputs: Optional[bool] = None
+    ):
+        self._client = client
+        self.record_all_spans = record_all_spans
+        self.include_inputs = include_inputs
+        self.include_outputs = include_outputs
+        self._traces: Dict[str, TraceData] = {}
+        self._aliases: Dict[str, Optional[str]] = {}
+        self._batches: Dict[str, BatchTrace] = {}
+        self._batch_items: Dict[str, Deque[TraceData]] = {}
+        self._stage_cache: Dict[type, Optional[str]] = {}
+        
+    @property
+    def client(self) -> FlowScopeClient:
+        return self._client or get_global_client()
+        
+    def _resolve(self, span_id: Optional[str]) -> Optional[str]:
+        """Map a dispatcher span ID to the nearest recorded span ID."""
+        if span_id is None or span_id in self._traces:
+            return span_id
+        return self._aliases.get(span_id)
+        
+    def span_enter(self, id_: str, bound_args: Any, instance: Any = None, parent_id: Optional[str] = None):
+        parent_key = self._resolve(parent_id)
+        stage = _classify(instance, self._stage_cache)
+        
+        parent = self._traces.get(parent_key) if parent_key else None
+        method = id_.rsplit("-", 5)[0].rsplit(".", 1)[-1]
+        
+        # Record the outermost span of each stage only (retrieve -> _retrieve
+        # -> aretrieve chains would otherwise produce nested duplicates)
+        nested_same_stage = (
+            parent is not None and stage is not None
+            and parent.metadata.get("stage") == stage
+            and parent.metadata.get("class") == type(instance).__name__
+        )
+        if (stage is None and not self.record_all_spans) or nested_same_stage:
+            self._aliases[id_] = parent_key
+            return
+            
+        client = self.client
+        class_name = type(instance).__name__ if instance is not None else id_.rsplit("-", 5)[0]
+        metadata = {
+            "framework": "llamaindex",
+            "class": class_name,
+            "method": method,
+            "stage": stage or "other",
+            "dispatcher": True,
+        }
+        trace = client.start_trace(
+            f"llamaindex.{class_name}.{method}",
+            metadata=metadata,
+            parent_id=parent.id if parent else None,
+            detached=True,
+        )
+        if trace is None:
+            self._aliases[id_] = parent_key
+            return
+            
+        include_inputs = self.include_inputs
+        if include_inputs is None:
+            include_inputs = client.config["include_inputs"]
+        arguments = getattr(bound_args, "arguments", None)
+        if include_inputs and arguments:
+            trace.set_input({k: v for k, v in arguments.items() if k != "self"})
+            
+        if stage == "embedding" and method in _BATCH_EMBEDDING_METHODS:
+            texts = arguments.get("texts") if arguments else None
+            size = len(texts) if texts is not None else 0
+            trace.metadata["batch_size"] = size
+            self._batches[id_] = BatchTrace(
+                client, trace, size, getattr(instance, "num_workers", None)
+            )
+            self._batch_items[id_] = deque()
+            
+        self._traces[id_] = trace
+        
+    def span_exit(self, id_: str, result: Any = None, err: Optional[BaseException] = None):
+        trace = self._traces.pop(id_, None)
+        if trace is None:
+            self._aliases.pop(id_, None)
+            return
+            
+        batch = self._batches.pop(id_, None)
+        if batch is not None:
+            for item in self._batch_items.pop(id_, ()):
+                batch.finish_item(item, success=err is None, error=str(err) if err else None)
+            batch.summarize()
+            
+        client = self.client
+        include_outputs = self.include_outputs
+        if include_outputs is None:
+            include_outputs = client.config["include_outputs"]
+        if include_outputs and result is not None:
+            trace.set_output(result)
+            
+        if err is None:
+            client.finish_trace(trace, success=True)
+        else:
+            client.finish_trace(trace, success=False, error=str(err))
+            
+    def handle(self, event: Any):
+        """Attach a dispatcher event's stage metrics to its span."""
+        span_id = getattr(event, "span_id", None)
+        key = self._resolve(span_id)
+        trace = self._traces.get(key) if key else None
+        if trace is None:
+            return
+            
+        name = type(event).__name__
+        metadata = trace.metadata
+        
+        if name == "EmbeddingStartEvent":
+            batch = self._batches.get(key)
+            if batch is not None:
+                # Each embed_batch_size chunk of a bulk call becomes a batch item
+                item = batch.start_item(operation=f"{trace.operation}.chunk", detached=True)
+                if item is not None:
+                    self._batch_items[key].append(item)
+            model = (getattr(event, "model_dict", None) or {}).get("model_name")
+            if model:
+                metadata["model"] = model
+                
+        elif name == "EmbeddingEndEvent":
+            chunks = event.chunks or []
+            embeddings = event.embeddings or []
+            chunk_chars = sum(len(c) for c in chunks)
+            dimensions = len(embeddings[0]) if embeddings else 0
+            metadata["chunk_count"] = metadata.get("chunk_count", 0) + len(chunks)
+            metadata["payload_chars"] = metadata.get("payload_chars", 0) + chunk_chars
+            metadata["embedding_dim"] = dimensions
+            
+            items = self._batch_items.get(key)
+            if items:
+                # Chunks of async batches may finish out of order; they are
+                # matched first-in first-out since events carry no chunk ID
+                item = items.popleft()
+                item.metadata.update({"chunk_count": len(chunks), "payload_chars": chunk_chars})
+                self._batches[key].finish_item(item)
+                
+        elif name == "RetrievalEndEvent":
+            metadata.update(_node_stats(event.nodes))
+            
+        elif name == "ReRankStartEvent":
+            metadata["input_node_count"] = len(event.nodes or [])
+            metadata["top_n"] = event.top_n
+            if event.model_name:
+                metadata["model"] = event.model_name
+                
+        elif name == "ReRankEndEvent":
+            metadata.update(_node_stats(event.nodes))
+            
+        elif name == "GetResponseStartEvent":
+            chunks = event.text_chunks or []
+            metadata["text_chunk_count"] = metadata.get("text_chunk_count", 0) + len(chunks)
+            metadata["prompt_chars"] = metadata.get("prompt_chars", 0) + sum(len(c) for c in chunks)
+            
+        elif name == "SynthesizeEndEvent":
+            response = event.response
+            metadata["source_node_count"] = len(getattr(response, "source_nodes", None) or [])
+            metadata["response_chars"] = len(str(getattr(response, "response", "") or ""))
+            
+        elif name in ("LLMChatEndEvent", "LLMCompletionEndEvent"):
+            raw = getattr(getattr(event, "response", None), "raw", None)
+            usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+            if usage is not None:
+                metadata["token_usage"] = usage if isinstance(usage, dict) else getattr(usage, "__dict__", str(usage))
+                
+        elif name == "ExceptionEvent":
+            trace.add_event("exception", {"error": str(event.exception)})
+
+
+if _BaseSpanHandler is not None and _BaseEventHandler is not None:
+    from pydantic import PrivateAttr
+    
+    class FlowScopeSpanHandler(_BaseSpanHandler[_SimpleSpan]):
+        """Dispatcher span handler forwarding span lifecycle to a FlowScope bridge."""
+        
+        _bridge: Any = PrivateAttr()
+        
+        def __init__(self, bridge: LlamaIndexDispatcherBridge):
+            super().__init__()
+            self._bridge = bridge
+            
+        @classmethod
+        def class_name(cls) -> str:
+            return "FlowScopeSpanHandler"
+            
+        # Spans are tracked by the bridge, so the base class's open_spans
+        # bookkeeping (and its lock) is bypassed entirely
+        def span_enter(self, id_, bound_args, instance=None, parent_id=None, tags=None, **kwargs):
+            self._bridge.span_enter(id_, bound_args, instance, parent_id)
+            
+        def span_exit(self, id_, bound_args, instance=None, result=None, **kwargs):
+            self._bridge.span_exit(id_, result=result)
+            
+        def span_drop(self, id_, bound_args, instance=None, err=None, **kwargs):
+            self._bridge.span_exit(id_, err=err or Exception("span dropped"))
+            
+        def new_span(self, id_, bound_args, instance=None, parent_span_id=None, tags=None, **kwargs):
+            return None
+            
+        def prepare_to_exit_span(self, id_, bound_args, instance=None, result=None, **kwargs):
+            return None
+            
+        def prepare_to_drop_span(self, id_, bound_args, instance=None, err=None, **kwargs):
+            return None
+            
+    class FlowScopeEventHandler(_BaseEventHandler):
+        """Dispatcher event handler forwarding events to a FlowScope bridge."""
+        
+        _bridge: Any = PrivateAttr()
+        
+        def __init__(self, bridge: LlamaIndexDispatcherBridge):
+            super().__init__()
+            self._bridge = bridge
+            
+        @classmethod
+        def class_name(cls) -> str:
+            return "FlowScopeEventHandler"
+            
+        def handle(self, event, **kwargs):
+            self._bridge.handle(event)
+else:
+    FlowScopeSpanHandler = None
+    FlowScopeEventHandler = None
+
+
+# Handlers registered by instrument_dispatcher(), keyed by dispatcher name
+_registered: Dict[str, Tuple[Any, Any, LlamaIndexDispatcherBridge]] = {}
+
+
+def instrument_dispatcher(
+    client: Optional[FlowScopeClient] = None,
+    dispatcher: Any = None,
+    record_all_spans: bool = False
+) -> LlamaIndexDispatcherBridge:
+    """
+    Register FlowScope span and event handlers on a LlamaIndex dispatcher.
+    
+    Args:
+        client: Client to report spans to (the global client by default)
+        dispatcher: Dispatcher to instrument (the root dispatcher by default)
+        record_all_spans: Also record dispatcher spans that are not a RAG stage
+    
+    Returns:
+        The bridge translating dispatcher callbacks into FlowScope traces
+    """
+    if _get_dispatcher is None or FlowScopeSpanHandler is None:
+        raise ImportError("LlamaIndex not available. Install with: pip install llama-index")
+        
+    dispatcher = dispatcher or _get_dispatcher()
+    if dispatcher.name in _registered:
+        return _registered[dispatcher.name][2]
+        
+    bridge = LlamaIndexDispatcherBridge(client, record_all_spans)
+    span_handler = FlowScopeSpanHandler(bridge)
+    event_handler = FlowScopeEventHandler(bridge)
+    dispatcher.add_span_handler(span_handler)
+    dispatcher.add_event_handler(event_handler)
+    _registered[dispatcher.name] = (span_handler, event_handler, bridge)
+    return bridge
+
+
+def uninstrument_dispatcher(dispatcher: Any = None):
+    """Remove FlowScope handlers from a LlamaIndex dispatcher."""
+    if _get_dispatcher is None:
+        return
+        
+    dispatcher = dispatcher or _get_dispatcher()
+    handlers = _registered.pop(dispatcher.name, None)
+    if handlers is None:
+        return
+        
+    span_handler, event_handler, _ = handlers
+    if span_handler in dispatcher.span_handlers:
+        dispatcher.span_handlers.remove(span_handler)
+    if event_handler in dispatcher.event_handlers:
+        dispatcher.event_handlers.remove(event_handler)
+
+
+__all__ = [
+    'LlamaIndexDispatcherBridge',
+    'FlowScopeSpanHandler',
+    'FlowScopeEventHandler',
+    'instrument_dispatcher',
+    'uninstrument_dispatcher',
+]
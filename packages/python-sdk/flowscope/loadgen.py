@@ -0,0 +1,187 @@
+"""
+FlowScope Load Generator
+
+Produces reproducible synthetic trace trees through the real FlowScopeClient
+API at a target span rate, to size exporters and the backend. Trees look like
+agent runs: a root, chain steps, and leaf LLM/retriever/tool calls, with
+configurable depth, fan-out, payload sizes and error rate. A seed makes runs
+repeatable.
+
+The report covers generated and delivered spans/s, export lag (span end to
+arrival, measured by the stand-in ingest server) and the client process's
+CPU usage. With serve=True the stand-in server runs in a subprocess so its
+CPU is not counted against the client.
+
+    flowscope loadgen --rate 2000 --duration 30 --depth 3 --fanout 4 --serve --latency-ms 20
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+DEFAULT_LOAD_CONFIG: Dict[str, Any] = {
+    "rate": 1000.0,          # Target spans per second
+    "duration": 10.0,        # Seconds of generation
+    "depth": 3,              # Levels per tree, root included
+    "fanout": 3,             # Children per non-leaf span
+    "payload_bytes": 512,    # Size of each span's input and output text
+    "error_rate": 0.01,      # Share of leaf spans that fail
+    "seed": 0,
+}
+
+_BRANCH_OPERATIONS = ["langchain.AgentExecutor.invoke", "langchain.LLMChain.invoke", "langchain.RetrievalQA.invoke"]
+_LEAF_OPERATIONS = [
+    ("openai.chat.completions.create", "openai"),
+    ("anthropic.messages.create", "anthropic"),
+    ("llamaindex.BaseRetriever.retrieve", "llamaindex"),
+    ("tool.search", "custom"),
+]
+_WORDS = "the of agent model token context retrieval answer query document vector chain prompt tool".split()
+
+
+class LoadGenerator:
+    """Generates synthetic trace trees through a FlowScopeClient."""
+    
+    def __init__(self, client: Any, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_LOAD_CONFIG)
+        if config:
+            self.config.update(config)
+        self.client = client
+        self.random = random.Random(self.config["seed"])
+        self.depth = max(int(self.config["depth"]), 1)
+        self.fanout = max(int(self.config["fanout"]), 1)
+        self.spans_per_tree = sum(self.fanout ** level for level in range(self.depth))
+        self.spans_generated = 0
+        self.errors_generated = 0
+        self._payloads = [self._text(self.config["payload_bytes"]) for _ in range(16)]
+        
+    def _text(self, size: int) -> str:
+        words: List[str] = []
+        length = 0
+        while length < size:
+            word = self.random.choice(_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)[:size]
+        
+    def _span(self, level: int):
+        client = self.client
+        payload = self.random.choice(self._payloads)
+        if level == self.depth - 1 and level > 0:
+            operation, framework = self.random.choice(_LEAF_OPERATIONS)
+        elif level == 0:
+            operation, framework = "agent.run", "custom"
+        else:
+            operation, framework = self.random.choice(_BRANCH_OPERATIONS), "langchain"
+            
+        trace = client.start_trace(operation, metadata={"framework": framework, "synthetic": True})
+        if trace is not None:
+            trace.set_input({"text": payload})
+        failed = False
+        if level < self.depth - 1:
+            for _ in range(self.fanout):
+                self._span(level + 1)
+        else:
+            failed = self.random.random() < self.config["error_rate"]
+        if trace is not None:
+            trace.set_output({"text": payload})
+            client.finish_trace(trace, success=not failed, error="synthetic failure" if failed else None)
+        self.spans_generated += 1
+        self.errors_generated += failed
+        
+    def generate_tree(self):
+        """One synthetic trace tree (spans_per_tree spans)."""
+        self._span(0)
+        
+    def run(self) -> Dict[str, Any]:
+        """Generate trees at the target rate for the configured duration."""
+        interval = self.spans_per_tree / self.config["rate"]
+        started = time.perf_counter()
+        deadline = started + self.config["duration"]
+        next_tree = started
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_tree:
+                time.sleep(next_tree - now)
+            self.generate_tree()
+            next_tree += interval
+            if time.perf_counter() - next_tree > 1.0:
+                next_tree = time.perf_counter()  # Cannot keep up: do not burst to catch up
+        elapsed = time.perf_counter() - started
+        return {
+            "spans_generated": self.spans_generated,
+            "errors_generated": self.errors_generated,
+            "generation_seconds": round(elapsed, 3),
+            "generated_spans_per_second": round(self.spans_generated / elapsed, 1),
+        }
+
+
+def _fetch_server_stats(url: str) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/stats", timeout=5) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def start_server_process(server_args: List[str]) -> (subprocess.Popen, str):
+    """Start the stand-in ingest server in a subprocess; returns it and its URL."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "flowscope.ingest_server", *server_args],
+        stdout=subprocess.PIPE, text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)},
+    )
+    line = process.stdout.readline()
+    if "listening on" not in line:
+        process.kill()
+        raise RuntimeError("the stand-in ingest server did not start")
+    return process, line.rsplit(" ", 1)[-1].strip()
+
+
+def run_load(config: Dict[str, Any], client_config: Dict[str, Any], drain_timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    Generate load through a new client built from client_config and report
+    throughput, export lag and client CPU. Server-side figures need a
+    stand-in ingest server at the client's backend_url.
+    """
+    from .core import FlowScopeClient
+    
+    client = FlowScopeClient({"verbose": False, "shutdown_hooks": False, **client_config})
+    generator = LoadGenerator(client, config)
+    backend_url = client.config.get("backend_url")
+    before = _fetch_server_stats(backend_url) if backend_url else None
+    
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    report = generator.run()
+    drained = client.shutdown(timeout=drain_timeout)
+    cpu, wall = time.process_time() - cpu_started, time.perf_counter() - wall_started
+    
+    report.update({
+        "drained": drained,
+        "end_to_end_seconds": round(wall, 3),
+        "client_cpu_seconds": round(cpu, 3),
+        "client_cpu_percent": round(100 * cpu / wall, 1),
+        "client_cpu_us_per_span": round(1e6 * cpu / max(generator.spans_generated, 1), 1),
+        "client_stats": dict(client.stats),
+    })
+    after = _fetch_server_stats(backend_url) if backend_url else None
+    if after is not None:
+        delivered = after["spans"] - (before["spans"] if before else 0)
+        report.update({
+            "spans_delivered": delivered,
+            "delivered_spans_per_second": round(delivered / wall, 1),
+            "requests": after["requests"] - (before["requests"] if before else 0),
+            "failures_injected": after["failures_injected"] - (before["failures_injected"] if before else 0),
+            "export_lag_p50_ms": after["lag_p50_ms"],
+            "export_lag_p95_ms": after["lag_p95_ms"],
+            "export_lag_p99_ms": after["lag_p99_ms"],
+            "export_lag_max_ms": after["lag_max_ms"],
+        })
+    return report
@@ -0,0 +1,176 @@
+"""
+FlowScope Payload Capture
+
+Compacts large numeric arrays in captured inputs and outputs. Embedding and
+retrieval calls pass around 1536-dimension float vectors (and lists of them);
+serialized as JSON numbers a single span can reach hundreds of KB. Arrays are
+replaced by a summary of their shape, dtype, norm and a short prefix instead
+of being encoded as JSON.
+"""
+
+import math
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_PAYLOAD_POLICY: Dict[str, Any] = {
+    "summarize_arrays": True,   # Replace numeric arrays with a compact summary
+    "min_array_length": 64,     # Arrays shorter than this are captured as-is
+    "prefix_length": 8,         # Leading values kept in the summary
+    "max_depth": 6,             # How deep nested containers are inspected
+}
+
+_NUMBER_TYPES = (float, int)
+
+
+def _is_float_list(value: Any, min_length: int) -> bool:
+    """Whether value is a list/tuple of at least min_length plain numbers (mostly floats)."""
+    if not isinstance(value, (list, tuple)) or len(value) < min_length:
+        return False
+    # Cheap rejection on the first element before scanning everything
+    if type(value[0]) is not float:
+        return False
+    return all(type(v) in _NUMBER_TYPES for v in value)
+
+
+def _is_array_like(value: Any) -> bool:
+    """Whether value looks like a numpy array or a tensor (0-d scalars excluded)."""
+    if isinstance(value, type) or not hasattr(value, "dtype"):
+        return False
+    shape = getattr(value, "shape", None)
+    return shape is not None and len(shape) > 0
+
+
+def _to_numpy(value: Any) -> Any:
+    """Convert tensor-like objects to a numpy array when that is cheap and possible."""
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return value
+    if hasattr(value, "detach") and hasattr(value, "cpu"):
+        # torch-style tensors
+        try:
+            return value.detach().cpu().numpy()
+        except Exception:
+            return None
+    if hasattr(value, "numpy"):
+        # tensorflow/jax-style tensors
+        try:
+            return value.numpy()
+        except Exception:
+            return None
+    if hasattr(value, "__array__") and numpy is not None:
+        try:
+            return numpy.asarray(value)
+        except Exception:
+            return None
+    return None
+
+
+class PayloadSummarizer:
+    """Applies a payload capture policy to input/output data."""
+    
+    def __init__(self, policy: Optional[Dict[str, Any]] = None):
+        self.policy = dict(DEFAULT_PAYLOAD_POLICY)
+        if policy:
+            self.policy.update(policy)
+        self.min_length = self.policy["min_array_length"]
+        self.prefix_length = self.policy["prefix_length"]
+        self.max_depth = self.policy["max_depth"]
+        
+    def summarize(self, data: Any) -> Any:
+        """
+        Return data with large numeric arrays replaced by summaries.
+        
+        Containers without arrays are returned unchanged (not copied).
+        """
+        if not self.policy["summarize_arrays"]:
+            return data
+        result, _ = self._walk(data, 0)
+        return result
+        
+    def _walk(self, value: Any, depth: int) -> Tuple[Any, bool]:
+        if value is None or isinstance(value, (str, bytes, bool, int, float)):
+            return value, False
+            
+        if _is_array_like(value):
+            return self._summarize_array(value), True
+            
+        if isinstance(value, (list, tuple)):
+            if _is_float_list(value, self.min_length):
+                return self._summarize_list(value), True
+            if value and _is_float_list(value[0], self.min_length) and self._is_matrix(value):
+                return self._summarize_matrix(value), True
+            if depth >= self.max_depth:
+                return value, False
+                
+            changed = False
+            items = []
+            for item in value:
+                new_item, item_changed = self._walk(item, depth + 1)
+                changed = changed or item_changed
+                items.append(new_item)
+            if not changed:
+                return value, False
+            return (items if isinstance(value, list) else tuple(items)), True
+            
+        if isinstance(value, dict):
+            if depth >= self.max_depth:
+                return value, False
+                
+            changed = False
+            items = {}
+            for key, item in value.items():
+                new_item, item_changed = self._walk(item, depth + 1)
+                changed = changed or item_changed
+                items[key] = new_item
+            return (items, True) if changed else (value, False)
+            
+        return value, False
+        
+    def _is_matrix(self, rows: Any) -> bool:
+        """Whether rows is a list of equal-length float lists (e.g. a batch of embeddings)."""
+        width = len(rows[0])
+        return all(len(row) == width and _is_float_list(row, self.min_length) for row in rows)
+        
+    def _summarize_list(self, values: Any) -> Dict[str, Any]:
+        return {
+            "$array": True,
+            "shape": [len(values)],
+            "dtype": "float64",
+            "norm": math.sqrt(math.fsum(v * v for v in values)),
+            "prefix": list(values[:self.prefix_length]),
+        }
+        
+    def _summarize_matrix(self, rows: Any) -> Dict[str, Any]:
+        norms = [math.sqrt(math.fsum(v * v for v in row)) for row in rows]
+        return {
+            "$array": True,
+            "shape": [len(rows), len(rows[0])],
+            "dtype": "float64",
+            "norm": math.sqrt(math.fsum(n * n for n in norms)),
+            "row_norm_min": min(norms),
+            "row_norm_max": max(norms),
+            "prefix": list(rows[0][:self.prefix_length]),
+        }
+        
+    def _summarize_array(self, value: Any) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "$array": True,
+            "type": type(value).__name__,
+            "shape": [int(d) for d in value.shape],
+            "dtype": str(value.dtype),
+        }
+        arr = _to_numpy(value)
+        if arr is None:
+            return summary
+            
+        flat = arr.reshape(-1)
+        summary["prefix"] = flat[:self.prefix_length].tolist()
+        if arr.dtype.kind in "fiuc" and flat.size:
+            numpy = sys.modules["numpy"]
+            summary["norm"] = float(numpy.linalg.norm(flat))
+        return summary
+
+
+def summarize_payload(data: Any, policy: Optional[Dict[str, Any]] = None) -> Any:
+    """Summarize large numeric arrays in data according to policy."""
+    return PayloadSummarizer(policy).summarize(data)
@@ -0,0 +1,193 @@
+"""
+FlowScope Instrumentation Plugins
+
+Declarative descriptions of what auto-instrumentation patches. A plugin
+names the modules it watches and, per class, the methods to wrap, how they
+are called (sync, async, or returning a stream when a flag argument is set)
+and how to read metadata out of requests, responses and stream chunks.
+flowscope.auto applies them, so adding an integration means declaring a
+plugin rather than writing wrappers.
+
+Built-in plugins are imported only when selected, by name:
+
+    langchain, llamaindex   chains, agents, retrievers and query engines
+    openai, anthropic       provider SDK clients: model, prompt/completion
+                            tokens, tokens per second and, for streamed
+                            responses, time to first token
+
+Custom plugins are added with register_plugin().
+"""
+
+import importlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Plugin name -> "module:attribute", imported only when selected
+PLUGINS = {
+    "langchain": "flowscope.plugins.frameworks:LANGCHAIN",
+    "llamaindex": "flowscope.plugins.frameworks:LLAMAINDEX",
+    "openai": "flowscope.plugins.openai:PLUGIN",
+    "anthropic": "flowscope.plugins.anthropic:PLUGIN",
+}
+
+_METHOD_KINDS = ("auto", "sync", "async")
+
+_registered: Dict[str, "InstrumentationPlugin"] = {}
+
+
+class StreamAccumulator:
+    """
+    Collects what a streamed response delivers, chunk by chunk.
+    
+    Plugins subclass it per provider; each traced stream gets a fresh one.
+    """
+    
+    def add(self, chunk: Any) -> bool:
+        """Record a chunk; return True if it carried output (for time to first token)."""
+        return False
+        
+    def metadata(self) -> Dict[str, Any]:
+        """Span metadata gathered from the stream (model, token_usage, token_count...)."""
+        return {}
+        
+    def output(self) -> Any:
+        """The assembled output, recorded as the span's output."""
+        return None
+
+
+class MethodTarget:
+    """Methods of one class to trace, and how."""
+    
+    def __init__(
+        self,
+        cls: str,
+        methods: Sequence[str],
+        module: Optional[str] = None,
+        operation: Optional[str] = None,
+        kind: str = "auto",
+        stream_arg: Optional[str] = None,
+        request_metadata: Optional[Callable[[tuple, dict], Dict[str, Any]]] = None,
+        response_metadata: Optional[Callable[[Any], Dict[str, Any]]] = None,
+        stream_accumulator: Optional[Callable[[], StreamAccumulator]] = None
+    ):
+        """
+        Args:
+            cls: Class name, looked up in every watched module (or only under module)
+            methods: Method names to wrap
+            module: Module name prefix the class must be found under; None matches any watched module
+            operation: Operation name template with {plugin}, {cls} and {method};
+                defaults to "{plugin}.{cls}.{method}"
+            kind: "sync", "async", or "auto" to detect coroutine functions (decorated
+                async methods that hide it need "async")
+            stream_arg: Keyword argument that, when true, makes the call return a stream
+            request_metadata: (args, kwargs) -> metadata recorded when the call starts
+            response_metadata: result -> metadata recorded when the call returns
+            stream_accumulator: Factory of the StreamAccumulator following a streamed result
+        """
+        if kind not in _METHOD_KINDS:
+            raise ValueError(f"Unsupported method kind: {kind!r} (expected one of {', '.join(_METHOD_KINDS)})")
+        self.cls = cls
+        self.methods = list(methods)
+        self.module = module
+        self.operation = operation or "{plugin}.{cls}.{method}"
+        self.kind = kind
+        self.stream_arg = stream_arg
+        self.request_metadata = request_metadata
+        self.response_metadata = response_metadata
+        self.stream_accumulator = stream_accumulator or StreamAccumulator
+        
+    def in_module(self, module_name: str) -> bool:
+        return self.module is None or module_name == self.module or module_name.startswith(self.module + ".")
+
+
+class InstrumentationPlugin:
+    """An integration: the modules it watches and the methods it traces."""
+    
+    def __init__(self, name: str, modules: Sequence[str], targets: Sequence[MethodTarget], framework: Optional[str] = None):
+        """
+        Args:
+            name: Plugin name, used to select it and as the operation prefix
+            modules: Module name prefixes whose imports are instrumented
+            targets: What to trace in them
+            framework: Value of the spans' "framework" metadata (defaults to name)
+        """
+        self.name = name
+        self.modules = tuple(modules)
+        self.targets = list(targets)
+        self.framework = framework or name
+        
+    def watches(self, module_name: str) -> bool:
+        return module_name.startswith(self.modules)
+        
+    def classes_in(self, module: Any) -> List[tuple]:
+        """(class, target) pairs this plugin traces in an imported module."""
+        found = []
+        for target in self.targets:
+            if not target.in_module(module.__name__):
+                continue
+            cls = getattr(module, target.cls, None)
+            if isinstance(cls, type):
+                found.append((cls, target))
+        return found
+        
+    def target_for(self, cls: type, class_name: Optional[str] = None) -> Optional[MethodTarget]:
+        """The target describing cls (by name, preferring one whose module matches)."""
+        class_name = class_name or cls.__name__
+        candidates = [target for target in self.targets if target.cls == class_name]
+        for target in candidates:
+            if target.in_module(getattr(cls, "__module__", "")):
+                return target
+        return candidates[0] if candidates else None
+
+
+def register_plugin(plugin: InstrumentationPlugin):
+    """Register (or replace) a plugin under its name."""
+    _registered[plugin.name] = plugin
+
+
+def get_plugin(name: str) -> InstrumentationPlugin:
+    """Get a plugin by name, importing built-in ones on first use."""
+    plugin = _registered.get(name)
+    if plugin is None:
+        target = PLUGINS.get(name)
+        if target is None:
+            raise ValueError(f"Unknown FlowScope plugin: {name!r} (available: {', '.join(plugin_names())})")
+        module_name, attribute = target.split(":")
+        plugin = _registered[name] = getattr(importlib.import_module(module_name), attribute)
+    return plugin
+
+
+def plugin_names() -> List[str]:
+    """Names of the built-in and registered plugins."""
+    return list(dict.fromkeys([*PLUGINS, *_registered]))
+
+
+def get_field(value: Any, name: str, default: Any = None) -> Any:
+    """A field of an SDK response object or of its dict form."""
+    if isinstance(value, dict):
+        return value.get(name, default)
+    return getattr(value, name, default)
+
+
+def token_usage(prompt_tokens: Any, completion_tokens: Any, total_tokens: Any = None) -> Dict[str, int]:
+    """Normalized token usage, omitting counts the provider did not report."""
+    usage = {}
+    if isinstance(prompt_tokens, int):
+        usage["prompt_tokens"] = prompt_tokens
+    if isinstance(completion_tokens, int):
+        usage["completion_tokens"] = completion_tokens
+    if isinstance(total_tokens, int):
+        usage["total_tokens"] = total_tokens
+    elif usage:
+        usage["total_tokens"] = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return usage
+
+
+__all__ = [
+    'PLUGINS',
+    'InstrumentationPlugin',
+    'MethodTarget',
+    'StreamAccumulator',
+    'register_plugin',
+    'get_plugin',
+    'plugin_names',
+]
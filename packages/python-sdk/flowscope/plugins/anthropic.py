@@ -0,0 +1,110 @@
+"""
+FlowScope Anthropic Plugin
+
+Traces the Anthropic Python SDK's Messages API, sync and async. Spans record
+the requested and served model and token usage (input / output tokens,
+normalized to prompt_tokens / completion_tokens); with stream=True the span
+stays open until the stream is consumed and also records time to first
+token and the number of content deltas (token_count).
+"""
+
+from typing import Any, Dict, List
+
+from . import InstrumentationPlugin, MethodTarget, StreamAccumulator, get_field, token_usage
+
+
+def _request_metadata(args: tuple, kwargs: dict) -> Dict[str, Any]:
+    model = kwargs.get("model")
+    return {"model": model} if isinstance(model, str) else {}
+
+
+def _usage(usage: Any) -> Dict[str, int]:
+    if usage is None:
+        return {}
+    return token_usage(get_field(usage, "input_tokens"), get_field(usage, "output_tokens"))
+
+
+def _response_metadata(result: Any) -> Dict[str, Any]:
+    metadata = {}
+    model = get_field(result, "model")
+    if isinstance(model, str):
+        metadata["response_model"] = model
+    usage = _usage(get_field(result, "usage"))
+    if usage:
+        metadata["token_usage"] = usage
+    stop_reason = get_field(result, "stop_reason")
+    if isinstance(stop_reason, str):
+        metadata["stop_reason"] = stop_reason
+    return metadata
+
+
+class AnthropicStream(StreamAccumulator):
+    """Follows message_start / content_block_delta / message_delta stream events."""
+    
+    def __init__(self):
+        self.model = None
+        self.input_tokens = None
+        self.output_tokens = None
+        self.stop_reason = None
+        self.deltas = 0
+        self.text: List[str] = []
+        
+    def add(self, event: Any) -> bool:
+        event_type = get_field(event, "type")
+        if event_type == "content_block_delta":
+            delta = get_field(event, "delta")
+            text = get_field(delta, "text")
+            if text:
+                self.text.append(text)
+            if text or get_field(delta, "partial_json"):
+                self.deltas += 1
+                return True
+        elif event_type == "message_start":
+            message = get_field(event, "message")
+            self.model = get_field(message, "model")
+            usage = get_field(message, "usage")
+            self.input_tokens = get_field(usage, "input_tokens")
+            self.output_tokens = get_field(usage, "output_tokens")
+        elif event_type == "message_delta":
+            # Output tokens are cumulative
+            output_tokens = get_field(get_field(event, "usage"), "output_tokens")
+            if output_tokens is not None:
+                self.output_tokens = output_tokens
+            stop_reason = get_field(get_field(event, "delta"), "stop_reason")
+            if stop_reason:
+                self.stop_reason = stop_reason
+        return False
+        
+    def metadata(self) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {"token_count": self.deltas}
+        if self.model:
+            metadata["response_model"] = self.model
+        usage = token_usage(self.input_tokens, self.output_tokens)
+        if usage:
+            metadata["token_usage"] = usage
+        if self.stop_reason:
+            metadata["stop_reason"] = self.stop_reason
+        return metadata
+        
+    def output(self) -> Any:
+        return "".join(self.text) if self.text else None
+
+
+# The SDK's argument-checking decorator hides coroutine functions, hence explicit kinds
+PLUGIN = InstrumentationPlugin(
+    "anthropic",
+    modules=["anthropic.resources"],
+    targets=[
+        MethodTarget(
+            cls, ["create"],
+            module="anthropic.resources.messages",
+            operation="anthropic.messages.{method}",
+            kind=kind,
+            stream_arg="stream",
+            request_metadata=_request_metadata,
+            response_metadata=_response_metadata,
+            stream_accumulator=AnthropicStream,
+        )
+        for cls, kind in (("Messages", "sync"), ("AsyncMessages", "async"))
+    ],
+)
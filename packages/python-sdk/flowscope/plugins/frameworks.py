@@ -0,0 +1,45 @@
+"""
+FlowScope Framework Plugins
+
+Auto-instrumentation of LangChain and LlamaIndex: the chains, agents,
+retrievers and query engines whose entry points are traced. Operations are
+named "<plugin>.<class>.<method>", e.g. "langchain.LLMChain.run". For
+token-level detail from LangChain, use the callback handler in
+flowscope.langchain.callbacks instead.
+"""
+
+from . import InstrumentationPlugin, MethodTarget
+
+# Entry points of classes without a more specific list
+_DEFAULT_METHODS = ["run", "call", "invoke", "query"]
+
+LANGCHAIN = InstrumentationPlugin(
+    "langchain",
+    modules=["langchain"],
+    targets=[
+        MethodTarget("LLMChain", ["run", "call", "invoke", "arun", "acall", "ainvoke"]),
+        MethodTarget("ConversationChain", ["run", "predict", "call", "invoke"]),
+        MethodTarget("RetrievalQA", ["run", "call", "invoke"]),
+        MethodTarget("AgentExecutor", ["run", "call", "invoke"]),
+        MethodTarget("VectorStoreRetriever", _DEFAULT_METHODS),
+        MethodTarget("Agent", _DEFAULT_METHODS),
+        MethodTarget("BaseLanguageModel", _DEFAULT_METHODS),
+        MethodTarget("BaseLLM", _DEFAULT_METHODS),
+        MethodTarget("BaseChain", _DEFAULT_METHODS),
+    ],
+)
+
+LLAMAINDEX = InstrumentationPlugin(
+    "llamaindex",
+    modules=["llama_index", "llamaindex"],
+    targets=[
+        MethodTarget("VectorStoreIndex", ["query", "as_query_engine", "as_retriever"]),
+        MethodTarget("QueryEngine", ["query", "aquery"]),
+        MethodTarget("BaseRetriever", ["retrieve", "aretrieve"]),
+        MethodTarget("ListIndex", _DEFAULT_METHODS),
+        MethodTarget("RetrieverQueryEngine", _DEFAULT_METHODS),
+        MethodTarget("BaseQueryEngine", _DEFAULT_METHODS),
+        MethodTarget("LLMPredictor", _DEFAULT_METHODS),
+        MethodTarget("ServiceContext", _DEFAULT_METHODS),
+    ],
+)
@@ -0,0 +1,135 @@
+"""
+FlowScope OpenAI Plugin
+
+Traces the OpenAI Python SDK (v1 clients): chat completions, legacy
+completions, embeddings and the Responses API, sync and async. Spans record
+the requested and served model and token usage normalized to
+prompt_tokens / completion_tokens / total_tokens; with stream=True the span
+stays open until the stream is consumed and also records time to first
+token and the number of content chunks (token_count). Chat streams report
+exact usage only when requested with stream_options={"include_usage": True}.
+"""
+
+from typing import Any, Dict, List
+
+from . import InstrumentationPlugin, MethodTarget, StreamAccumulator, get_field, token_usage
+
+
+def _request_metadata(args: tuple, kwargs: dict) -> Dict[str, Any]:
+    model = kwargs.get("model")
+    return {"model": model} if isinstance(model, str) else {}
+
+
+def _usage(usage: Any) -> Dict[str, int]:
+    if usage is None:
+        return {}
+    # Chat and legacy completions / embeddings, then the Responses API
+    prompt = get_field(usage, "prompt_tokens", get_field(usage, "input_tokens"))
+    completion = get_field(usage, "completion_tokens", get_field(usage, "output_tokens"))
+    return token_usage(prompt, completion, get_field(usage, "total_tokens"))
+
+
+def _response_metadata(result: Any) -> Dict[str, Any]:
+    metadata = {}
+    model = get_field(result, "model")
+    if isinstance(model, str):
+        metadata["response_model"] = model
+    usage = _usage(get_field(result, "usage"))
+    if usage:
+        metadata["token_usage"] = usage
+    return metadata
+
+
+class OpenAIStream(StreamAccumulator):
+    """Follows chat / legacy completion chunks and Responses API stream events."""
+    
+    def __init__(self):
+        self.model = None
+        self.usage: Dict[str, int] = {}
+        self.chunks = 0
+        self.text: List[str] = []
+        
+    def add(self, chunk: Any) -> bool:
+        event_type = get_field(chunk, "type")
+        if isinstance(event_type, str) and event_type.startswith("response."):
+            return self._add_event(event_type, chunk)
+            
+        model = get_field(chunk, "model")
+        if model:
+            self.model = model
+        usage = get_field(chunk, "usage")
+        if usage is not None:
+            self.usage = _usage(usage)
+            
+        content = False
+        for choice in get_field(chunk, "choices") or ():
+            if get_field(choice, "index", 0) != 0:
+                continue
+            delta = get_field(choice, "delta")
+            text = get_field(delta, "content") if delta is not None else get_field(choice, "text")
+            if text:
+                self.text.append(text)
+                content = True
+            elif delta is not None and get_field(delta, "tool_calls"):
+                content = True
+        if content:
+            self.chunks += 1
+        return content
+        
+    def _add_event(self, event_type: str, event: Any) -> bool:
+        if event_type == "response.output_text.delta":
+            delta = get_field(event, "delta")
+            if delta:
+                self.text.append(delta)
+                self.chunks += 1
+                return True
+        elif event_type in ("response.created", "response.completed", "response.incomplete", "response.failed"):
+            response = get_field(event, "response")
+            model = get_field(response, "model")
+            if model:
+                self.model = model
+            usage = _usage(get_field(response, "usage"))
+            if usage:
+                self.usage = usage
+        return False
+        
+    def metadata(self) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {"token_count": self.chunks}
+        if self.model:
+            metadata["response_model"] = self.model
+        if self.usage:
+            metadata["token_usage"] = self.usage
+        return metadata
+        
+    def output(self) -> Any:
+        return "".join(self.text) if self.text else None
+
+
+def _target(cls: str, module: str, operation: str, kind: str, stream: bool = True) -> MethodTarget:
+    return MethodTarget(
+        cls, ["create"],
+        module=module,
+        operation=operation,
+        kind=kind,
+        stream_arg="stream" if stream else None,
+        request_metadata=_request_metadata,
+        response_metadata=_response_metadata,
+        stream_accumulator=OpenAIStream,
+    )
+
+
+# The SDK's argument-checking decorator hides coroutine functions, hence explicit kinds
+PLUGIN = InstrumentationPlugin(
+    "openai",
+    modules=["openai.resources"],
+    targets=[
+        _target("Completions", "openai.resources.chat", "openai.chat.completions.{method}", "sync"),
+        _target("AsyncCompletions", "openai.resources.chat", "openai.chat.completions.{method}", "async"),
+        _target("Completions", "openai.resources.completions", "openai.completions.{method}", "sync"),
+        _target("AsyncCompletions", "openai.resources.completions", "openai.completions.{method}", "async"),
+        _target("Embeddings", "openai.resources.embeddings", "openai.embeddings.{method}", "sync", stream=False),
+        _target("AsyncEmbeddings", "openai.resources.embeddings", "openai.embeddings.{method}", "async", stream=False),
+        _target("Responses", "openai.resources.responses", "openai.responses.{method}", "sync"),
+        _target("AsyncResponses", "openai.resources.responses", "openai.responses.{method}", "async"),
+    ],
+)
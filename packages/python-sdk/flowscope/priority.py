@@ -0,0 +1,49 @@
+"""
+FlowScope Export Priority
+
+Decides which finished spans take the express lane: exported within
+milliseconds in small batches, instead of waiting in the routine buffer for
+batch_size spans to accumulate. Errors are what someone is usually looking
+for while a run is still going, and what is lost when a process dies with a
+half-full buffer.
+
+A span is expedited when its status, operation or tags match the policy,
+or when it is an ancestor of such a span (so the error arrives with the
+chain of calls that led to it).
+"""
+
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional
+
+DEFAULT_PRIORITY_POLICY: Dict[str, Any] = {
+    "statuses": ["error", "abandoned"],       # Span statuses that are expedited
+    "operations": [],                         # Operation name patterns (fnmatch) that are expedited
+    "tags": {"flowscope.priority": "high"},   # Tag -> value that expedites a span; None matches any value
+    "include_ancestors": True,                # Also expedite the ancestors of expedited spans
+    "batch_size": 20,                         # Spans per express export
+    "linger": 0.05,                           # Seconds to wait for related spans before an express export
+}
+
+
+class PriorityPolicy:
+    """Matches finished spans against the configured express-lane rules."""
+
+    def __init__(self, policy: Optional[Dict[str, Any]] = None):
+        self.policy = dict(DEFAULT_PRIORITY_POLICY)
+        if policy:
+            self.policy.update(policy)
+        self.statuses = frozenset(self.policy["statuses"] or ())
+        self.operations = tuple(self.policy["operations"] or ())
+        self.tags = dict(self.policy["tags"] or {})
+        self.include_ancestors = bool(self.policy["include_ancestors"])
+        self.batch_size = max(int(self.policy["batch_size"]), 1)
+        self.linger = self.policy["linger"]
+
+    def matches(self, trace: Any) -> bool:
+        """Whether a finished span should be expedited on its own merits."""
+        if trace.status in self.statuses:
+            return True
+        for key, value in self.tags.items():
+            if key in trace.tags and (value is None or trace.tags[key] == value):
+                return True
+        return any(fnmatchcase(trace.operation, pattern) for pattern in self.operations)
@@ -0,0 +1,155 @@
+"""
+FlowScope Sampling Profiler
+
+Shows where the time went inside slow spans without profiling the whole
+process. A background thread periodically samples the Python stacks of only
+those threads that have a span open for longer than a threshold, using
+sys._current_frames(), which reads the other threads' frames without
+instrumenting them. When a sampled span finishes, its aggregated folded
+stacks are attached to it as metadata["profile"].
+
+Each sample is attributed to every open span of the sampled thread that has
+exceeded the threshold, so a long parent's profile includes the work done in
+its children. With asyncio, spans of tasks interleaved on one event loop
+share the loop thread's samples.
+
+The sampler stretches its interval so its own CPU usage stays below
+max_overhead (a fraction of one core).
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .core import SpanProcessor
+
+DEFAULT_PROFILER_CONFIG: Dict[str, Any] = {
+    "threshold_ms": 100.0,   # Only threads with a span open longer than this are sampled
+    "interval_ms": 10.0,     # Target time between samples
+    "max_overhead": 0.02,    # Maximum share of one CPU the sampler may use
+    "max_depth": 64,         # Frames kept per stack (innermost first)
+    "max_stacks": 500,       # Distinct stacks kept per span; the rest count as "[truncated]"
+}
+
+_TRUNCATED = "[truncated]"
+_MAX_LABELS = 10000  # Cached frame labels; the cache starts over when full
+
+
+class SamplingProfiler(SpanProcessor):
+    """Span processor sampling the stacks of threads running long spans."""
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_PROFILER_CONFIG)
+        if config:
+            self.config.update(config)
+        self.threshold = self.config["threshold_ms"] / 1000
+        self.interval = self.config["interval_ms"] / 1000
+        self.max_overhead = self.config["max_overhead"]
+        self.max_depth = self.config["max_depth"]
+        self.max_stacks = self.config["max_stacks"]
+        if not 0 < self.max_overhead <= 1:
+            raise ValueError(f"max_overhead must be in (0, 1], got {self.max_overhead!r}")
+            
+        self._lock = threading.Lock()
+        self._open: Dict[str, Tuple[int, float]] = {}       # span ID -> (thread ID, start time)
+        self._samples: Dict[str, Dict[str, int]] = {}       # span ID -> folded stack -> count
+        self._labels: Dict[Tuple[str, Any], str] = {}       # (file name, code object) -> frame label
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.samples_taken = 0
+        self.sampler_time = 0.0  # Seconds spent sampling, for overhead accounting
+        
+    def on_start(self, trace: Any):
+        with self._lock:
+            was_idle = not self._open
+            self._open[trace.id] = (threading.get_ident(), time.time())
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="flowscope-profiler", daemon=True)
+                self._thread.start()
+        if was_idle:
+            self._wakeup.set()
+        
+    def on_end(self, trace: Any):
+        with self._lock:
+            self._open.pop(trace.id, None)
+            stacks = self._samples.pop(trace.id, None)
+        if stacks:
+            trace.metadata["profile"] = {
+                "samples": sum(stacks.values()),
+                "interval_ms": self.config["interval_ms"],
+                "stacks": stacks,
+            }
+            
+    def shutdown(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+            
+    def _label(self, code: Any) -> str:
+        # Equal code objects may come from different files
+        key = (code.co_filename, code)
+        label = self._labels.get(key)
+        if label is None:
+            if len(self._labels) >= _MAX_LABELS:
+                self._labels.clear()
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = self._labels[key] = f"{module}:{code.co_name}".replace(";", ":")
+        return label
+        
+    def _folded_stack(self, frame: Any) -> str:
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+        
+    def _sample(self):
+        """Take one sample of every thread running a span past the threshold."""
+        cutoff = time.time() - self.threshold
+        targets: Dict[int, list] = {}
+        with self._lock:
+            for span_id, (thread_id, started) in self._open.items():
+                if started <= cutoff:
+                    targets.setdefault(thread_id, []).append(span_id)
+        if not targets:
+            return
+            
+        frames = sys._current_frames()
+        stacks = {}
+        for thread_id in targets:
+            frame = frames.get(thread_id)
+            if frame is not None:
+                stacks[thread_id] = self._folded_stack(frame)
+        del frames
+        
+        with self._lock:
+            for thread_id, stack in stacks.items():
+                for span_id in targets[thread_id]:
+                    if span_id not in self._open:
+                        continue  # Finished while we were sampling
+                    counts = self._samples.setdefault(span_id, {})
+                    key = stack if stack in counts or len(counts) < self.max_stacks else _TRUNCATED
+                    counts[key] = counts.get(key, 0) + 1
+            self.samples_taken += 1
+            
+    def _run(self):
+        while not self._stopped:
+            with self._lock:
+                idle = not self._open
+                if idle:
+                    self._wakeup.clear()
+            if idle:
+                self._wakeup.wait()
+                continue
+                
+            started = time.perf_counter()
+            self._sample()
+            elapsed = time.perf_counter() - started
+            self.sampler_time += elapsed
+            # Sleep long enough that sampling stays within max_overhead of one CPU
+            time.sleep(max(self.interval, elapsed * (1 / self.max_overhead - 1)))
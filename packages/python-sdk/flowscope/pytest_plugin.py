@@ -0,0 +1,384 @@
+"""
+FlowScope pytest Plugin
+
+Latency budgets and performance regression checks for traced code, loaded
+automatically once flowscope is installed.
+
+The flowscope_spans fixture captures every span finished during a test and
+points the global client at an in-memory exporter, so nothing leaves the
+process. Spans are checked in the test itself or with markers:
+
+    @pytest.mark.flowscope_budget("langchain.RetrievalQA.invoke", p95=800, runs=20)
+    @pytest.mark.flowscope_max_calls("*.BaseLLM.*", 3)   # per request (trace)
+    def test_qa(flowscope_spans):
+        qa.invoke({"query": "..."})
+
+With --flowscope-baseline FILE, the span durations and call counts of
+every test using the fixture are compared with those stored by an earlier
+run (--flowscope-update-baseline writes them). An operation regresses when
+its median duration grew beyond the tolerance and a one-sided Mann-Whitney U
+test finds the slowdown significant, or when it is called more often per
+run. A failing test prints a per-operation diff.
+"""
+
+import json
+import math
+import os
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Sequence
+
+import pytest
+
+MAX_BASELINE_SAMPLES = 200   # Durations stored per operation and test
+MIN_TEST_SAMPLES = 5         # Fewer samples on either side skip the significance test
+
+_RECORDER = pytest.StashKey["SpanRecorder"]()
+_BASELINE = pytest.StashKey[Dict[str, Any]]()
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """The q-th percentile (0-100) with linear interpolation, or None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def mann_whitney_greater(current: Sequence[float], baseline: Sequence[float]) -> float:
+    """
+    One-sided p-value that current tends to be larger than baseline.
+    
+    Mann-Whitney U with the normal approximation and tie correction, which
+    suits latency samples: no normality assumption, robust to outliers.
+    """
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1  # Average rank of the tied run
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum += rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        i = j + 1
+        
+    n = n1 + n2
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+class SpanRecorder:
+    """Spans finished during one test, with budget assertions (durations in ms)."""
+    
+    def __init__(self, client: Any, exporter: Any):
+        self.client = client
+        self.exporter = exporter    # The in-memory exporter installed for the test
+        self.runs = 1               # Test body executions (flowscope_budget runs=)
+        self._finished: List[Any] = []
+        
+    # SpanProcessor hooks (duck-typed so the core is only imported by the fixture)
+    
+    def on_start(self, trace: Any):
+        pass
+        
+    def on_end(self, trace: Any):
+        self._finished.append(trace)
+        
+    def shutdown(self):
+        pass
+        
+    def spans(self, operation: Optional[str] = None) -> List[Any]:
+        """Finished spans, optionally only those whose operation matches a pattern."""
+        if operation is None:
+            return list(self._finished)
+        return [span for span in self._finished if fnmatchcase(span.operation, operation)]
+        
+    def durations(self, operation: Optional[str] = None) -> List[float]:
+        return [span.duration for span in self.spans(operation) if span.duration is not None]
+        
+    def percentile(self, operation: Optional[str], q: float) -> Optional[float]:
+        return _percentile(self.durations(operation), q)
+        
+    def count(self, operation: Optional[str] = None) -> int:
+        return len(self.spans(operation))
+        
+    def clear(self):
+        self._finished = []
+        
+    def repeat(self, n: int, func, *args, **kwargs) -> List[Any]:
+        """Call func n times, to gather enough samples for percentiles; returns the results."""
+        return [func(*args, **kwargs) for _ in range(n)]
+        
+    def assert_latency(
+        self,
+        operation: str,
+        p50: Optional[float] = None,
+        p95: Optional[float] = None,
+        p99: Optional[float] = None,
+        max: Optional[float] = None,
+    ):
+        """Fail if a duration percentile of the matching spans exceeds its budget."""
+        durations = self.durations(operation)
+        if not durations:
+            raise AssertionError(f"No finished spans match {operation!r}")
+        failures = []
+        for name, q, budget in (("p50", 50, p50), ("p95", 95, p95), ("p99", 99, p99), ("max", 100, max)):
+            if budget is not None:
+                value = _percentile(durations, q)
+                if value > budget:
+                    failures.append(f"{name} {value:.1f}ms > {budget:g}ms")
+        if failures:
+            raise AssertionError(
+                f"Latency budget exceeded for {operation!r} over {len(durations)} span(s): {', '.join(failures)}"
+            )
+            
+    def assert_max_calls(self, operation: str, limit: int, per: Optional[str] = "trace"):
+        """
+        Fail if more than limit spans match operation, per request ("trace":
+        per tree of spans) or in total (per=None).
+        """
+        matching = self.spans(operation)
+        if per is None:
+            groups = {"total": matching}
+        elif per == "trace":
+            groups = {}
+            for span in matching:
+                groups.setdefault(getattr(span, "trace_id", span.id), []).append(span)
+        else:
+            raise ValueError(f"Unsupported grouping: {per!r} (expected 'trace' or None)")
+        worst = max(groups.items(), key=lambda item: len(item[1]), default=(None, []))
+        if len(worst[1]) > limit:
+            scope = "in total" if per is None else f"in trace {worst[0]}"
+            raise AssertionError(f"{len(worst[1])} calls to {operation!r} {scope}, limit is {limit}")
+            
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-operation durations and calls per run, as stored in baselines."""
+        by_operation: Dict[str, List[float]] = {}
+        for span in self._finished:
+            if span.duration is not None:
+                by_operation.setdefault(span.operation, []).append(span.duration)
+        summary = {}
+        for operation, durations in sorted(by_operation.items()):
+            calls = len(durations)
+            durations.sort()
+            if calls > MAX_BASELINE_SAMPLES:
+                step = calls / MAX_BASELINE_SAMPLES
+                durations = [durations[int(i * step)] for i in range(MAX_BASELINE_SAMPLES)]
+            summary[operation] = {
+                "calls_per_run": calls / self.runs,
+                "durations": [round(d, 3) for d in durations],
+            }
+        return summary
+
+
+def compare_to_baseline(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = 0.2,
+    alpha: float = 0.01,
+    min_delta_ms: float = 1.0,
+) -> List[Dict[str, Any]]:
+    """
+    Per-operation comparison rows with a "verdict": ok, slower, more_calls,
+    new or missing. Latency regresses when the median grew by more than
+    tolerance (a fraction) and min_delta_ms, and, given MIN_TEST_SAMPLES on
+    both sides, the Mann-Whitney test is significant at alpha.
+    """
+    rows = []
+    for operation in sorted(set(current) | set(baseline)):
+        now, before = current.get(operation), baseline.get(operation)
+        row = {"operation": operation, "verdict": "ok"}
+        if before is None:
+            row["verdict"] = "new"
+        elif now is None:
+            row["verdict"] = "missing"
+        if now is not None:
+            row.update(calls=now["calls_per_run"], p50=_percentile(now["durations"], 50), p95=_percentile(now["durations"], 95))
+        if before is not None:
+            row.update(
+                base_calls=before["calls_per_run"],
+                base_p50=_percentile(before["durations"], 50),
+                base_p95=_percentile(before["durations"], 95),
+            )
+        if now is not None and before is not None:
+            if now["calls_per_run"] > before["calls_per_run"] * (1 + tolerance) + 1e-9:
+                row["verdict"] = "more_calls"
+            elif row["p50"] is not None and row["base_p50"] is not None:
+                grew = row["p50"] > row["base_p50"] * (1 + tolerance) and row["p50"] - row["base_p50"] > min_delta_ms
+                if grew and min(len(now["durations"]), len(before["durations"])) >= MIN_TEST_SAMPLES:
+                    row["p_value"] = mann_whitney_greater(now["durations"], before["durations"])
+                    grew = row["p_value"] < alpha
+                if grew:
+                    row["verdict"] = "slower"
+        rows.append(row)
+    return rows
+
+
+def format_diff(rows: List[Dict[str, Any]]) -> str:
+    """A text table of baseline comparison rows."""
+    def ms(value):
+        return "-" if value is None else f"{value:.1f}"
+        
+    def calls(value):
+        return "-" if value is None else f"{value:g}"
+        
+    table = [("operation", "calls", "base", "p50 ms", "base", "p95 ms", "base", "change", "verdict")]
+    for row in rows:
+        change = "-"
+        if row.get("p50") is not None and row.get("base_p50"):
+            change = f"{(row['p50'] / row['base_p50'] - 1) * 100:+.0f}%"
+        table.append((
+            row["operation"], calls(row.get("calls")), calls(row.get("base_calls")),
+            ms(row.get("p50")), ms(row.get("base_p50")), ms(row.get("p95")), ms(row.get("base_p95")),
+            change, row["verdict"].upper() if row["verdict"] in ("slower", "more_calls") else row["verdict"],
+        ))
+    widths = [max(len(r[i]) for r in table) for i in range(len(table[0]))]
+    return "\n".join("  ".join(cell.ljust(w) for cell, w in zip(r, widths)).rstrip() for r in table)
+
+
+# Hooks
+
+def pytest_addoption(parser):
+    group = parser.getgroup("flowscope", "FlowScope performance checks")
+    group.addoption("--flowscope-baseline", metavar="FILE", help="Compare span durations and call counts with this baseline file")
+    group.addoption("--flowscope-update-baseline", action="store_true", help="Write the measured spans to the baseline file instead of comparing")
+    group.addoption("--flowscope-tolerance", type=float, default=0.2, help="Allowed relative slowdown of median durations (default: 0.2)")
+    group.addoption("--flowscope-alpha", type=float, default=0.01, help="Significance level of the regression test (default: 0.01)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "flowscope_budget(operation, p50=None, p95=None, p99=None, max=None, runs=1): "
+        "fail if span duration percentiles (ms) of operation exceed the budget, over `runs` executions of the test",
+    )
+    config.addinivalue_line(
+        "markers",
+        "flowscope_max_calls(operation, limit, per='trace'): fail if operation is called more than limit times per trace",
+    )
+    path = config.getoption("flowscope_baseline")
+    if path:
+        baseline = {"version": 1, "tests": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                baseline = json.load(f)
+        config.stash[_BASELINE] = baseline
+
+
+def pytest_collection_modifyitems(items):
+    # Marked tests get the recorder without having to request the fixture
+    for item in items:
+        if item.get_closest_marker("flowscope_budget") or item.get_closest_marker("flowscope_max_calls"):
+            if "flowscope_spans" not in item.fixturenames:
+                item.fixturenames.append("flowscope_spans")
+
+
+@pytest.fixture
+def flowscope_spans(request):
+    """Spans finished during the test, captured from the global FlowScope client."""
+    from .core import get_global_client
+    from .exporters.memory import InMemoryExporter
+    
+    client = get_global_client()
+    exporter = InMemoryExporter()
+    recorder = SpanRecorder(client, exporter)
+    swapped = {"exporter": exporter, "auto_flush": False, "disabled": False, "verbose": False}
+    previous = {key: client.config[key] for key in swapped}
+    client.configure(swapped)
+    client.add_span_processor(recorder)
+    request.node.stash[_RECORDER] = recorder
+    try:
+        yield recorder
+    finally:
+        client.remove_span_processor(recorder)
+        client.flush()  # Spans of this test go to its in-memory exporter
+        client.configure(previous)
+
+
+def _call_args(item) -> Dict[str, Any]:
+    return {name: item.funcargs[name] for name in item._fixtureinfo.argnames}
+
+
+def _fail(outcome, message: str):
+    """Fail the test from the hook wrapper below."""
+    failure = pytest.fail.Exception(message, pytrace=False)
+    if hasattr(outcome, "force_exception"):  # pluggy >= 1.1; raising from an old-style wrapper warns there
+        outcome.force_exception(failure)
+    else:
+        raise failure
+
+
+# An old-style wrapper: new-style ones (wrapper=True) need pluggy >= 1.1, which
+# pytest only requires from 8.0, and would break every pytest run before that
+@pytest.hookimpl(hookwrapper=True)
+def pytest_pyfunc_call(pyfuncitem):
+    recorder: Optional[SpanRecorder] = pyfuncitem.stash.get(_RECORDER, None)
+    budgets = list(pyfuncitem.iter_markers("flowscope_budget"))
+    runs = max([marker.kwargs.get("runs", 1) for marker in budgets] or [1])
+    if recorder is not None and runs > 1:
+        import inspect
+        if inspect.iscoroutinefunction(pyfuncitem.obj):
+            raise pytest.UsageError("flowscope_budget(runs=...) needs a synchronous test; repeat the call inside async tests")
+        recorder.runs = runs
+        for _ in range(runs - 1):
+            pyfuncitem.obj(**_call_args(pyfuncitem))
+            
+    outcome = yield
+    if recorder is None or outcome.excinfo is not None:
+        return
+        
+    failure = None
+    try:
+        for marker in budgets:
+            limits = {key: marker.kwargs.get(key) for key in ("p50", "p95", "p99", "max")}
+            recorder.assert_latency(marker.args[0], **limits)
+        for marker in pyfuncitem.iter_markers("flowscope_max_calls"):
+            recorder.assert_max_calls(*marker.args, **marker.kwargs)
+    except AssertionError as e:
+        failure = str(e)
+    if failure is not None:
+        _fail(outcome, failure)
+        return
+        
+    config = pyfuncitem.config
+    baseline = config.stash.get(_BASELINE, None)
+    if baseline is not None:
+        summary = recorder.summary()
+        if config.getoption("flowscope_update_baseline"):
+            baseline["tests"][pyfuncitem.nodeid] = summary
+        elif pyfuncitem.nodeid in baseline["tests"]:
+            rows = compare_to_baseline(
+                summary, baseline["tests"][pyfuncitem.nodeid],
+                tolerance=config.getoption("flowscope_tolerance"), alpha=config.getoption("flowscope_alpha"),
+            )
+            if any(row["verdict"] in ("slower", "more_calls") for row in rows):
+                _fail(outcome, "Performance regression against the FlowScope baseline:\n" + format_diff(rows))
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    baseline = config.stash.get(_BASELINE, None)
+    if baseline is None or not config.getoption("flowscope_update_baseline"):
+        return
+    if hasattr(config, "workerinput"):
+        return  # pytest-xdist workers would overwrite each other's results; update baselines without -n
+    path = config.getoption("flowscope_baseline")
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -0,0 +1,450 @@
+"""
+FlowScope Flight Recorder
+
+An always-on, in-process ring buffer of the most recently finished spans, for
+looking at what a process was doing when an incident happened. It records
+every span as it finishes, before compaction folds it or an exporter drops
+it, in compact form: the flat record of trace_to_record(), JSON-encoded once,
+with payloads clipped when a record would exceed max_record_bytes.
+
+Memory is capped at max_bytes (encoded records plus a fixed per-span
+overhead estimate); the oldest spans are evicted first, as are spans older
+than window seconds. Recent spans are indexed by operation, session and
+status:
+
+    recorder = client.get_flight_recorder()
+    recorder.query(operation="openai.chat.completions.create", status="error")
+    recorder.summary()
+    recorder.dump()            # -> path of an NDJSON.gz span file
+
+Dumps are regular span files, so `flowscope analyze` reads them. They are
+also written automatically when error_burst failed spans finish within
+error_window seconds (at most once per dump_cooldown), and on the configured
+signal (SIGUSR1 by default). With http_port set, a localhost endpoint serves:
+
+    GET  /spans?operation=&session_id=&status=&since=&until=&limit=
+    GET  /summary
+    POST /dump
+"""
+
+import gzip
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .core import SpanProcessor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_RECORDER_CONFIG: Dict[str, Any] = {
+    "max_bytes": 8 * 1024 * 1024,   # Memory cap for recorded spans (encoded size plus per-span overhead)
+    "window": 300.0,                # Seconds a span is kept after it finished; None keeps until evicted by size
+    "max_record_bytes": 4096,       # Larger records have their input and output clipped
+    "error_burst": 10,              # Failed spans within error_window that trigger a dump; None disables
+    "error_window": 10.0,           # Seconds over which error_burst is counted
+    "dump_cooldown": 60.0,          # Minimum seconds between automatic dumps
+    "dump_directory": None,         # Defaults to <tempdir>/flowscope-flight
+    "max_dumps": 20,                # Older dump files in dump_directory are deleted
+    "signal": "SIGUSR1",            # Signal that triggers a dump; None disables
+    "http_host": "127.0.0.1",       # Interface of the query endpoint
+    "http_port": None,              # Port of the query endpoint (0 picks a free one); None disables
+}
+
+# Estimated bytes per recorded span beyond its encoded record: the entry object,
+# its slots in the ring and the three indexes
+_SPAN_OVERHEAD = 320
+
+_DUMP_PREFIX = "flight-"
+_DUMP_EXTENSION = ".ndjson.gz"
+
+_FAILED_STATUSES = ("error", "abandoned")
+
+# Recorders dumped on their configured signal, and the handlers they replaced
+_signal_recorders: "weakref.WeakSet[FlightRecorder]" = weakref.WeakSet()
+_previous_handlers: Dict[int, Any] = {}
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(value, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class _Entry:
+    """A recorded span: the fields it is indexed and filtered by, and its encoded record."""
+    
+    __slots__ = ("operation", "session_id", "status", "start_time", "end_time", "size", "blob")
+    
+    def __init__(self, record: Dict[str, Any], blob: bytes):
+        self.operation = record["operation"]
+        self.session_id = record["session_id"]
+        self.status = record["status"]
+        self.start_time = record["start_time"]
+        self.end_time = record["end_time"] or record["start_time"]
+        self.blob = blob
+        self.size = len(blob) + _SPAN_OVERHEAD
+
+
+class FlightRecorder(SpanProcessor):
+    """Span processor keeping recent finished spans in a bounded, indexed ring buffer."""
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_RECORDER_CONFIG)
+        if config:
+            self.config.update(config)
+        self.max_bytes = max(int(self.config["max_bytes"]), 0)
+        self.window = self.config["window"]
+        self.max_record_bytes = max(int(self.config["max_record_bytes"]), 256)
+        self.error_burst = self.config["error_burst"]
+        self.dump_directory = self.config["dump_directory"] or os.path.join(tempfile.gettempdir(), "flowscope-flight")
+        self.http_port: Optional[int] = None  # Bound port of the query endpoint, once started
+        self.last_dump: Optional[str] = None
+        self.stats: Dict[str, int] = {"spans_recorded": 0, "spans_evicted": 0, "spans_too_large": 0, "dumps": 0}
+        
+        self._lock = threading.Lock()
+        self._ring: deque = deque()
+        self._bytes = 0
+        self._by_operation: Dict[str, deque] = {}
+        self._by_session: Dict[str, deque] = {}
+        self._by_status: Dict[str, deque] = {}
+        self._errors: deque = deque(maxlen=max(int(self.error_burst or 1), 1))  # Finish times of recent failures
+        self._next_auto_dump = 0.0
+        self._dumping = threading.Lock()
+        self._server = None
+        
+        if self.config["signal"]:
+            _install_signal_handler(self, self.config["signal"])
+        if self.config["http_port"] is not None:
+            self._start_server(self.config["http_host"], int(self.config["http_port"]))
+            
+    def on_end(self, trace: Any):
+        from .exporters import trace_to_record
+        
+        record = trace_to_record(trace)
+        blob = _dumps(record)
+        if len(blob) > self.max_record_bytes:
+            blob = self._clip(record)
+        entry = _Entry(record, blob)
+        if entry.size > self.max_bytes:
+            self.stats["spans_too_large"] += 1
+            return
+            
+        burst = False
+        with self._lock:
+            self._ring.append(entry)
+            self._bytes += entry.size
+            self._index(self._by_operation, entry.operation, entry)
+            if entry.session_id is not None:
+                self._index(self._by_session, entry.session_id, entry)
+            self._index(self._by_status, entry.status, entry)
+            self.stats["spans_recorded"] += 1
+            self._evict(entry.end_time)
+            
+            if self.error_burst and entry.status in _FAILED_STATUSES:
+                self._errors.append(entry.end_time)
+                burst = (
+                    len(self._errors) == self._errors.maxlen
+                    and entry.end_time - self._errors[0] <= self.config["error_window"]
+                    and entry.end_time >= self._next_auto_dump
+                )
+                if burst:
+                    self._next_auto_dump = entry.end_time + self.config["dump_cooldown"]
+                    self._errors.clear()
+                    
+        if burst:
+            # File I/O stays off the thread finishing the span
+            threading.Thread(
+                target=self._dump_quietly, args=("error_burst",), name="flowscope-flight-dump", daemon=True,
+            ).start()
+            
+    def _clip(self, record: Dict[str, Any]) -> bytes:
+        """Encode a record too large to keep whole, clipping its payloads first (and then its events)."""
+        budget = self.max_record_bytes // 4
+        for name in ("input", "output"):
+            value = record[name]
+            if value is not None:
+                encoded = value if isinstance(value, str) else _dumps(value).decode("utf-8", "replace")
+                if len(encoded) > budget:
+                    record[name] = encoded[:budget] + f"... [{len(encoded)} chars, clipped by the flight recorder]"
+        blob = _dumps(record)
+        if len(blob) > self.max_record_bytes and record["events"]:
+            record["events"] = record["events"][-8:]
+            blob = _dumps(record)
+        return blob
+        
+    @staticmethod
+    def _index(index: Dict[str, deque], key: str, entry: _Entry):
+        entries = index.get(key)
+        if entries is None:
+            entries = index[key] = deque()
+        entries.append(entry)
+        
+    @staticmethod
+    def _unindex(index: Dict[str, deque], key: str):
+        # Entries leave in recording order, so the evicted one is the oldest of its key
+        entries = index[key]
+        entries.popleft()
+        if not entries:
+            del index[key]
+            
+    def _evict(self, now: float):
+        """Drop the oldest spans beyond the memory cap or the time window (caller holds the lock)."""
+        ring = self._ring
+        cutoff = now - self.window if self.window is not None else None
+        while ring and (self._bytes > self.max_bytes or (cutoff is not None and ring[0].end_time < cutoff)):
+            entry = ring.popleft()
+            self._bytes -= entry.size
+            self._unindex(self._by_operation, entry.operation)
+            if entry.session_id is not None:
+                self._unindex(self._by_session, entry.session_id)
+            self._unindex(self._by_status, entry.status)
+            self.stats["spans_evicted"] += 1
+            
+    def _select(
+        self,
+        operation: Optional[str],
+        session_id: Optional[str],
+        status: Optional[str],
+        since: Optional[float],
+        until: Optional[float],
+        limit: Optional[int],
+    ) -> List[bytes]:
+        """Encoded records matching the filters, newest first."""
+        with self._lock:
+            if self.window is not None:
+                self._evict(time.time())
+            # Scan the smallest applicable index
+            candidates = [
+                index.get(key, ())
+                for index, key in ((self._by_operation, operation), (self._by_session, session_id), (self._by_status, status))
+                if key is not None
+            ]
+            entries = list(min(candidates, key=len) if candidates else self._ring)
+            
+        selected = []
+        for entry in reversed(entries):
+            if since is not None and entry.end_time < since:
+                break  # Entries are in finish order
+            if (
+                (operation is not None and entry.operation != operation)
+                or (session_id is not None and entry.session_id != session_id)
+                or (status is not None and entry.status != status)
+                or (until is not None and entry.start_time > until)
+            ):
+                continue
+            selected.append(entry.blob)
+            if limit is not None and len(selected) >= limit:
+                break
+        return selected
+        
+    def query(
+        self,
+        operation: Optional[str] = None,
+        session_id: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Recorded spans matching every given filter, newest first.
+        
+        Args:
+            operation: Exact operation name
+            session_id: Session ID
+            status: "success", "error" or "abandoned"
+            since: Epoch seconds; spans that finished earlier are skipped
+            until: Epoch seconds; spans that started later are skipped
+            limit: Maximum number of spans returned (None for all)
+        
+        Returns:
+            Span records as written by the file exporter (see trace_to_record)
+        """
+        return [_loads(blob) for blob in self._select(operation, session_id, status, since, until, limit)]
+        
+    def summary(self) -> Dict[str, Any]:
+        """What the recorder holds: span counts per operation and status, memory use and time range."""
+        with self._lock:
+            return {
+                "spans": len(self._ring),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "oldest": self._ring[0].end_time if self._ring else None,
+                "newest": self._ring[-1].end_time if self._ring else None,
+                "sessions": len(self._by_session),
+                "operations": {operation: len(entries) for operation, entries in self._by_operation.items()},
+                "statuses": {status: len(entries) for status, entries in self._by_status.items()},
+                "last_dump": self.last_dump,
+                **self.stats,
+            }
+            
+    def dump(self, path: Optional[str] = None, reason: str = "manual") -> str:
+        """
+        Write every recorded span to an NDJSON.gz span file.
+        
+        Args:
+            path: File to write; defaults to a timestamped file in dump_directory
+            reason: Recorded in the default file name ("manual", "signal", "error_burst", ...)
+        
+        Returns:
+            The path written
+        """
+        with self._dumping:
+            with self._lock:
+                blobs = [entry.blob for entry in self._ring]
+                
+            if path is None:
+                os.makedirs(self.dump_directory, exist_ok=True)
+                stamp = datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+                path = os.path.join(self.dump_directory, f"{_DUMP_PREFIX}{os.getpid()}-{stamp}-{reason}{_DUMP_EXTENSION}")
+                
+            temporary = path + ".tmp"
+            with gzip.open(temporary, "wb", compresslevel=6) as f:
+                for blob in blobs:
+                    f.write(blob)
+                    f.write(b"\n")
+            os.replace(temporary, path)
+            
+            self.stats["dumps"] += 1
+            self.last_dump = path
+            if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.dump_directory):
+                self._prune_dumps()
+        return path
+        
+    def _dump_quietly(self, reason: str):
+        try:
+            path = self.dump(reason=reason)
+            print(f"🛬 FlowScope flight recorder dumped recent spans ({reason}): {path}")
+        except Exception as e:
+            print(f"❌ FlowScope flight recorder dump failed: {e}")
+            
+    def _prune_dumps(self):
+        max_dumps = self.config["max_dumps"]
+        if max_dumps is None:
+            return
+        try:
+            # Oldest first, across every process dumping into the directory
+            dumps = sorted(
+                (os.path.join(self.dump_directory, name) for name in os.listdir(self.dump_directory)
+                 if name.startswith(_DUMP_PREFIX) and name.endswith(_DUMP_EXTENSION)),
+                key=os.path.getmtime,
+            )
+        except OSError:
+            return  # Removed by another process meanwhile
+        for path in dumps[:max(len(dumps) - max_dumps, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+                
+    def _start_server(self, host: str, port: int):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlsplit
+        
+        recorder = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == "/summary":
+                    self._reply(200, _dumps(recorder.summary()))
+                elif url.path == "/spans":
+                    params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                    try:
+                        blobs = recorder._select(
+                            params.get("operation"),
+                            params.get("session_id"),
+                            params.get("status"),
+                            float(params["since"]) if "since" in params else None,
+                            float(params["until"]) if "until" in params else None,
+                            int(params.get("limit", 100)),
+                        )
+                    except ValueError as e:
+                        self._reply(400, _dumps({"error": f"invalid query: {e}"}))
+                        return
+                    self._reply(200, b"[" + b",".join(blobs) + b"]")
+                else:
+                    self._reply(404, _dumps({"error": "not found"}))
+                    
+            def do_POST(self):
+                if urlsplit(self.path).path != "/dump":
+                    self._reply(404, _dumps({"error": "not found"}))
+                    return
+                try:
+                    self._reply(200, _dumps({"path": recorder.dump(reason="http")}))
+                except OSError as e:
+                    self._reply(500, _dumps({"error": str(e)}))
+                    
+            def log_message(self, format, *args):
+                pass
+                
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        self._server = server
+        self.http_port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, name="flowscope-flight-recorder", daemon=True).start()
+        
+    def shutdown(self):
+        _signal_recorders.discard(self)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _handle_dump_signal(signum, frame):
+    # The handler runs on the main thread between bytecodes, possibly while it
+    # holds a recorder's lock, so dump from other threads without waiting
+    for recorder in list(_signal_recorders):
+        threading.Thread(
+            target=recorder._dump_quietly, args=("signal",), name="flowscope-flight-dump", daemon=True,
+        ).start()
+    previous = _previous_handlers.get(signum)
+    if callable(previous):
+        previous(signum, frame)
+
+
+def _install_signal_handler(recorder: FlightRecorder, name: str):
+    """Dump the recorder on a signal, installing the handler on first use (main thread only)."""
+    signum = getattr(signal, name, None)
+    if signum is None:
+        return  # Not available on this platform
+    _signal_recorders.add(recorder)
+    if signum in _previous_handlers or threading.current_thread() is not threading.main_thread():
+        return
+    # An ignored signal stays ignored, and an application handler is chained
+    previous = signal.getsignal(signum)
+    if previous is signal.SIG_IGN or previous is None:
+        return
+    _previous_handlers[signum] = previous
+    signal.signal(signum, _handle_dump_signal)
+
+
+__all__ = [
+    'DEFAULT_RECORDER_CONFIG',
+    'FlightRecorder',
+]
@@ -0,0 +1,267 @@
+"""
+FlowScope Record/Replay
+
+Serves instrumented calls (LLMChain.invoke, BaseRetriever.retrieve, ...) from
+outputs recorded earlier instead of calling the provider again, so iterating
+on prompts and running test suites takes milliseconds instead of minutes.
+
+Calls are keyed by a SHA-256 of the operation name and a normalized form of
+their arguments and of the object they are called on (so editing a chain's
+prompt template invalidates its entries), and their outputs stored (pickled)
+in an SQLite file with least-recently-used eviction. The cache is filled
+while recording, or built from span files written by the file exporter
+(ReplayCache.import_spans, or "flowscope replay import"). Spans do not
+record the object, so imported entries only match with include_instance
+off, and only if the input and output were captured as plain JSON data.
+
+Modes:
+    "record"  always call through and store the outputs
+    "replay"  serve recorded outputs; call through and record on a miss
+    "strict"  serve recorded outputs; raise ReplayMiss on a miss (for tests)
+
+Only load caches you trust: outputs are unpickled when served.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_REPLAY_POLICY: Dict[str, Any] = {
+    "mode": "replay",                    # "record", "replay" or "strict"
+    "path": ".flowscope/replay.db",      # SQLite cache file
+    "operations": ["*"],                 # Operation name patterns (fnmatch) that are recorded and replayed
+    "max_entries": 10_000,               # Least recently used entries beyond this are evicted
+    "max_bytes": 512 * 1024 * 1024,      # Same, for the total size of stored outputs
+    "ignore_keys": ["callbacks", "run_id", "run_manager"],  # Argument keys left out of cache keys, at any depth
+    "normalize_whitespace": True,        # Collapse runs of whitespace in strings
+    "case_sensitive": True,              # False lowercases strings
+    "include_instance": True,            # Hash the called object's state (prompt, model settings) into keys
+    "normalizer": None,                  # Callable (operation, inputs) -> inputs applied before hashing
+}
+
+_MODES = ("record", "replay", "strict")
+_MAX_DEPTH = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+class ReplayMiss(LookupError):
+    """Raised in strict mode when a call has no recorded output."""
+
+
+class ReplayCache:
+    """Content-addressed store of recorded call outputs."""
+    
+    def __init__(self, policy: Optional[Dict[str, Any]] = None):
+        self.policy = dict(DEFAULT_REPLAY_POLICY)
+        if policy:
+            self.policy.update(policy)
+        self.mode = self.policy["mode"]
+        if self.mode not in _MODES:
+            raise ValueError(f"Unsupported replay mode: {self.mode!r} (expected one of {', '.join(_MODES)})")
+        self.path = self.policy["path"]
+        self.operations = tuple(self.policy["operations"] or ())
+        self.ignore_keys = frozenset(self.policy["ignore_keys"] or ())
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "recorded": 0, "unrecordable": 0, "evicted": 0}
+        
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # One connection shared by all threads behind the lock; WAL lets parallel test workers share the file
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._entries, self._bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        
+    def applies(self, operation: str) -> bool:
+        return any(fnmatchcase(operation, pattern) for pattern in self.operations)
+        
+    # Keys
+    
+    def _canonical(self, value: Any, depth: int = 0) -> Any:
+        """A JSON-serializable form of value that is stable across runs (no reprs with addresses)."""
+        if isinstance(value, str):
+            if self.policy["normalize_whitespace"]:
+                value = " ".join(value.split())
+            return value if self.policy["case_sensitive"] else value.lower()
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if depth >= _MAX_DEPTH:
+            return f"<{type(value).__qualname__}>"
+        if isinstance(value, dict):
+            return {
+                str(k): self._canonical(v, depth + 1)
+                for k, v in value.items() if k not in self.ignore_keys
+            }
+        if isinstance(value, (list, tuple)):
+            return [self._canonical(v, depth + 1) for v in value]
+        if isinstance(value, (set, frozenset)):
+            items = [self._canonical(v, depth + 1) for v in value]
+            return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, default=str))
+        if isinstance(value, (bytes, bytearray)):
+            return hashlib.sha256(value).hexdigest()
+            
+        # Objects: their data, not their identity
+        kind = f"{type(value).__module__}.{type(value).__qualname__}"
+        if hasattr(value, "model_dump"):  # Pydantic v2 (LangChain messages, documents)
+            try:
+                return {"__type__": kind, **self._canonical(value.model_dump(), depth + 1)}
+            except Exception:
+                pass
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            fields = {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+            return {"__type__": kind, **self._canonical(fields, depth + 1)}
+        attributes = getattr(value, "__dict__", None)
+        if isinstance(attributes, dict):
+            public = {k: v for k, v in attributes.items() if not k.startswith("_")}
+            return {"__type__": kind, **self._canonical(public, depth + 1)}
+        return {"__type__": kind}
+        
+    def key(self, operation: str, inputs: Any, instance: Any = None) -> str:
+        """Cache key of a call: a hash of the operation, its normalized inputs and the called object."""
+        normalizer: Optional[Callable] = self.policy["normalizer"]
+        if normalizer is not None:
+            inputs = normalizer(operation, inputs)
+        parts = [operation, self._canonical(inputs)]
+        if instance is not None and self.policy["include_instance"]:
+            parts.append(self._canonical(instance))
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        
+    # Storage
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(True, output) for a recorded key, (False, None) otherwise."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            self._db.execute("UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        return True, pickle.loads(row[0])
+        
+    def put(self, key: str, operation: str, value: Any) -> bool:
+        """Store an output; False if it cannot be pickled."""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            self.stats["unrecordable"] += 1
+            return False
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, operation, value, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, operation, blob, len(blob), now, now),
+            )
+            if previous is None:
+                self._entries += 1
+            self._bytes += len(blob) - (previous[0] if previous else 0)
+            self.stats["recorded"] += 1
+            if self._entries > self.policy["max_entries"] or self._bytes > self.policy["max_bytes"]:
+                self._evict()
+        return True
+        
+    def _evict(self):
+        """Drop least recently used entries until within limits (caller holds the lock)."""
+        # Other processes may have written meanwhile, so recount before deciding
+        self._entries, self._bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        excess_entries = self._entries - self.policy["max_entries"]
+        excess_bytes = self._bytes - self.policy["max_bytes"]
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            excess_entries -= 1
+            excess_bytes -= size
+            self._entries -= 1
+            self._bytes -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.stats["evicted"] += len(doomed)
+        
+    # Call interception
+    
+    def _lookup(self, operation: str, inputs: Any, instance: Any, trace: Any) -> Tuple[Optional[str], bool, Any]:
+        if not self.applies(operation):
+            return None, False, None
+        key = self.key(operation, inputs, instance)
+        if self.mode == "record":
+            return key, False, None
+        hit, value = self.get(key)
+        if hit:
+            self.stats["hits"] += 1
+            if trace is not None:
+                trace.set_tag("flowscope.replayed", True)
+            return key, True, value
+        self.stats["misses"] += 1
+        if self.mode == "strict":
+            raise ReplayMiss(f"No recorded output for {operation} (key {key[:12]}) in {self.path}")
+        return key, False, None
+        
+    def call(self, operation: str, inputs: Any, func: Callable[[], Any], instance: Any = None, trace: Any = None) -> Any:
+        """Run func() for a call on instance, or serve its recorded output."""
+        key, hit, value = self._lookup(operation, inputs, instance, trace)
+        if hit:
+            return value
+        value = func()
+        if key is not None:
+            self.put(key, operation, value)
+        return value
+        
+    async def acall(self, operation: str, inputs: Any, func: Callable[[], Any], instance: Any = None, trace: Any = None) -> Any:
+        """Async variant of call(); func() returns an awaitable."""
+        key, hit, value = self._lookup(operation, inputs, instance, trace)
+        if hit:
+            return value
+        value = await func()
+        if key is not None:
+            self.put(key, operation, value)
+        return value
+        
+    def import_spans(self, paths: Iterable[str]) -> int:
+        """Record the outputs of successful spans from span files; returns how many were stored."""
+        from .exporters.file import read_records, span_files
+        
+        stored = 0
+        for path in span_files(paths):
+            for record in read_records(path):
+                if record.get("status") != "success" or record.get("output") is None:
+                    continue
+                if not self.applies(record["operation"]):
+                    continue
+                key = self.key(record["operation"], record.get("input"))
+                if self.put(key, record["operation"], record["output"]):
+                    stored += 1
+        return stored
+        
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+__all__ = [
+    'ReplayCache',
+    'ReplayMiss',
+    'DEFAULT_REPLAY_POLICY',
+]
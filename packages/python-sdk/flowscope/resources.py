@@ -0,0 +1,175 @@
+"""
+FlowScope Resource Attribution
+
+Opt-in per-span resource usage, reported next to wall-clock duration so a slow
+span can be told apart as CPU-bound, allocation-heavy, stalled in garbage
+collection, or simply waiting (network, locks, sleeps):
+
+- cpu_time: CPU time (ms) of the thread that opened the span, while it was open
+- alloc_objects / alloc_bytes: net GC-tracked objects (lists, dicts, class
+  instances...) or, with tracemalloc, net bytes allocated meanwhile
+- gc_pause / gc_collections: time (ms) and collections spent in the garbage
+  collector meanwhile
+
+Like duration, all figures are inclusive of child spans. Thread CPU time
+covers everything the thread ran while the span was open, including other
+asyncio tasks interleaved on the same event loop. Allocation and GC figures
+are process-wide: the GC stops every thread, and the cheap allocation
+counters cannot tell threads apart.
+"""
+
+import gc
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_RESOURCE_POLICY: Dict[str, Any] = {
+    "cpu": True,                 # Thread CPU time via time.thread_time_ns()
+    "allocations": "objects",    # "objects" (GC allocation counter, ~free), "tracemalloc" (bytes, costly) or None
+    "gc": True,                  # GC pause time via gc.callbacks
+}
+
+_ALLOCATION_MODES = ("objects", "tracemalloc", None)
+
+
+class _GCMonitor:
+    """Accumulates time spent in garbage collection and GC-tracked allocations, process-wide."""
+    
+    def __init__(self):
+        self.pause_ns = 0
+        self.collections = 0
+        self._allocated_before = 0  # Allocation count as of the last collection
+        self._started: Optional[int] = None
+        self._users = 0
+        self._lock = threading.Lock()
+        
+    def __call__(self, phase: str, info: Dict[str, Any]):
+        # Collections run with the GIL held, so callbacks never interleave
+        if phase == "start":
+            # Collections reset the youngest generation's allocation counter
+            self._allocated_before += gc.get_count()[0]
+            self._started = time.perf_counter_ns()
+        elif self._started is not None:
+            self.pause_ns += time.perf_counter_ns() - self._started
+            self.collections += 1
+            self._started = None
+            
+    def allocated_objects(self) -> int:
+        """Net GC-tracked objects allocated since the monitor was installed."""
+        return self._allocated_before + gc.get_count()[0]
+        
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                gc.callbacks.append(self)
+                
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self in gc.callbacks:
+                gc.callbacks.remove(self)
+
+
+_gc_monitor = _GCMonitor()
+
+
+class _TracemallocUsers:
+    """Starts tracemalloc for the first tracker that needs it and stops it after the last one."""
+    
+    def __init__(self):
+        self._users = 0
+        self._started = False  # Whether tracing was started here rather than by the application
+        self._lock = threading.Lock()
+        
+    def acquire(self):
+        import tracemalloc
+        with self._lock:
+            self._users += 1
+            if self._users == 1 and not tracemalloc.is_tracing():
+                # One frame per allocation keeps tracemalloc's overhead as low as it goes
+                tracemalloc.start(1)
+                self._started = True
+                
+    def release(self):
+        import tracemalloc
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._started:
+                self._started = False
+                tracemalloc.stop()
+
+
+_tracemalloc_users = _TracemallocUsers()
+
+
+class ResourceTracker:
+    """Records resource usage marks at span start and attributes the deltas at finish."""
+    
+    def __init__(self, policy: Optional[Dict[str, Any]] = None):
+        self.policy = dict(DEFAULT_RESOURCE_POLICY)
+        if policy:
+            self.policy.update(policy)
+        self.cpu = bool(self.policy["cpu"])
+        self.allocations = self.policy["allocations"]
+        self.gc = bool(self.policy["gc"])
+        if self.allocations not in _ALLOCATION_MODES:
+            raise ValueError(f"Unsupported allocation tracking mode: {self.allocations!r}")
+            
+        if self.allocations == "tracemalloc":
+            import tracemalloc
+            _tracemalloc_users.acquire()
+            self._traced_memory = tracemalloc.get_traced_memory
+        self._uses_gc_monitor = self.gc or self.allocations == "objects"
+        if self._uses_gc_monitor:
+            _gc_monitor.acquire()
+        self._closed = False
+        
+    def _allocation_mark(self) -> Optional[int]:
+        if self.allocations == "objects":
+            return _gc_monitor.allocated_objects()
+        if self.allocations == "tracemalloc":
+            return self._traced_memory()[0]
+        return None
+        
+    def start(self, trace: Any):
+        """Record resource marks on a span that is starting."""
+        trace._resource_marks = (
+            threading.get_ident(),
+            time.thread_time_ns() if self.cpu else None,
+            self._allocation_mark(),
+            _gc_monitor.pause_ns if self.gc else None,
+            _gc_monitor.collections if self.gc else None,
+        )
+        
+    def finish(self, trace: Any):
+        """Attribute resource usage since start() to the span's resources."""
+        marks = getattr(trace, "_resource_marks", None)
+        if marks is None:
+            return
+        thread_id, cpu_ns, allocated, gc_ns, gc_count = marks
+        trace._resource_marks = None
+        
+        resources: Dict[str, Any] = {}
+        # Thread CPU time is only meaningful if the span finishes on the thread that opened it
+        if cpu_ns is not None and threading.get_ident() == thread_id:
+            resources["cpu_time"] = (time.thread_time_ns() - cpu_ns) / 1e6
+            if trace.duration:
+                resources["cpu_ratio"] = min(resources["cpu_time"] / trace.duration, 1.0)
+        if allocated is not None:
+            key = "alloc_objects" if self.allocations == "objects" else "alloc_bytes"
+            resources[key] = self._allocation_mark() - allocated
+        if gc_ns is not None:
+            resources["gc_pause"] = (_gc_monitor.pause_ns - gc_ns) / 1e6
+            resources["gc_collections"] = _gc_monitor.collections - gc_count
+        trace.resources = resources
+        
+    def close(self):
+        """Release the GC monitor and tracemalloc; each stops once no tracker uses it."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._uses_gc_monitor:
+            _gc_monitor.release()
+        if self.allocations == "tracemalloc":
+            _tracemalloc_users.release()
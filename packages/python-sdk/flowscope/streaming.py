@@ -0,0 +1,214 @@
+"""
+FlowScope Live Streaming
+
+Streams span starts and ends over a persistent websocket (the client's
+websocket_url) so the desktop app and VS Code extension can show long agent
+runs as they happen.
+
+Span hooks only record updates in a bounded in-memory buffer, coalesced per
+span, so they never wait on the network. A background thread sends what has
+accumulated as one frame every frame_interval_ms. A slow viewer just gets
+fewer, larger frames; when the buffer is full, new updates are dropped and
+counted rather than blocking the application.
+
+Protocol (JSON text messages):
+    
+    client -> {"type": "hello", "stream_id": ..., "next_seq": n}
+    server -> {"type": "resume", "last_seq": k}              (optional)
+    client -> frames after k still held in the replay buffer
+    client -> {"type": "snapshot", "spans": [...]}            (open spans)
+    client -> {"type": "frame", "seq": n, "events": [...]}    (repeated)
+
+Events are {"type": "span_start" | "span_end" | "span", "id": ...}, where
+"span" carries both when a span started and ended within one frame. The
+connection is re-established with jittered exponential backoff and resumes
+from the last frame the server reports having seen.
+"""
+
+import json
+import random
+import threading
+import uuid
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .core import SpanProcessor
+
+DEFAULT_STREAMING_CONFIG: Dict[str, Any] = {
+    "url": None,                 # Defaults to the client's websocket_url
+    "frame_interval_ms": 100.0,  # Updates are coalesced into one frame per interval
+    "max_pending": 10_000,       # Spans with unsent updates; further updates are dropped
+    "replay_frames": 256,        # Recent frames kept for resuming after a reconnect
+    "include_payloads": False,   # Also stream span inputs and outputs
+    "send_timeout": 5.0,         # Seconds before a stalled send counts as a broken connection
+    "resume_timeout": 1.0,       # Seconds to wait for the server's resume reply
+    "reconnect_initial": 0.5,    # Seconds before the first reconnect attempt
+    "reconnect_max": 30.0,       # Cap on the reconnect backoff
+}
+
+
+class LiveStreamer(SpanProcessor):
+    """Span processor streaming coalesced span updates over a websocket."""
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEFAULT_STREAMING_CONFIG)
+        if config:
+            self.config.update(config)
+        if not self.config["url"]:
+            raise ValueError("Live streaming requires a websocket URL")
+        self.url = self.config["url"]
+        self.interval = self.config["frame_interval_ms"] / 1000
+        self.max_pending = self.config["max_pending"]
+        self.include_payloads = self.config["include_payloads"]
+        self.stream_id = str(uuid.uuid4())
+        
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}     # span ID -> coalesced event
+        self._open: Dict[str, Dict[str, Any]] = {}        # span ID -> start event, for snapshots
+        self._replay: deque = deque(maxlen=self.config["replay_frames"])  # (seq, message)
+        self._seq = 0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.stats: Dict[str, int] = {"frames_sent": 0, "events_sent": 0, "events_dropped": 0, "reconnects": 0}
+        
+    def _start_event(self, trace: Any) -> Dict[str, Any]:
+        event = {
+            "type": "span_start",
+            "id": trace.id,
+            "parent_id": trace.parent_id,
+            "session_id": trace.session_id,
+            "operation": trace.operation,
+            "start_time": trace.start_time,
+            # A copy: the sender serializes it later, while the span may still add metadata
+            "metadata": dict(trace.metadata),
+        }
+        if self.include_payloads:
+            event["input"] = trace.input_data
+        return event
+        
+    def _end_fields(self, trace: Any) -> Dict[str, Any]:
+        fields = {
+            "end_time": trace.end_time,
+            "duration": trace.duration,
+            "status": trace.status,
+            "error": trace.error,
+        }
+        if self.include_payloads:
+            fields["input"] = trace.input_data
+            fields["output"] = trace.output_data
+        return fields
+        
+    def on_start(self, trace: Any):
+        event = self._start_event(trace)
+        with self._lock:
+            self._open[trace.id] = event
+            if len(self._pending) >= self.max_pending:
+                self.stats["events_dropped"] += 1
+            else:
+                # Its own dict, as on_end completes pending events in place
+                self._pending[trace.id] = dict(event)
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name="flowscope-streaming", daemon=True)
+                self._thread.start()
+                
+    def on_end(self, trace: Any):
+        fields = self._end_fields(trace)
+        with self._lock:
+            self._open.pop(trace.id, None)
+            pending = self._pending.get(trace.id)
+            if pending is not None:
+                # Started and ended within one frame: send a single "span" event
+                pending.update(fields, type="span")
+            elif len(self._pending) >= self.max_pending:
+                self.stats["events_dropped"] += 1
+            else:
+                self._pending[trace.id] = {"type": "span_end", "id": trace.id, **fields}
+                
+    def shutdown(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            # Give the sender one more interval to flush the last frame
+            self._thread.join(timeout=self.interval + self.config["send_timeout"])
+            
+    def _take_frame(self) -> Optional[str]:
+        """Swap out pending updates as the next numbered frame (kept for replay)."""
+        with self._lock:
+            if not self._pending:
+                return None
+            events = list(self._pending.values())
+            self._pending = {}
+            self._seq += 1
+            seq = self._seq
+        message = json.dumps({"type": "frame", "seq": seq, "events": events}, default=str)
+        self._replay.append((seq, message))
+        self.stats["events_sent"] += len(events)
+        return message
+        
+    def _run(self):
+        import asyncio
+        asyncio.run(self._main())
+        
+    async def _main(self):
+        import asyncio
+        try:
+            import websockets
+        except ImportError:
+            print("❌ FlowScope live streaming requires websockets. Install with: pip install websockets")
+            return
+            
+        delay = self.config["reconnect_initial"]
+        while not self._stopped.is_set():
+            try:
+                async with websockets.connect(self.url, open_timeout=self.config["send_timeout"]) as ws:
+                    await self._resume(ws)
+                    self.connected = True
+                    delay = self.config["reconnect_initial"]
+                    await self._stream(ws)
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.connected = False
+                self.stats["reconnects"] += 1
+                # Jittered exponential backoff, waking early on shutdown
+                # (run_in_executor rather than asyncio.to_thread, which needs Python 3.9)
+                wait = random.uniform(delay / 2, delay)
+                if await asyncio.get_running_loop().run_in_executor(None, self._stopped.wait, wait):
+                    return
+                delay = min(delay * 2, self.config["reconnect_max"])
+                
+    async def _send(self, ws: Any, message: str):
+        import asyncio
+        # A send that cannot complete in time means the viewer stopped reading
+        await asyncio.wait_for(ws.send(message), self.config["send_timeout"])
+        
+    async def _resume(self, ws: Any):
+        """Handshake on (re)connect: replay frames the server missed, then snapshot open spans."""
+        import asyncio
+        await self._send(ws, json.dumps({"type": "hello", "stream_id": self.stream_id, "next_seq": self._seq + 1}))
+        try:
+            reply = json.loads(await asyncio.wait_for(ws.recv(), self.config["resume_timeout"]))
+        except (asyncio.TimeoutError, ValueError):
+            reply = {}
+        if reply.get("type") == "resume":
+            last_seq = reply.get("last_seq") or 0
+            for seq, message in list(self._replay):
+                if seq > last_seq:
+                    await self._send(ws, message)
+                    
+        with self._lock:
+            spans = list(self._open.values())
+        await self._send(ws, json.dumps({"type": "snapshot", "spans": spans}, default=str))
+        
+    async def _stream(self, ws: Any):
+        import asyncio
+        while True:
+            stopping = self._stopped.is_set()
+            message = self._take_frame()
+            if message is not None:
+                await self._send(ws, message)
+                self.stats["frames_sent"] += 1
+            if stopping:
+                return
+            await asyncio.sleep(self.interval)
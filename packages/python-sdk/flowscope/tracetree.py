@@ -0,0 +1,306 @@
+"""
+FlowScope Trace Trees
+
+Rebuilds span trees from parent_id links and answers "where did the time go"
+for a run: per-span self time, the critical path, and flame graphs in folded
+stack (flamegraph.pl / inferno) and speedscope formats.
+
+Concurrent children are common (batches, parallel tool calls), so a span's
+self time is its duration minus the union of its children's intervals, not
+their sum, and the critical path follows the last-finishing child chain.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .exporters.file import SpanFileIndex, read_records, span_files
+
+
+class SpanNode:
+    """A span in a trace tree, with times in epoch seconds."""
+    
+    __slots__ = (
+        "span", "id", "parent_id", "name", "start", "end",
+        "children", "parent", "self_time", "critical_time",
+    )
+    
+    def __init__(self, span: Any, id: str, parent_id: Optional[str], name: str, start: float, end: Optional[float]):
+        self.span = span                    # The TraceData or record this node was built from
+        self.id = id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end = end                      # None until resolved for unfinished spans
+        self.children: List["SpanNode"] = []
+        self.parent: Optional["SpanNode"] = None
+        self.self_time = 0.0                # ms not covered by any child
+        self.critical_time = 0.0            # ms this span spends on the critical path
+        
+    @property
+    def duration(self) -> float:
+        """Duration in milliseconds."""
+        return (self.end - self.start) * 1000
+        
+    def walk(self) -> Iterable["SpanNode"]:
+        """This node and its descendants, depth-first (parents before children)."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+            
+    def __repr__(self) -> str:
+        return f"SpanNode({self.name!r}, id={self.id!r}, children={len(self.children)})"
+
+
+def _span_fields(span: Any) -> Tuple[str, Optional[str], str, float, Optional[float]]:
+    """Extract (id, parent_id, name, start, end) from a TraceData or a flat span record."""
+    if isinstance(span, dict):
+        start, end, duration = span["start_time"], span.get("end_time"), span.get("duration")
+        id, parent_id, name = span["id"], span.get("parent_id"), span["operation"]
+    else:
+        start, end, duration = span.start_time, span.end_time, span.duration
+        id, parent_id, name = span.id, span.parent_id, span.operation
+    if end is None and duration is not None:
+        end = start + duration / 1000
+    return id, parent_id, name, start, end
+
+
+def build_trees(spans: Iterable[Any]) -> List[SpanNode]:
+    """
+    Link spans into trees in O(n) using an id index.
+    
+    Accepts TraceData objects (e.g. client.traces) or flat records from the
+    file exporter. Spans whose parent is not among the given spans become
+    roots. Children are ordered by start time; unfinished spans end when
+    their last descendant ends (or at their own start).
+    """
+    nodes: Dict[str, SpanNode] = {}
+    for span in spans:
+        node = SpanNode(span, *_span_fields(span))
+        nodes[node.id] = node
+        
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node.parent_id) if node.parent_id else None
+        if parent is None or parent is node:
+            roots.append(node)
+        else:
+            node.parent = parent
+            parent.children.append(node)
+            
+    for root in roots:
+        # Children first, so unfinished spans can take their descendants' end
+        for node in reversed(list(root.walk())):
+            node.children.sort(key=lambda child: child.start)
+            if node.end is None:
+                node.end = max([node.start] + [child.end for child in node.children])
+                
+    roots.sort(key=lambda root: root.start)
+    return roots
+
+
+def load_trees(paths: Sequence[str], session: Optional[str] = None) -> List[SpanNode]:
+    """Build trace trees from span files (or directories of them), optionally for one session."""
+    def records():
+        for path in span_files(paths):
+            index = SpanFileIndex.load(path)
+            if index is not None and not index.matches(session=session):
+                continue
+            for record in read_records(path):
+                if session is None or record["session_id"] == session:
+                    yield record
+                    
+    return build_trees(records())
+
+
+def _clipped(node: SpanNode, child: SpanNode) -> Tuple[float, float]:
+    """A child's interval clipped to its parent's (children may outlive fire-and-forget parents)."""
+    start = min(max(child.start, node.start), node.end)
+    end = max(min(child.end, node.end), start)
+    return start, end
+
+
+def compute_self_times(root: SpanNode):
+    """Set self_time (ms) on every node: duration minus the union of child intervals."""
+    for node in root.walk():
+        covered = 0.0
+        current_start = current_end = None
+        for child in node.children:  # sorted by start
+            start, end = _clipped(node, child)
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    covered += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            covered += current_end - current_start
+        node.self_time = max(node.duration - covered * 1000, 0.0)
+
+
+def critical_path(root: SpanNode) -> List[Tuple[SpanNode, float, float]]:
+    """
+    The critical path of a trace as chronological (node, start, end) segments.
+    
+    Walking back from the root's end, each span's time is attributed to the
+    child that finished last before the current point, then to the child that
+    finished last before that one started, and so on; the gaps are the span's
+    own. Children overlapping an already chosen sibling ran concurrently with
+    it and are not on the path. Also sets critical_time (ms) on the nodes.
+    """
+    for node in root.walk():
+        node.critical_time = 0.0
+        
+    segments: List[Tuple[SpanNode, float, float]] = []
+    
+    def children_by_end(node: SpanNode):
+        return iter(sorted(node.children, key=lambda child: _clipped(node, child)[1], reverse=True))
+        
+    # Iterative depth-first walk; frames are [node, cursor, remaining children]
+    stack = [[root, root.end, children_by_end(root)]]
+    while stack:
+        frame = stack[-1]
+        node, cursor, remaining = frame
+        for child in remaining:
+            start, end = _clipped(node, child)
+            if end > cursor or start >= cursor:
+                continue
+            if end < cursor:
+                segments.append((node, end, cursor))
+            frame[1] = start
+            stack.append([child, end, children_by_end(child)])
+            break
+        else:
+            if cursor > node.start:
+                segments.append((node, node.start, cursor))
+            stack.pop()
+            
+    segments.reverse()
+    for node, start, end in segments:
+        node.critical_time += (end - start) * 1000
+    return segments
+
+
+def _frame_name(node: SpanNode) -> str:
+    return node.name.replace(";", ":").replace("\n", " ")
+
+
+def to_folded(roots: Iterable[SpanNode]) -> str:
+    """
+    Folded stacks ("root;child;leaf <microseconds>"), one line per distinct
+    stack with its summed self time, for flamegraph.pl, inferno or speedscope.
+    """
+    totals: Dict[str, int] = {}
+    for root in roots:
+        compute_self_times(root)
+        stack = [(root, _frame_name(root))]
+        while stack:
+            node, path = stack.pop()
+            micros = int(round(node.self_time * 1000))
+            if micros > 0:
+                totals[path] = totals.get(path, 0) + micros
+            stack.extend((child, f"{path};{_frame_name(child)}") for child in node.children)
+    return "".join(f"{path} {value}\n" for path, value in sorted(totals.items()))
+
+
+def to_speedscope(roots: Iterable[SpanNode], name: str = "FlowScope trace") -> Dict[str, Any]:
+    """
+    A speedscope document with one evented profile per trace.
+    
+    Evented profiles must nest strictly, so children that overlap an earlier
+    sibling are moved to an extra lane (profile) of their own, which repeats
+    their ancestors' frames for context.
+    """
+    frames: List[Dict[str, str]] = []
+    frame_index: Dict[str, int] = {}
+    
+    def frame(node: SpanNode) -> int:
+        key = _frame_name(node)
+        if key not in frame_index:
+            frame_index[key] = len(frames)
+            frames.append({"name": key})
+        return frame_index[key]
+        
+    profiles = []
+    for root in roots:
+        origin = root.start
+        lanes: List[List[Dict[str, Any]]] = []
+        
+        def ms(t: float) -> float:
+            return (t - origin) * 1000
+            
+        main: List[Dict[str, Any]] = []
+        lanes.append(main)
+        main.append({"type": "O", "frame": frame(root), "at": ms(root.start)})
+        
+        # Iterative depth-first walk; entries are [node, start, end, events,
+        # remaining children, lane free at, ancestors to close after the node]
+        stack = [[root, root.start, root.end, main, iter(root.children), root.start, None]]
+        while stack:
+            entry = stack[-1]
+            node, start, end, events, remaining, lane_free_at, context = entry
+            for child in remaining:
+                child_start = min(max(child.start, start), end)
+                child_end = max(min(child.end, end), child_start)
+                if child_start >= lane_free_at:
+                    lane, lane_context = events, None
+                    entry[5] = child_end
+                else:
+                    # Concurrent with an earlier sibling: give it its own lane
+                    lane = []
+                    lanes.append(lane)
+                    lane_context = [ancestor[0] for ancestor in stack]
+                    for ancestor in lane_context:
+                        lane.append({"type": "O", "frame": frame(ancestor), "at": ms(child_start)})
+                lane.append({"type": "O", "frame": frame(child), "at": ms(child_start)})
+                stack.append([child, child_start, child_end, lane, iter(child.children), child_start, lane_context])
+                break
+            else:
+                events.append({"type": "C", "frame": frame(node), "at": ms(end)})
+                if context:
+                    for ancestor in reversed(context):
+                        events.append({"type": "C", "frame": frame(ancestor), "at": ms(end)})
+                stack.pop()
+        
+        for i, events in enumerate(lanes):
+            profiles.append({
+                "type": "evented",
+                "name": _frame_name(root) if i == 0 else f"{_frame_name(root)} (concurrent lane {i})",
+                "unit": "milliseconds",
+                "startValue": 0.0,
+                "endValue": ms(root.end),
+                "events": events,
+            })
+            
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+        "name": name,
+        "exporter": "flowscope",
+    }
+
+
+def write_flamegraph(roots: List[SpanNode], path: str, format: str = "speedscope"):
+    """Write a flame graph file in "speedscope" (JSON) or "folded" format."""
+    if format == "speedscope":
+        content = json.dumps(to_speedscope(roots), separators=(",", ":"))
+    elif format == "folded":
+        content = to_folded(roots)
+    else:
+        raise ValueError(f"Unsupported flame graph format: {format!r}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+__all__ = [
+    'SpanNode',
+    'build_trees',
+    'load_trees',
+    'compute_self_times',
+    'critical_path',
+    'to_folded',
+    'to_speedscope',
+    'write_flamegraph',
+]
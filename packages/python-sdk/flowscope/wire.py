@@ -0,0 +1,393 @@
+"""
+FlowScope Columnar Batch Format
+
+A compact binary encoding of a batch of finished traces. The JSON wire format
+repeats the same strings in every span (operation, session, framework,
+metadata keys and values) and spells out ISO timestamps; this format stores
+each distinct string once in a per-batch dictionary and lays the batch out
+column by column:
+
+    magic "FSCB", version, span count
+    string dictionary       count, then length-prefixed UTF-8 strings
+    id                      16 raw bytes per span when all IDs are UUIDs,
+                            otherwise dictionary references
+    parent_id               0 = none, 1..n = span in this batch, above n =
+                            dictionary reference
+    session_id, operation,
+    framework, status,
+    error                   dictionary reference + 1 (0 = none)
+    start_time              microseconds, zigzag varint delta from the
+                            previous span's start
+    end_time                microseconds after start + 1 (0 = unfinished)
+    metadata, tags          key count, then (key reference, tagged value)
+    resources, input,
+    output, events          one JSON array per column
+
+Integers are unsigned LEB128 varints. Times keep microsecond precision and
+durations are derived from them. decode_batch() returns the flat records of
+trace_to_record(), so offline tooling reads columnar files like the others;
+decode_columns() returns the columns themselves, for vectorized readers.
+"""
+
+import json
+import struct
+from typing import Any, Dict, Iterator, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAGIC = b"FSCB"
+VERSION = 1
+CONTENT_TYPE = "application/vnd.flowscope.batch+columnar"
+
+# Tagged values of metadata and tags
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STRING, _JSON = range(7)
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+_SMALL_VARINTS = [bytes([i]) for i in range(0x80)]
+_DOUBLE = struct.Struct("<d")
+
+
+class WireFormatError(ValueError):
+    """Raised when decoding data that is not a valid columnar batch."""
+
+
+def _put_varint(out: bytearray, value: int):
+    if value < 0x80:
+        out += _SMALL_VARINTS[value]
+        return
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _dumps(values: List[Any]) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(values, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(values, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _uuid_bytes(ids: List[str]) -> bytes:
+    """The IDs packed as 16 bytes each, or b"" if any of them is not a lowercase UUID string."""
+    try:
+        packed = bytes.fromhex("".join(ids).replace("-", ""))
+    except (TypeError, ValueError):
+        return b""
+    if len(packed) != 16 * len(ids) or any(
+        len(i) != 36 or i[8] != "-" or i[13] != "-" or i[18] != "-" or i[23] != "-" or i != i.lower() for i in ids
+    ):
+        return b""
+    return packed
+
+
+def encode_batch(traces: List[Any]) -> bytes:
+    """Encode finished traces (TraceData) as one columnar batch."""
+    strings: Dict[str, int] = {}
+    
+    def ref(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+        
+    n = len(traces)
+    columns = bytearray()
+    put = _put_varint
+    
+    ids = [trace.id for trace in traces]
+    packed_ids = _uuid_bytes(ids)
+    columns.append(1 if packed_ids else 0)
+    if packed_ids:
+        columns += packed_ids
+    else:
+        for span_id in ids:
+            put(columns, ref(str(span_id)))
+            
+    positions = {span_id: i for i, span_id in enumerate(ids)}
+    for trace in traces:
+        parent_id = trace.parent_id
+        if parent_id is None:
+            put(columns, 0)
+        elif parent_id in positions:
+            put(columns, positions[parent_id] + 1)
+        else:
+            put(columns, n + 1 + ref(str(parent_id)))
+            
+    for name in ("session_id", "operation"):
+        for trace in traces:
+            value = getattr(trace, name)
+            put(columns, 0 if value is None else ref(str(value)) + 1)
+    for trace in traces:
+        value = trace.metadata.get("framework", "custom")
+        put(columns, 0 if value is None else ref(str(value)) + 1)
+    for name in ("status", "error"):
+        for trace in traces:
+            value = getattr(trace, name)
+            put(columns, 0 if value is None else ref(str(value)) + 1)
+            
+    previous = 0
+    starts = []
+    for trace in traces:
+        start = round(trace.start_time * 1e6)
+        starts.append(start)
+        put(columns, _zigzag(start - previous))
+        previous = start
+    for trace, start in zip(traces, starts):
+        end = trace.end_time
+        put(columns, 0 if end is None else max(round(end * 1e6) - start, 0) + 1)
+        
+    for name in ("metadata", "tags"):
+        for trace in traces:
+            mapping = getattr(trace, name) or {}
+            put(columns, len(mapping))
+            for key, value in mapping.items():
+                put(columns, ref(str(key)))
+                _put_value(columns, value, ref)
+                
+    for name in ("resources", "input_data", "output_data", "events"):
+        blob = _dumps([getattr(trace, name) for trace in traces])
+        put(columns, len(blob))
+        columns += blob
+        
+    out = bytearray(MAGIC)
+    put(out, VERSION)
+    put(out, n)
+    put(out, len(strings))
+    for value in strings:
+        encoded = value.encode("utf-8", "surrogatepass")
+        put(out, len(encoded))
+        out += encoded
+    out += columns
+    return bytes(out)
+
+
+def _put_value(out: bytearray, value: Any, ref) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, str):
+        out.append(_STRING)
+        _put_varint(out, ref(value))
+    elif isinstance(value, int) and _INT64_MIN <= value <= _INT64_MAX:
+        out.append(_INT)
+        _put_varint(out, _zigzag(value))
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    else:
+        blob = _dumps([value])[1:-1]
+        out.append(_JSON)
+        _put_varint(out, len(blob))
+        out += blob
+
+
+class _Reader:
+    __slots__ = ("data", "pos")
+    
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        
+    def varint(self) -> int:
+        data, pos = self.data, self.pos
+        byte = data[pos]
+        pos += 1
+        if byte < 0x80:
+            self.pos = pos
+            return byte
+        value, shift = byte & 0x7F, 7
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return value
+            shift += 7
+            
+    def bytes(self, length: int) -> bytes:
+        start = self.pos
+        self.pos = start + length
+        if self.pos > len(self.data):
+            raise IndexError("truncated")
+        return self.data[start:self.pos]
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _read_value(reader: _Reader, strings: List[str]) -> Any:
+    tag = reader.data[reader.pos]
+    reader.pos += 1
+    if tag == _NONE:
+        return None
+    if tag == _TRUE:
+        return True
+    if tag == _FALSE:
+        return False
+    if tag == _STRING:
+        return strings[reader.varint()]
+    if tag == _INT:
+        return _unzigzag(reader.varint())
+    if tag == _FLOAT:
+        return _DOUBLE.unpack(reader.bytes(8))[0]
+    if tag == _JSON:
+        return _loads(reader.bytes(reader.varint()))
+    raise WireFormatError(f"unknown value tag {tag}")
+
+
+def decode_batch(data: bytes) -> List[Dict[str, Any]]:
+    """Decode a columnar batch into flat span records (see trace_to_record)."""
+    return _records(decode_columns(data))
+
+
+def decode_columns(data: bytes) -> Dict[str, Any]:
+    """
+    Decode a columnar batch column by column, without building span records.
+    
+    Columns are lists named like the record fields, except that the string
+    columns session_id, operation, framework, status and error hold
+    references into the "strings" list (0 = none, i + 1 = strings[i]), and
+    times are integers as stored: "start_us" epoch microseconds and "end_us"
+    microseconds after the start plus one (0 = unfinished).
+    """
+    if data[:4] != MAGIC:
+        raise WireFormatError("not a FlowScope columnar batch")
+    try:
+        return _decode(data)
+    except WireFormatError:
+        raise
+    except (IndexError, ValueError) as e:
+        raise WireFormatError(f"corrupt columnar batch: {e}")
+
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    reader = _Reader(data)
+    reader.pos = len(MAGIC)
+    version = reader.varint()
+    if version != VERSION:
+        raise WireFormatError(f"unsupported columnar batch version {version}")
+    n = reader.varint()
+    strings = [reader.bytes(reader.varint()).decode("utf-8", "surrogatepass") for _ in range(reader.varint())]
+    varint = reader.varint
+    
+    if reader.bytes(1)[0]:
+        raw = reader.bytes(16 * n).hex()
+        ids = [
+            f"{raw[i:i + 8]}-{raw[i + 8:i + 12]}-{raw[i + 12:i + 16]}-{raw[i + 16:i + 20]}-{raw[i + 20:i + 32]}"
+            for i in range(0, 32 * n, 32)
+        ]
+    else:
+        ids = [strings[varint()] for _ in range(n)]
+        
+    parents = []
+    for _ in range(n):
+        value = varint()
+        parents.append(None if value == 0 else ids[value - 1] if value <= n else strings[value - n - 1])
+        
+    sessions, operations, frameworks, statuses, errors = ([varint() for _ in range(n)] for _ in range(5))
+    
+    starts = []
+    previous = 0
+    for _ in range(n):
+        previous += _unzigzag(varint())
+        starts.append(previous)
+    ends = [varint() for _ in range(n)]
+    
+    mappings = []
+    for _ in range(2):
+        column = []
+        for _ in range(n):
+            column.append({strings[varint()]: _read_value(reader, strings) for _ in range(varint())})
+        mappings.append(column)
+    metadata, tags = mappings
+    
+    resources, inputs, outputs, events = (_loads(reader.bytes(varint())) for _ in range(4))
+    if reader.pos != len(reader.data):
+        raise WireFormatError("trailing data after columnar batch")
+        
+    return {
+        "strings": strings, "id": ids, "session_id": sessions, "parent_id": parents, "operation": operations,
+        "framework": frameworks, "start_us": starts, "end_us": ends, "status": statuses, "error": errors,
+        "input": inputs, "output": outputs, "metadata": metadata, "tags": tags, "events": events,
+        "resources": resources,
+    }
+
+
+def _records(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    strings = [None] + columns["strings"]
+    sessions, operations, frameworks, statuses, errors = (
+        [strings[ref] for ref in columns[name]] for name in ("session_id", "operation", "framework", "status", "error")
+    )
+    ids, parents, starts, ends = columns["id"], columns["parent_id"], columns["start_us"], columns["end_us"]
+    inputs, outputs, metadata = columns["input"], columns["output"], columns["metadata"]
+    tags, events, resources = columns["tags"], columns["events"], columns["resources"]
+    
+    records = []
+    for i in range(len(ids)):
+        start, end = starts[i], ends[i]
+        records.append({
+            "id": ids[i],
+            "session_id": sessions[i],
+            "parent_id": parents[i],
+            "operation": operations[i],
+            "framework": frameworks[i],
+            "start_time": start / 1e6,
+            "end_time": (start + end - 1) / 1e6 if end else None,
+            "duration": (end - 1) / 1000 if end else None,
+            "status": statuses[i],
+            "error": errors[i],
+            "input": inputs[i],
+            "output": outputs[i],
+            "metadata": metadata[i],
+            "tags": tags[i],
+            "events": events[i],
+            "resources": resources[i],
+        })
+    return records
+
+
+def frame(batch: bytes) -> bytes:
+    """A batch prefixed with its length, as stored in columnar span files."""
+    out = bytearray()
+    _put_varint(out, len(batch))
+    return bytes(out) + batch
+
+
+def split_frames(data: bytes) -> Iterator[bytes]:
+    """The batches of a columnar span file (a sequence of frame() outputs)."""
+    reader = _Reader(data)
+    try:
+        while reader.pos < len(data):
+            yield reader.bytes(reader.varint())
+    except IndexError:
+        raise WireFormatError("truncated columnar span file")
+
+
+__all__ = [
+    'CONTENT_TYPE',
+    'WireFormatError',
+    'encode_batch',
+    'decode_batch',
+    'decode_columns',
+    'frame',
+    'split_frames',
+]
@@ -39,6 +39,8 @@ setup(
     extras_require={
         "langchain": ["langchain>=0.1.0"],
         "llamaindex": ["llama-index>=0.9.0"],
+        "export": ["pyarrow>=12.0.0", "orjson>=3.9.0"],
+        "analysis": ["numpy>=1.22.0", "pyarrow>=12.0.0"],
         "dev": [
             "pytest>=7.0.0",
             "pytest-asyncio>=0.21.0",
@@ -51,5 +53,8 @@ setup(
         "console_scripts": [
             "flowscope=flowscope.cli:main",
         ],
+        "pytest11": [
+            "flowscope=flowscope.pytest_plugin",
+        ],
     },
 )
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Active span tracking: finishing, reaping and their races
+"""
+
+import gc
+import sys
+import threading
+
+from flowscope.core import FlowScopeClient
+from flowscope.exporters.memory import InMemoryExporter
+
+
+def _client(**config):
+    exporter = InMemoryExporter()
+    client = FlowScopeClient({
+        "exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False, **config,
+    })
+    return client, exporter
+
+
+def test_reaping_beside_finishing_threads_exports_each_span_once():
+    client, exporter = _client()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Interleave the threads as finely as possible
+    try:
+        for _ in range(30):
+            spans = [client.start_trace("op") for _ in range(50)]
+            finisher = threading.Thread(target=lambda: [client.finish_trace(span) for span in spans])
+            finisher.start()
+            client.reap_abandoned(ttl=0)
+            finisher.join()
+    finally:
+        sys.setswitchinterval(interval)
+    client.flush()
+
+    exported = [span.id for span in exporter.spans]
+    assert len(exported) == 30 * 50
+    assert len(set(exported)) == len(exported)
+    assert not client._active
+
+
+def test_finishing_a_reaped_span_does_not_export_it_again():
+    client, exporter = _client()
+    span = client.start_trace("op")
+    assert client.reap_abandoned(ttl=0) == 1
+    client.finish_trace(span)
+    client.flush()
+    assert [(s.id, s.status) for s in exporter.spans] == [(span.id, "abandoned")]
+
+
+def test_span_collected_while_expiring_is_reported():
+    client, exporter = _client()
+    span = client.start_trace("op")
+    span_id = span.id
+    entry = client._active[span_id]
+    # Collected without its weakref callback having queued it yet
+    entry.ref = lambda: None
+    del span
+    gc.collect()
+    client._collected.clear()
+
+    assert client.reap_abandoned(ttl=0) == 1
+    client.flush()
+    assert [(s.id, s.status) for s in exporter.spans] == [(span_id, "abandoned")]
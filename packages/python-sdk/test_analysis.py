@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline analysis of span files written by the file exporter
+
+Every format must load into the same SpanTable, whichever reader handles it.
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+from flowscope.core import FlowScopeClient
+
+pytest.importorskip("numpy")
+
+from flowscope import analysis  # noqa: E402  (needs numpy)
+from flowscope.cli import main  # noqa: E402
+
+
+def _write_spans(directory, file_format):
+    client = FlowScopeClient({
+        "exporter": "file", "file_exporter": {"directory": str(directory), "format": file_format},
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+    for request in range(6):
+        with client.trace("request", session_id=f"session-{request % 2}", metadata={"framework": "langchain", "class": "Chain"}):
+            for step in range(5):
+                try:
+                    with client.trace(f"tool.{step % 2}", session_id=f"session-{request % 2}", metadata={"class": f"Tool{step % 2}"}):
+                        if step == 4:
+                            raise RuntimeError("tool failed")
+                except RuntimeError:
+                    pass
+    client.shutdown()
+    return str(directory)
+
+
+@pytest.fixture(scope="module")
+def span_dirs(tmp_path_factory):
+    formats = ["ndjson", "columnar"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        formats.append("parquet")
+    return {name: _write_spans(tmp_path_factory.mktemp(name), name) for name in formats}
+
+
+def _report(table):
+    return {
+        "spans": len(table),
+        "latency_counts": [(row["operation"], row["count"]) for row in analysis.latency_percentiles(table)],
+        "errors": analysis.error_rates(table),
+        "sessions": [(row["session_id"], row["spans"], row["errors"]) for row in analysis.session_rollups(table)],
+    }
+
+
+@pytest.mark.parametrize("file_format", ["ndjson", "columnar", "parquet"])
+def test_formats_load_alike(span_dirs, file_format):
+    if file_format not in span_dirs:
+        pytest.skip("needs pyarrow")
+    report = _report(analysis.load_spans([span_dirs[file_format]]))
+    assert report["spans"] == 36
+    assert report == _report(analysis.load_spans([span_dirs["ndjson"]]))
+    errors = {(row["framework"], row["class"]): row["errors"] for row in report["errors"]}
+    assert errors[("custom", "Tool0")] == 6
+
+
+@pytest.mark.parametrize("file_format", ["ndjson", "columnar", "parquet"])
+def test_filters(span_dirs, file_format):
+    if file_format not in span_dirs:
+        pytest.skip("needs pyarrow")
+    path = [span_dirs[file_format]]
+    table = analysis.load_spans(path, session="session-1", operation="tool.0")
+    assert len(table) == 9
+    assert set(table.values("operation")) == {"tool.0"}
+    assert len(analysis.load_spans(path, session="no-such-session")) == 0
+    assert len(analysis.load_spans(path, since=0, until=1)) == 0
+
+
+def test_ndjson_lines_longer_than_a_block_are_read_record_by_record(span_dirs, monkeypatch):
+    monkeypatch.setattr(analysis, "_JSON_BLOCK_SIZE", 64)
+    report = _report(analysis.load_spans([span_dirs["ndjson"]], session="session-0"))
+    monkeypatch.undo()
+    assert report == _report(analysis.load_spans([span_dirs["ndjson"]], session="session-0"))
+
+
+def test_index_report_does_not_need_numpy(span_dirs, monkeypatch, capsys):
+    directory = span_dirs["columnar"]
+    for name in os.listdir(directory):
+        if name.endswith(".fsidx"):
+            os.remove(os.path.join(directory, name))
+    monkeypatch.setitem(sys.modules, "numpy", None)  # Makes "import numpy" fail
+    monkeypatch.delitem(sys.modules, "flowscope.analysis")
+
+    assert main(["analyze", "index", directory]) == 0
+    assert "36 spans" in capsys.readouterr().out
+    assert any(name.endswith(".fsidx") for name in os.listdir(directory))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compaction of repetitive child spans
+"""
+
+from flowscope.core import FlowScopeClient
+from flowscope.exporters.memory import InMemoryExporter
+
+
+def _client(**policy):
+    exporter = InMemoryExporter()
+    client = FlowScopeClient({
+        "exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+        "compaction": {"threshold": 2, **policy},
+    })
+    return client, exporter
+
+
+def _aggregates(exporter):
+    return [span for span in exporter.spans if span.tags.get("flowscope.compacted")]
+
+
+def test_children_beyond_the_threshold_are_folded():
+    client, exporter = _client()
+    with client.trace("agent") as parent:
+        for _ in range(10):
+            with client.trace("tool"):
+                pass
+    client.flush()
+
+    [aggregate] = _aggregates(exporter)
+    assert aggregate.parent_id == parent.id
+    assert aggregate.tags["flowscope.compacted.count"] == 8
+    assert len(exporter.spans) == 1 + 2 + 1 + 3  # Parent, verbatim, aggregate, slowest exemplars
+    assert client.stats["spans_compacted"] == 5
+
+
+def test_children_finishing_after_their_parent_are_pruned_on_reap():
+    client, exporter = _client()
+    for _ in range(100):
+        parent = client.start_trace("request")
+        children = [client.start_trace("background", parent_id=parent.id) for _ in range(3)]
+        client.finish_trace(parent)  # Fire and forget: the children outlive it
+        for child in children:
+            client.finish_trace(child)
+    assert len(client._compactor._children) == 100
+
+    client.reap_abandoned()
+    assert not client._compactor._children
+    assert not client._compactor._aggregates
+    client.flush()
+    aggregates = _aggregates(exporter)
+    assert len(aggregates) == 100
+    assert all(aggregate.tags["flowscope.compacted.count"] == 1 for aggregate in aggregates)
+
+
+def test_reap_keeps_counters_of_open_parents():
+    client, exporter = _client()
+    parent = client.start_trace("agent")
+    for _ in range(3):
+        client.finish_trace(client.start_trace("tool"))
+    client.reap_abandoned()
+    client.finish_trace(client.start_trace("tool"))
+    client.finish_trace(parent)
+    client.flush()
+
+    [aggregate] = _aggregates(exporter)
+    assert aggregate.tags["flowscope.compacted.count"] == 2
+
+
+def test_children_with_children_of_their_own_are_not_folded():
+    client, exporter = _client()
+    with client.trace("agent"):
+        for i in range(10):
+            with client.trace("step"):
+                if i % 2:
+                    with client.trace("llm"):
+                        pass
+    client.flush()
+
+    exported = {span.id for span in exporter.spans}
+    assert all(span.parent_id is None or span.parent_id in exported for span in exporter.spans)
+    [aggregate] = _aggregates(exporter)
+    # Steps 0 and 1 are within the threshold; of the rest, only the childless ones fold
+    assert aggregate.tags["flowscope.compacted.count"] == 4
+    assert sum(1 for span in exporter.spans if span.operation == "llm") == 5
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Rolling local file exporter
+"""
+
+from flowscope.core import TraceData
+from flowscope.exporters.file import FileExporter, read_records, span_files
+
+
+def _spans(count):
+    spans = [TraceData("op", "s") for _ in range(count)]
+    for span in spans:
+        span.finish()
+    return spans
+
+
+def test_exporters_sharing_a_directory_do_not_overwrite_each_other(tmp_path):
+    # e.g. the client spilling twice to one spool directory within a second
+    for count in (2, 3):
+        exporter = FileExporter({"file_exporter": {"directory": str(tmp_path), "format": "ndjson"}})
+        assert exporter.export(_spans(count))
+        exporter.shutdown()
+
+    paths = span_files([str(tmp_path)])
+    assert len(paths) == 2
+    assert sorted(len(list(read_records(path))) for path in paths) == [2, 3]
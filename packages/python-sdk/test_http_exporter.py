@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+HTTP exporter against the stand-in ingest server
+
+The stand-in checks trace records the way the backend's database stores
+them, so these tests catch payloads the real backend would answer with 500.
+"""
+
+import json
+import socket
+import threading
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from flowscope.core import FlowScopeClient, TraceData
+from flowscope.exporters import http as http_exporter
+from flowscope.exporters.http import HTTPExporter, trace_to_backend_record
+from flowscope.ingest_server import IngestServer
+
+
+@pytest.fixture
+def server():
+    server = IngestServer({"port": 0}).start_in_thread()
+    yield server
+    server.stop()
+
+
+def _client(server, **config):
+    return FlowScopeClient({
+        "backend_url": server.url, "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+        "http_exporter": {"max_retries": 0, "initial_backoff": 0.01},
+        **config,
+    })
+
+
+def test_backend_record_matches_the_dto():
+    trace = TraceData("llm.call", "session-1", parent_id="parent-span", metadata={"framework": "openai"})
+    trace.set_input({"prompt": "hi"})
+    trace.finish()
+    record = trace_to_backend_record(trace)
+
+    assert record["type"] == "llm.call"
+    assert isinstance(record["timestamp"], int) and record["timestamp"] == int(trace.start_time * 1000)
+    assert isinstance(record["duration"], int)
+    assert record["data"]["input"] == {"prompt": "hi"}
+    assert "parentId" not in record
+    assert record["metadata"]["parentSpanId"] == "parent-span"
+    assert record["metadata"]["spanId"] == trace.id
+    assert record["metadata"]["framework"] == "openai"
+
+
+def test_spans_are_stored_in_created_sessions(server):
+    client = _client(server)
+    with client.trace("parent", session_id="chat-1"):
+        with client.trace("child"):
+            pass
+    with client.trace("no-session"):
+        pass
+
+    assert client.flush()
+    stats = server.snapshot()
+    assert stats["spans"] == 3
+    assert stats["invalid_requests"] == 0
+    assert sorted(session["name"] for session in server.sessions.values()) == ["chat-1", "python-sdk"]
+
+    # Sessions are created once per exporter
+    with client.trace("again", session_id="chat-1"):
+        pass
+    assert client.flush()
+    assert server.snapshot()["sessions_created"] == 2
+    client.shutdown()
+
+
+def test_existing_sessions_must_exist(server):
+    client = _client(server, http_exporter={"sessions": "existing", "max_retries": 0})
+    with client.trace("unknown", session_id="not-a-backend-id"):
+        pass
+    assert not client.flush()
+    assert server.snapshot()["invalid_requests"] == 1
+
+    request = urllib.request.Request(server.url + "/api/sessions", data=b'{"name": "created"}', method="POST")
+    with urllib.request.urlopen(request) as response:
+        session_id = json.loads(response.read())["id"]
+    client.traces.clear()
+    with client.trace("known", session_id=session_id):
+        pass
+    assert client.flush()
+    assert server.snapshot()["spans"] == 1
+    client.shutdown(timeout=0)
+
+
+def test_stand_in_rejects_what_the_backend_cannot_store(server):
+    exporter = HTTPExporter({"backend_url": server.url, "http_exporter": {"max_retries": 0}})
+    trace = TraceData("op", "s")
+    trace.finish()
+    exporter._encode = lambda traces: b'[{"type": "op", "duration": 1.5, "data": {}}]'
+    assert not exporter.export([trace])
+    assert server.snapshot()["invalid_requests"] == 1
+
+
+def test_failed_exports_are_requeued_within_the_cap(server):
+    server.config.update(failure_rate=1.0, failure_status=503)
+    client = _client(server, max_queue_size=5)
+    for i in range(3):
+        for _ in range(4):
+            with client.trace(f"op-{i}", session_id="s"):
+                pass
+        assert not client.flush()
+
+    assert len(client.traces) == 5
+    assert client.stats["spans_dropped"] == 7
+    assert [trace.operation for trace in client.traces] == ["op-1"] * 1 + ["op-2"] * 4
+    client.shutdown(timeout=0)
+
+
+def test_shutdown_does_not_wait_out_retries_against_an_unreachable_backend():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = FlowScopeClient({
+        "backend_url": f"http://127.0.0.1:{port}", "verbose": False, "shutdown_hooks": False,
+        "shutdown_timeout": 5.0,
+    })
+    with client.trace("op"):
+        pass
+
+    started = time.monotonic()
+    assert not client.shutdown()
+    assert time.monotonic() - started < 1.0
+    assert client.stats["spans_dropped"] == 1
+
+
+class RecordedWaits(threading.Event):
+    """Backoff sleeps that are recorded instead of waited out."""
+
+    def __init__(self):
+        super().__init__()
+        self.delays = []
+
+    def wait(self, timeout=None):
+        self.delays.append(timeout)
+        return False
+
+
+def _exporter(server, **settings):
+    exporter = HTTPExporter({"backend_url": server.url, "http_exporter": {"initial_backoff": 0.01, **settings}})
+    exporter._stopping = RecordedWaits()
+    return exporter
+
+
+def _batch():
+    trace = TraceData("op", "s")
+    trace.finish()
+    return [trace]
+
+
+def test_circuit_opens_probes_and_closes(server):
+    server.config.update(failure_rate=1.0)
+    exporter = _exporter(server, max_retries=0, failure_threshold=2, recovery_timeout=10.0)
+    breaker = exporter.breaker
+    assert not exporter.export(_batch())
+    assert breaker.state == "closed"
+    assert not exporter.export(_batch())
+    assert breaker.state == "open"
+
+    # Open: refused without a request
+    assert not exporter.export(_batch())
+    assert exporter.stats["circuit_open_skips"] == 1
+    assert server.snapshot()["requests"] == 2
+
+    # After the recovery timeout one probe goes out; its failure reopens the circuit for twice as long
+    breaker.opened_at -= 10.0
+    assert not exporter.export(_batch())
+    assert breaker.state == "open"
+    assert breaker.recovery_timeout == 20.0
+    assert server.snapshot()["requests"] == 3
+
+    server.config.update(failure_rate=0.0)
+    breaker.opened_at -= 10.0
+    assert not exporter.export(_batch())  # Still open
+    breaker.opened_at -= 10.0
+    assert exporter.export(_batch())
+    assert breaker.state == "closed"
+    assert breaker.recovery_timeout == 10.0
+    assert server.snapshot()["spans"] == 1
+
+
+def test_retries_back_off_exponentially_with_full_jitter(server, monkeypatch):
+    server.config.update(failure_rate=1.0)
+    ceilings = []
+
+    def uniform(low, high):
+        ceilings.append((low, high))
+        return high / 2
+
+    monkeypatch.setattr(http_exporter, "random", SimpleNamespace(uniform=uniform))
+    exporter = _exporter(server, max_retries=4, initial_backoff=0.01, max_backoff=0.05, failure_threshold=10)
+    assert not exporter.export(_batch())
+
+    assert ceilings[:4] == [(0, 0.01), (0, 0.02), (0, 0.04), (0, 0.05)]
+    # Only retries wait; the last attempt gives up instead
+    assert exporter._stopping.delays == [0.005, 0.01, 0.02, 0.025]
+    assert exporter.stats["retries"] == 4
+    assert server.snapshot()["requests"] == 5
+
+
+def test_retry_after_sets_the_minimum_delay(server):
+    server.config.update(failure_rate=1.0, failure_status=429, retry_after=2)
+    exporter = _exporter(server, max_retries=2, failure_threshold=10)
+    assert not exporter.export(_batch())
+    assert exporter._stopping.delays == [2.0, 2.0]
+
+    # But never beyond max_backoff
+    capped = _exporter(server, max_retries=1, max_backoff=0.5, failure_threshold=10)
+    assert not capped.export(_batch())
+    assert capped._stopping.delays == [0.5]
+
+
+def test_retried_batch_is_delivered_once_the_backend_recovers(server):
+    server.config.update(failure_rate=1.0)
+    exporter = _exporter(server, max_retries=3, failure_threshold=10)
+    exporter._stopping.wait = lambda timeout=None: server.config.update(failure_rate=0.0) or False
+    assert exporter.export(_batch())
+    assert exporter.stats["retries"] == 1
+    assert server.snapshot()["spans"] == 1
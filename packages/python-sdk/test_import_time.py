@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the FlowScope Python SDK
+
+Cold-start latency matters for serverless functions, so importing flowscope
+must stay cheap and side-effect free: no transports, no frameworks, no output.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SDK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time (microseconds) allowed for everything a statement
+# imports, with ample headroom over a development machine's timings so that
+# scheduler noise does not fail the test but an eagerly imported dependency does
+IMPORT_BUDGET_US = {
+    "import flowscope": 15_000,
+    "from flowscope import trace, with_context, auto_instrument": 40_000,
+    "import flowscope.langchain, flowscope.llamaindex": 40_000,
+}
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = ["httpx", "websockets", "asyncio", "langchain", "langchain_core", "llama_index", "numpy", "pyarrow"]
+
+
+def _run(statement: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", statement],
+        cwd=SDK_DIR, capture_output=True, text=True, check=True,
+    )
+
+
+def _import_time_us(statement: str) -> int:
+    """Sum the cumulative time of top-level imports made by statement (after interpreter startup)."""
+    result = _run(statement, "-X", "importtime")
+    total = 0
+    after_startup = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level entries have no indentation before the module name
+        if name.startswith(" ") and not name.startswith("  "):
+            if after_startup:
+                total += int(cumulative)
+            elif name.strip() == "site":
+                after_startup = True
+    return total
+
+
+@pytest.mark.parametrize("statement", list(IMPORT_BUDGET_US))
+def test_import_time_budget(statement):
+    # Best of three runs to smooth out scheduler noise
+    elapsed = min(_import_time_us(statement) for _ in range(3))
+    assert elapsed <= IMPORT_BUDGET_US[statement], (
+        f"{statement!r} took {elapsed / 1000:.1f}ms, budget is {IMPORT_BUDGET_US[statement] / 1000:.1f}ms"
+    )
+
+
+@pytest.mark.parametrize("statement", list(IMPORT_BUDGET_US))
+def test_import_is_side_effect_free(statement):
+    check = f"{statement}; import sys; print(','.join(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    result = _run(check)
+    assert result.stdout.strip() == "", f"{statement!r} imported or printed: {result.stdout!r}"
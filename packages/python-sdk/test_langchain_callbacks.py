@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+LangChain callback handler, driven with the events LangChain's callback
+manager sends, so langchain itself is not needed
+"""
+
+from uuid import uuid4
+
+import pytest
+
+import flowscope
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.langchain.callbacks import FlowScopeCallbackHandler
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    client = flowscope.init({"exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False})
+    yield exporter
+    client.shutdown()
+
+
+def _spans(exporter):
+    flowscope.flush()
+    return {span.operation: span for span in exporter.spans}
+
+
+def test_runs_are_linked_by_parent_run_id(exporter):
+    handler = FlowScopeCallbackHandler()
+    chain, llm = uuid4(), uuid4()
+    handler.on_chain_start({"name": "Sequence"}, {"q": "hi"}, run_id=chain, tags=["t"])
+    handler.on_llm_start({"name": "FakeLLM"}, ["hi"], run_id=llm, parent_run_id=chain)
+    handler.on_llm_end(None, run_id=llm, parent_run_id=chain)
+    handler.on_chain_end({"a": "hello"}, run_id=chain)
+
+    spans = _spans(exporter)
+    assert spans["langchain.FakeLLM"].parent_id == spans["langchain.Sequence"].id
+    assert spans["langchain.Sequence"].parent_id is None
+    assert spans["langchain.Sequence"].tags["langchain_tags"] == ["t"]
+    assert spans["langchain.FakeLLM"].metadata["run_type"] == "llm"
+
+
+def test_interleaved_root_runs_are_not_parented_to_each_other(exporter):
+    # Concurrent asyncio runs deliver their events interleaved on one thread
+    handler = FlowScopeCallbackHandler()
+    first, second = uuid4(), uuid4()
+    handler.on_chain_start({"name": "First"}, {}, run_id=first)
+    handler.on_chain_start({"name": "Second"}, {}, run_id=second)
+    handler.on_chain_end({}, run_id=first)
+    handler.on_chain_end({}, run_id=second)
+
+    spans = _spans(exporter)
+    assert spans["langchain.First"].parent_id is None
+    assert spans["langchain.Second"].parent_id is None
+
+
+def test_runs_leave_the_thread_stack_alone(exporter):
+    client = flowscope.get_client()
+    handler = FlowScopeCallbackHandler()
+    outer = client.start_trace("unrelated")
+    run = uuid4()
+    handler.on_chain_start({"name": "Chain"}, {}, run_id=run)
+    assert client.trace_stack == [outer.id]
+    with client.trace("meanwhile"):
+        pass
+    handler.on_chain_end({}, run_id=run)
+    client.finish_trace(outer)
+
+    spans = _spans(exporter)
+    assert spans["langchain.Chain"].parent_id is None
+    assert spans["meanwhile"].parent_id == outer.id
+    assert client.trace_stack == []
+
+
+def test_batch_items_are_children_of_the_batch_span(exporter):
+    handler = FlowScopeCallbackHandler()
+
+    class Runnable:
+        name = "Stub"
+
+        def batch(self, inputs, configs):
+            runs = [uuid4() for _ in inputs]
+            # Start every item before any ends, as a concurrent batch does
+            for value, config, run in zip(inputs, configs, runs):
+                config["callbacks"][0].on_chain_start({"name": "Stub"}, value, run_id=run, metadata=config["metadata"])
+            for value, config, run in zip(inputs, configs, runs):
+                config["callbacks"][0].on_chain_end(value * 2, run_id=run)
+            return [value * 2 for value in inputs]
+
+    assert handler.batch(Runnable(), [1, 2, 3], {"metadata": {"user": "u"}}) == [2, 4, 6]
+
+    flowscope.flush()
+    [batch] = [span for span in exporter.spans if span.operation == "langchain.Stub.batch"]
+    items = sorted((span for span in exporter.spans if span.operation == "langchain.Stub"),
+                   key=lambda span: span.metadata["batch_index"])
+    assert [item.parent_id for item in items] == [batch.id] * 3
+    assert [item.metadata["concurrency_slot"] for item in items] == [0, 1, 2]
+    # Batch-level config metadata is kept on the batch span only
+    assert batch.metadata["langchain_metadata"] == {"user": "u"}
+    assert all("langchain_metadata" not in item.metadata for item in items)
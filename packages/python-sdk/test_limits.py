@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Span and trace limits
+"""
+
+from flowscope.core import FlowScopeClient, NonRecordingSpan
+from flowscope.exporters.memory import InMemoryExporter
+
+
+def _client(**config):
+    exporter = InMemoryExporter()
+    client = FlowScopeClient({
+        "exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False, **config,
+    })
+    return client, exporter
+
+
+def test_refused_children_are_non_recording_spans():
+    client, exporter = _client(limits={"max_children": 2})
+    with client.trace("parent") as parent:
+        for i in range(5):
+            with client.trace("child", metadata={"i": i}) as child:
+                child.set_tag("attempt", i)
+                child.add_metadata(model="gpt-4o")
+                child.add_event("retry")
+                child.set_input({"i": i})
+                child.set_output(i)
+    client.flush()
+
+    children = [span for span in exporter.spans if span.operation == "child"]
+    assert len(children) == 2
+    assert isinstance(child, NonRecordingSpan) and not child.is_recording
+    assert child.parent_id == parent.id
+    assert child.tags == {} and child.events == [] and child.output_data is None
+    assert parent.tags["flowscope.dropped.children"] == 3
+    assert len(exporter.spans) == 3
+    assert not client._active and client.trace_stack == []
+
+
+def test_refused_span_still_propagates_exceptions():
+    client, exporter = _client(limits={"max_spans_per_trace": 1})
+    with client.trace("root"):
+        try:
+            with client.trace("refused") as span:
+                assert not span.is_recording
+                raise KeyError("boom")
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("exception swallowed")
+    client.flush()
+    assert [span.operation for span in exporter.spans] == ["root"]
+
+
+def test_disabled_client_yields_none():
+    client, exporter = _client(disabled=True)
+    with client.trace("op") as span:
+        assert span is None
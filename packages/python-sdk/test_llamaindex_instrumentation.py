@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+LlamaIndex dispatcher bridge, driven with the span and event callbacks the
+dispatcher makes, so llama_index itself is not needed
+
+Stub classes are named after the LlamaIndex base classes stages are
+recognized by.
+"""
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+import flowscope
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.llamaindex.instrumentation import LlamaIndexDispatcherBridge
+
+
+class BaseQueryEngine:
+    pass
+
+
+class RetrieverQueryEngine(BaseQueryEngine):
+    pass
+
+
+class BaseRetriever:
+    pass
+
+
+class VectorIndexRetriever(BaseRetriever):
+    pass
+
+
+class BaseEmbedding:
+    num_workers = 2
+
+
+class FakeEmbedding(BaseEmbedding):
+    pass
+
+
+def RetrievalEndEvent(span_id, nodes):
+    return type("RetrievalEndEvent", (SimpleNamespace,), {})(span_id=span_id, nodes=nodes)
+
+
+def EmbeddingStartEvent(span_id):
+    return type("EmbeddingStartEvent", (SimpleNamespace,), {})(span_id=span_id, model_dict={"model_name": "fake"})
+
+
+def EmbeddingEndEvent(span_id, chunks):
+    return type("EmbeddingEndEvent", (SimpleNamespace,), {})(
+        span_id=span_id, chunks=chunks, embeddings=[[0.0, 1.0, 2.0] for _ in chunks],
+    )
+
+
+def _node(score, text):
+    return SimpleNamespace(score=score, get_content=lambda: text)
+
+
+def _span_id(cls, method):
+    return f"{cls.__name__}.{method}-{uuid4()}"
+
+
+def _args(**arguments):
+    return SimpleNamespace(arguments=arguments)
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    client = flowscope.init({"exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False})
+    yield exporter
+    client.shutdown()
+
+
+def _spans(exporter):
+    flowscope.flush()
+    return exporter.spans
+
+
+def test_stages_nest_by_dispatcher_parent(exporter):
+    bridge = LlamaIndexDispatcherBridge()
+    engine, retriever = RetrieverQueryEngine(), VectorIndexRetriever()
+    query = _span_id(RetrieverQueryEngine, "query")
+    retrieve = _span_id(VectorIndexRetriever, "retrieve")
+    inner = _span_id(VectorIndexRetriever, "_retrieve")
+    helper = _span_id(object, "helper")
+
+    bridge.span_enter(query, _args(query="q"), engine)
+    bridge.span_enter(helper, _args(), None, parent_id=query)  # Not a stage: aliased to the query
+    bridge.span_enter(retrieve, _args(), retriever, parent_id=helper)
+    bridge.span_enter(inner, _args(), retriever, parent_id=retrieve)  # Same stage: aliased
+    bridge.handle(RetrievalEndEvent(inner, [_node(0.2, "ab"), _node(0.9, "cde")]))
+    bridge.span_exit(inner)
+    bridge.span_exit(retrieve, result=["nodes"])
+    bridge.span_exit(helper)
+    bridge.span_exit(query, result="answer")
+
+    query_span, retrieve_span = sorted(_spans(exporter), key=lambda span: span.metadata["stage"])
+    assert query_span.operation == "llamaindex.RetrieverQueryEngine.query"
+    assert query_span.parent_id is None
+    assert retrieve_span.metadata["stage"] == "vector_search"
+    assert retrieve_span.parent_id == query_span.id
+    assert retrieve_span.metadata["node_count"] == 2
+    assert retrieve_span.metadata["top_scores"] == [0.9, 0.2]
+    assert retrieve_span.metadata["payload_chars"] == 5
+    assert not bridge._traces and not bridge._aliases
+
+
+def test_interleaved_queries_are_not_parented_to_each_other_or_the_thread(exporter):
+    client = flowscope.get_client()
+    bridge = LlamaIndexDispatcherBridge()
+    outer = client.start_trace("unrelated")
+    first = _span_id(RetrieverQueryEngine, "aquery")
+    second = _span_id(RetrieverQueryEngine, "aquery")
+    bridge.span_enter(first, _args(), RetrieverQueryEngine())
+    bridge.span_enter(second, _args(), RetrieverQueryEngine())
+    assert client.trace_stack == [outer.id]
+    bridge.span_exit(first)
+    bridge.span_exit(second)
+    client.finish_trace(outer)
+
+    spans = [span for span in _spans(exporter) if span.operation != "unrelated"]
+    assert [span.parent_id for span in spans] == [None, None]
+    assert client.trace_stack == []
+
+
+def test_batch_embedding_chunks_become_batch_items(exporter):
+    bridge = LlamaIndexDispatcherBridge()
+    embed = _span_id(FakeEmbedding, "get_text_embedding_batch")
+    bridge.span_enter(embed, _args(texts=["a", "bb", "ccc"]), FakeEmbedding())
+    bridge.handle(EmbeddingStartEvent(embed))
+    bridge.handle(EmbeddingStartEvent(embed))
+    bridge.handle(EmbeddingEndEvent(embed, ["a", "bb"]))
+    bridge.handle(EmbeddingEndEvent(embed, ["ccc"]))
+    bridge.span_exit(embed)
+
+    spans = _spans(exporter)
+    [batch] = [span for span in spans if span.operation.endswith("get_text_embedding_batch")]
+    chunks = [span for span in spans if span.operation.endswith(".chunk")]
+    assert batch.metadata["batch_size"] == 3
+    assert batch.metadata["chunk_count"] == 3
+    assert batch.metadata["embedding_dim"] == 3
+    assert batch.metadata["model"] == "fake"
+    assert [chunk.parent_id for chunk in chunks] == [batch.id, batch.id]
+    assert sorted(chunk.metadata["chunk_count"] for chunk in chunks) == [1, 2]
+
+
+def test_failed_span_is_recorded_as_an_error(exporter):
+    bridge = LlamaIndexDispatcherBridge()
+    retrieve = _span_id(VectorIndexRetriever, "retrieve")
+    bridge.span_enter(retrieve, _args(), VectorIndexRetriever())
+    bridge.span_exit(retrieve, err=TimeoutError("vector store timed out"))
+
+    [span] = _spans(exporter)
+    assert span.status == "error"
+    assert span.error == "vector store timed out"
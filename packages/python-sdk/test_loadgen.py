@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Synthetic load against the in-process stand-in ingest server
+"""
+
+import pytest
+
+from flowscope.ingest_server import IngestServer
+from flowscope.loadgen import run_load
+
+
+@pytest.fixture
+def server():
+    server = IngestServer({"port": 0}).start_in_thread()
+    yield server
+    server.stop()
+
+
+def _run(server, **http_exporter):
+    return run_load(
+        {"rate": 2000, "duration": 0.5, "payload_bytes": 64, "seed": 1},
+        {"backend_url": server.url, "batch_size": 10,
+         "http_exporter": {"initial_backoff": 0.01, "max_backoff": 0.05, **http_exporter}},
+        drain_timeout=10.0,
+    )
+
+
+def test_every_generated_span_is_delivered(server):
+    report = _run(server)
+    assert report["spans_generated"] > 500
+    assert report["spans_delivered"] == report["spans_generated"]
+    assert report["drained"]
+
+
+def test_every_span_is_delivered_despite_slow_and_failing_requests(server):
+    # Flushes still backing off between retries when the client shuts down must be waited for
+    server.config.update(latency_ms=10, failure_rate=0.2)
+    report = _run(server, max_retries=8, initial_backoff=0.2, max_backoff=0.4, failure_threshold=1000)
+    assert report["spans_delivered"] == report["spans_generated"]
+    assert report["drained"]
+    assert report["client_stats"]["spans_dropped"] == 0
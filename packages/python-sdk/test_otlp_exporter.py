@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+OTLP exporter against the stand-in ingest server's /v1/traces route
+"""
+
+import gzip
+
+import pytest
+
+from flowscope.core import FlowScopeClient, TraceData
+from flowscope.exporters.otlp import OTLPExporter, decode_export_request
+from flowscope.ingest_server import IngestServer
+
+
+@pytest.fixture
+def server():
+    server = IngestServer({"port": 0}).start_in_thread()
+    yield server
+    server.stop()
+
+
+def _exporter(**settings):
+    return OTLPExporter({"otlp_exporter": {"endpoint": "http://127.0.0.1:1/v1/traces", **settings}})
+
+
+def test_spans_round_trip_through_the_encoding():
+    exporter = _exporter(compression=None, include_payloads=True, resource_attributes={"deployment": "test"})
+    parent = TraceData("agent.run", "session-1", metadata={"framework": "langchain", "model": "gpt-4o"})
+    child = TraceData("tool.call", "session-1", parent_id=parent.id)
+    child.trace_id = parent.trace_id
+    child.set_tag("attempts", -3)
+    child.set_tag("ratio", 0.25)
+    child.set_tag("flags", {"cached": True, "tiers": [1, "two"]})
+    child.set_input({"query": "weather"})
+    child.add_event("retry", {"delay": 1.5})
+    child.finish(success=False, error="tool timed out")
+    parent.finish()
+
+    spans = {span["name"]: span for span in decode_export_request(exporter._encode([parent, child]))}
+    agent, tool = spans["agent.run"], spans["tool.call"]
+
+    assert tool["traceId"] == agent["traceId"] == exporter._trace_id(parent).hex()
+    assert tool["parentSpanId"] == agent["spanId"] == exporter._span_id(parent.id).hex()
+    assert agent["parentSpanId"] is None
+    assert tool["startTimeUnixNano"] == int(child.start_time * 1e9)
+    assert tool["endTimeUnixNano"] == int(child.end_time * 1e9)
+    assert agent["attributes"]["flowscope.framework"] == "langchain"
+    assert agent["attributes"]["flowscope.metadata.model"] == "gpt-4o"
+    assert agent["status"] == {"code": 1}
+    assert tool["status"] == {"code": 2, "message": "tool timed out"}
+    assert tool["attributes"]["attempts"] == -3
+    assert tool["attributes"]["ratio"] == 0.25
+    assert tool["attributes"]["flags"] == {"cached": True, "tiers": [1, "two"]}
+    assert tool["attributes"]["flowscope.input"] == '{"query": "weather"}'
+    assert tool["events"][0]["name"] == "retry"
+    assert tool["events"][0]["attributes"] == {"delay": 1.5}
+    assert tool["resource"]["session.id"] == "session-1"
+    assert tool["resource"]["deployment"] == "test"
+    assert tool["scope"]["name"] == "flowscope"
+
+
+def test_client_exports_to_the_stand_in(server):
+    client = FlowScopeClient({
+        "exporter": "otlp", "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+        "otlp_exporter": {"endpoint": server.url + "/v1/traces", "max_retries": 0},
+    })
+    with client.trace("parent", session_id="s"):
+        with client.trace("child"):
+            pass
+
+    assert client.flush()
+    stats = server.snapshot()
+    assert stats["spans"] == 2
+    assert stats["bad_requests"] == stats["invalid_requests"] == 0
+    assert stats["lag_max_ms"] is not None
+    client.shutdown()
+
+
+def test_stand_in_rejects_malformed_requests(server):
+    exporter = _exporter(endpoint=server.url + "/v1/traces", max_retries=0)
+    trace = TraceData("op", "s")
+    trace.finish()
+    exporter._encode = lambda traces: gzip.compress(b"\x0a\x05\x0a\x03")  # Truncated ResourceSpans
+    assert exporter.export([trace])  # Rejected outright, so not kept for a retry
+    assert server.snapshot()["bad_requests"] == 1
+
+    with pytest.raises(ValueError):
+        decode_export_request(b"\x0a\xff")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Summaries of embeddings and numeric arrays in captured payloads
+"""
+
+import math
+
+import pytest
+
+import flowscope
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.payload import PayloadSummarizer, summarize_payload
+
+
+class FakeTensor:
+    """Tensor-like object with a dtype, a shape and a torch-style detach().cpu().numpy()."""
+
+    def __init__(self, array):
+        self.array = array
+        self.dtype = array.dtype
+        self.shape = array.shape
+
+    def detach(self):
+        return self
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+def test_long_float_list_is_summarized():
+    vector = [0.5] * 1536
+    summary = summarize_payload({"embedding": vector, "model": "embed"})
+    assert summary["model"] == "embed"
+    assert summary["embedding"] == {
+        "$array": True,
+        "shape": [1536],
+        "dtype": "float64",
+        "norm": pytest.approx(math.sqrt(1536 * 0.25)),
+        "prefix": [0.5] * 8,
+    }
+
+
+def test_batch_of_embeddings_is_summarized_as_a_matrix():
+    rows = [[3.0] + [0.0] * 99, [0.0] * 99 + [4.0]]
+    summary = summarize_payload({"data": [{"vectors": rows}]}, {"prefix_length": 2})
+    matrix = summary["data"][0]["vectors"]
+    assert matrix["shape"] == [2, 100]
+    assert matrix["norm"] == pytest.approx(5.0)
+    assert (matrix["row_norm_min"], matrix["row_norm_max"]) == (3.0, 4.0)
+    assert matrix["prefix"] == [3.0, 0.0]
+
+
+def test_short_and_non_float_lists_pass_through_unchanged():
+    data = {"scores": [0.1, 0.2, 0.3], "ids": list(range(500)), "nested": [[1.0, 2.0]]}
+    assert summarize_payload(data) is data
+    assert summarize_payload([0.25] * 64, {"summarize_arrays": False}) == [0.25] * 64
+
+
+def test_numpy_arrays_and_tensors_are_summarized():
+    numpy = pytest.importorskip("numpy")
+    array = numpy.ones((4, 256), dtype=numpy.float32)
+    summarizer = PayloadSummarizer({"prefix_length": 3})
+
+    summary = summarizer.summarize({"array": array, "tensor": FakeTensor(array[:1])})
+    assert summary["array"] == {
+        "$array": True,
+        "type": "ndarray",
+        "shape": [4, 256],
+        "dtype": "float32",
+        "prefix": [1.0, 1.0, 1.0],
+        "norm": pytest.approx(32.0),
+    }
+    assert summary["tensor"]["type"] == "FakeTensor"
+    assert summary["tensor"]["shape"] == [1, 256]
+    assert summary["tensor"]["norm"] == pytest.approx(16.0)
+
+
+def test_captured_span_input_is_summarized():
+    exporter = InMemoryExporter()
+    client = flowscope.init({"exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False})
+    try:
+        with client.trace("embed") as span:
+            span.set_input({"texts": ["a"]})
+            span.set_output([[1.0] * 128])
+        flowscope.flush()
+        [span] = exporter.spans
+        assert span.input_data == {"texts": ["a"]}
+        assert span.output_data["shape"] == [1, 128]
+    finally:
+        client.shutdown()
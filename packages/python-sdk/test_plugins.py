@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Instrumentation plugins against stubbed provider SDK classes
+
+The stubs stand in for openai.resources.chat.Completions and
+anthropic.resources.messages.Messages, returning plain dicts shaped like the
+SDKs' response objects and stream events.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import flowscope
+from flowscope.auto import instrument_class
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.plugins import InstrumentationPlugin, MethodTarget, get_plugin, register_plugin
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    client = flowscope.init({"exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False})
+    yield exporter
+    client.shutdown()
+
+
+def _spans(exporter):
+    flowscope.flush()
+    return exporter.spans
+
+
+def _chat_chunk(text=None, usage=None):
+    return {"model": "gpt-4o-2024", "choices": [{"index": 0, "delta": {"content": text}}], "usage": usage}
+
+
+def test_openai_completion_records_model_and_token_usage(exporter):
+    class Completions:
+        def create(self, **kwargs):
+            return {"model": "gpt-4o-2024", "usage": {"prompt_tokens": 12, "completion_tokens": 30}}
+
+    instrument_class(Completions, "openai")
+    Completions().create(model="gpt-4o", messages=[])
+
+    [span] = _spans(exporter)
+    assert span.operation == "openai.chat.completions.create"
+    assert span.metadata["framework"] == "openai"
+    assert span.metadata["model"] == "gpt-4o"
+    assert span.metadata["response_model"] == "gpt-4o-2024"
+    assert span.metadata["token_usage"] == {"prompt_tokens": 12, "completion_tokens": 30, "total_tokens": 42}
+    assert span.metadata["tokens_per_second"] > 0
+
+
+def test_openai_stream_span_ends_with_the_stream(exporter):
+    class Completions:
+        def create(self, stream=False, **kwargs):
+            return iter([
+                _chat_chunk(),
+                _chat_chunk("Hel"),
+                _chat_chunk("lo"),
+                _chat_chunk(usage={"prompt_tokens": 5, "completion_tokens": 2}),
+            ])
+
+    instrument_class(Completions, "openai")
+    stream = Completions().create(model="gpt-4o", stream=True)
+    assert _spans(exporter) == []  # Still open while the stream is unread
+
+    assert [chunk["choices"][0]["delta"]["content"] for chunk in stream] == [None, "Hel", "lo", None]
+    [span] = _spans(exporter)
+    assert span.status == "success"
+    assert span.output_data == "Hello"
+    assert span.metadata["token_count"] == 2
+    assert span.metadata["token_usage"]["completion_tokens"] == 2
+    assert span.metadata["time_to_first_token"] >= 0
+    assert [event["name"] for event in span.events] == ["first_token"]
+
+
+def test_spans_started_while_a_stream_is_open_are_not_its_children(exporter):
+    class Completions:
+        def create(self, stream=False, **kwargs):
+            return iter([_chat_chunk("hi")])
+
+    instrument_class(Completions, "openai")
+    stream = Completions().create(model="gpt-4o", stream=True)
+    with flowscope.get_client().trace("unrelated"):
+        pass
+    list(stream)
+
+    spans = {span.operation: span for span in _spans(exporter)}
+    assert spans["unrelated"].parent_id is None
+
+
+def test_anthropic_async_message_and_stream(exporter):
+    class AsyncMessages:
+        async def create(self, stream=False, **kwargs):
+            if not stream:
+                return {"model": "claude-x", "usage": {"input_tokens": 7, "output_tokens": 3}, "stop_reason": "end_turn"}
+            return _events([
+                {"type": "message_start", "message": {"model": "claude-x", "usage": {"input_tokens": 7, "output_tokens": 1}}},
+                {"type": "content_block_delta", "delta": {"text": "Hi"}},
+                {"type": "content_block_delta", "delta": {"text": "!"}},
+                {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 4}},
+            ])
+
+    async def _events(events):
+        for event in events:
+            yield event
+
+    async def run():
+        messages = AsyncMessages()
+        await messages.create(model="claude", messages=[])
+        stream = await messages.create(model="claude", messages=[], stream=True)
+        return [event["type"] async for event in stream]
+
+    instrument_class(AsyncMessages, "anthropic")
+    assert asyncio.run(run())[0] == "message_start"
+
+    message, streamed = _spans(exporter)
+    assert message.operation == streamed.operation == "anthropic.messages.create"
+    assert message.metadata["token_usage"] == {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}
+    assert message.metadata["stop_reason"] == "end_turn"
+    assert streamed.output_data == "Hi!"
+    assert streamed.metadata["token_usage"] == {"prompt_tokens": 7, "completion_tokens": 4, "total_tokens": 11}
+    assert streamed.metadata["token_count"] == 2
+
+
+def test_failing_stream_finishes_its_span_as_an_error(exporter):
+    class Messages:
+        def create(self, stream=False, **kwargs):
+            yield {"type": "content_block_delta", "delta": {"text": "partial"}}
+            raise ConnectionError("stream reset")
+
+    instrument_class(Messages, "anthropic")
+    with pytest.raises(ConnectionError):
+        list(Messages().create(model="claude", stream=True))
+
+    [span] = _spans(exporter)
+    assert span.status == "error"
+    assert span.error == "stream reset"
+
+
+def test_broken_extractor_does_not_break_the_call(exporter):
+    def response_metadata(result):
+        raise KeyError("usage")
+
+    register_plugin(InstrumentationPlugin("stubbed", ["stubbed"], [
+        MethodTarget("Client", ["call"], response_metadata=response_metadata),
+    ]))
+
+    class Client:
+        def call(self):
+            return SimpleNamespace(value=1)
+
+    instrument_class(Client, get_plugin("stubbed"))
+    assert Client().call().value == 1
+    [span] = _spans(exporter)
+    assert span.operation == "stubbed.Client.call"
+    assert span.status == "success"
+
+
+def test_unknown_class_is_rejected():
+    class Unrelated:
+        def create(self):
+            pass
+
+    with pytest.raises(ValueError):
+        instrument_class(Unrelated, "openai")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Express export lane for error and flagged spans
+"""
+
+import pytest
+
+from flowscope.core import FlowScopeClient
+from flowscope.exporters.memory import InMemoryExporter
+
+
+class FailingOnce(InMemoryExporter):
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def export(self, traces):
+        if not self.failed:
+            self.failed = True
+            return False
+        return super().export(traces)
+
+
+def _client(exporter, **priority):
+    return FlowScopeClient({
+        "exporter": exporter, "priority": priority,
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+
+
+def _fail(client, operation, **kwargs):
+    with pytest.raises(RuntimeError):
+        with client.trace(operation, **kwargs):
+            raise RuntimeError("failed")
+
+
+def _operations(exporter):
+    return [span.operation for span in exporter.spans]
+
+
+def test_errors_and_matching_spans_go_ahead_of_the_routine_batch():
+    exporter = InMemoryExporter()
+    client = _client(exporter, operations=["llm.*"], include_ancestors=False)
+    with client.trace("routine.before"):
+        pass
+    _fail(client, "tool.call")
+    with client.trace("llm.chat"):
+        pass
+    with client.trace("flagged") as span:
+        span.set_tag("flowscope.priority", "high")
+    with client.trace("routine.after"):
+        pass
+
+    assert client.flush_express()
+    assert _operations(exporter) == ["tool.call", "llm.chat", "flagged"]
+    assert client.stats["spans_expedited"] == 3
+
+    assert client.flush()
+    assert _operations(exporter)[3:] == ["routine.before", "routine.after"]
+    client.shutdown()
+
+
+def test_ancestors_follow_an_expedited_span():
+    exporter = InMemoryExporter()
+    client = _client(exporter)
+    # A finished, buffered parent is moved over; open ones are expedited when they finish
+    detached = client.start_trace("detached.parent")
+    client.finish_trace(detached)
+    with client.trace("agent"):
+        with client.trace("sibling"):
+            pass
+        with client.trace("step"):
+            _fail(client, "tool.call")
+        orphan = client.start_trace("fire.and.forget", parent_id=detached.id)
+        client.finish_trace(orphan, success=False, error="failed")
+    with client.trace("unrelated"):
+        pass
+
+    assert client.flush_express()
+    assert _operations(exporter) == ["tool.call", "step", "fire.and.forget", "detached.parent", "agent"]
+    assert client.stats["spans_expedited"] == 5
+    assert client.flush()
+    assert sorted(_operations(exporter)[5:]) == ["sibling", "unrelated"]
+    client.shutdown()
+
+
+def test_ancestors_stay_routine_without_include_ancestors():
+    exporter = InMemoryExporter()
+    client = _client(exporter, include_ancestors=False)
+    with client.trace("agent"):
+        _fail(client, "tool.call")
+
+    assert client.flush_express()
+    assert _operations(exporter) == ["tool.call"]
+    client.shutdown()
+
+
+def test_failed_express_export_is_requeued_at_the_front_of_the_lane():
+    exporter = FailingOnce()
+    client = _client(exporter, include_ancestors=False)
+    _fail(client, "first")
+    _fail(client, "second")
+    assert not client.flush_express()
+    assert [span.operation for span in client._express] == ["first", "second"]
+
+    _fail(client, "third")
+    assert client.flush_express()
+    assert _operations(exporter) == ["first", "second", "third"]
+    assert client._express == []
+    client.shutdown()
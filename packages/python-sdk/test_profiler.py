@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Sampling profiler attached to long-running spans
+"""
+
+import time
+
+import pytest
+
+import flowscope
+from flowscope import profiler
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.profiler import SamplingProfiler
+
+
+def _hot_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_long_span_receives_samples():
+    exporter = InMemoryExporter()
+    client = flowscope.init({
+        "exporter": exporter, "profiler": {"threshold_ms": 20, "interval_ms": 5, "max_overhead": 0.5},
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+    try:
+        with client.trace("slow"):
+            _hot_loop(0.3)
+        with client.trace("fast"):
+            pass
+        flowscope.flush()
+    finally:
+        client.shutdown()
+
+    spans = {span.operation: span for span in exporter.spans}
+    profile = spans["slow"].metadata["profile"]
+    assert profile["samples"] == sum(profile["stacks"].values()) > 0
+    assert any(stack.endswith("test_profiler:_hot_loop") for stack in profile["stacks"])
+    assert "profile" not in spans["fast"].metadata
+
+
+@pytest.mark.parametrize("max_overhead", [0, -0.1, 1.5])
+def test_max_overhead_out_of_range_is_rejected(max_overhead):
+    with pytest.raises(ValueError):
+        SamplingProfiler({"max_overhead": max_overhead})
+
+
+def test_frame_label_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(profiler, "_MAX_LABELS", 10)
+    sampler = SamplingProfiler()
+    codes = [compile("pass", f"generated_{i}.py", "exec") for i in range(25)]
+    labels = [sampler._label(code) for code in codes]
+    assert labels[-1] == "generated_24:<module>"
+    assert len(sampler._labels) <= 10
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+The pytest plugin, run against generated test modules with pytester
+
+The plugin is loaded explicitly, and its entry point blocked in case
+flowscope is installed, so it is registered exactly once.
+"""
+
+import json
+
+import pytest
+
+import flowscope
+from flowscope.exporters.memory import InMemoryExporter
+
+pytest_plugins = ["pytester"]
+
+_PLUGIN_ARGS = ("-p", "no:flowscope", "-p", "flowscope.pytest_plugin", "-p", "no:cacheprovider")
+
+
+@pytest.fixture(autouse=True)
+def client():
+    # The generated tests run in this process, on the global client
+    client = flowscope.init({"exporter": InMemoryExporter(), "verbose": False, "shutdown_hooks": False, "auto_flush": False})
+    yield client
+    client.shutdown()
+
+
+def _run(pytester, *args):
+    return pytester.runpytest(*_PLUGIN_ARGS, *args)
+
+
+def _traced_module(calls="1", sleep_ms="0"):
+    return f"""
+        import time
+        import pytest
+        import flowscope
+
+        def step():
+            with flowscope.get_client().trace("app.step"):
+                time.sleep({sleep_ms} / 1000)
+
+        def test_steps(flowscope_spans):
+            for _ in range({calls}):
+                step()
+    """
+
+
+def test_budget_marker_passes_and_fails(pytester):
+    pytester.makepyfile("""
+        import time
+        import pytest
+        import flowscope
+
+        @pytest.mark.flowscope_budget("app.*", p95=5000)
+        def test_within_budget():
+            with flowscope.get_client().trace("app.fast"):
+                pass
+
+        @pytest.mark.flowscope_budget("app.*", max=1)
+        def test_over_budget():
+            with flowscope.get_client().trace("app.slow"):
+                time.sleep(0.02)
+
+        @pytest.mark.flowscope_budget("app.*", max=1)
+        def test_nothing_traced():
+            pass
+    """)
+    result = _run(pytester)
+    result.assert_outcomes(passed=1, failed=2)
+    result.stdout.fnmatch_lines([
+        "*_ test_over_budget _*",
+        "Latency budget exceeded for 'app.*' over 1 span(s): max *ms > 1ms",
+        "*_ test_nothing_traced _*",
+        "No finished spans match 'app.*'",
+    ])
+
+
+def test_max_calls_marker_counts_per_trace(pytester):
+    pytester.makepyfile("""
+        import pytest
+        import flowscope
+
+        def request(llm_calls):
+            client = flowscope.get_client()
+            with client.trace("app.request"):
+                for _ in range(llm_calls):
+                    with client.trace("llm.call"):
+                        pass
+
+        @pytest.mark.flowscope_max_calls("llm.*", 2)
+        def test_two_requests_within_limit():
+            request(2)
+            request(2)
+
+        @pytest.mark.flowscope_max_calls("llm.*", 2)
+        def test_one_request_over_limit():
+            request(3)
+
+        @pytest.mark.flowscope_max_calls("llm.*", 3, per=None)
+        def test_total_over_limit():
+            request(2)
+            request(2)
+    """)
+    result = _run(pytester)
+    result.assert_outcomes(passed=1, failed=2)
+    result.stdout.fnmatch_lines([
+        "*_ test_one_request_over_limit _*",
+        "3 calls to 'llm.*' in trace *, limit is 2",
+        "*_ test_total_over_limit _*",
+        "4 calls to 'llm.*' in total, limit is 3",
+    ])
+
+
+def test_runs_repeats_the_test_body(pytester):
+    pytester.makepyfile("""
+        import pytest
+        import flowscope
+
+        executions = []
+
+        @pytest.mark.flowscope_budget("app.step", p50=5000, runs=4)
+        def test_repeated(flowscope_spans):
+            executions.append(1)
+            with flowscope.get_client().trace("app.step"):
+                pass
+            assert flowscope_spans.count("app.step") == len(executions)
+
+        def test_after():
+            assert len(executions) == 4
+    """)
+    _run(pytester).assert_outcomes(passed=2)
+
+
+def test_runs_needs_a_synchronous_test(pytester):
+    pytester.makepyfile("""
+        import pytest
+
+        @pytest.mark.flowscope_budget("app.step", runs=2)
+        async def test_async():
+            pass
+    """)
+    result = _run(pytester)
+    assert result.ret != 0
+    result.stdout.fnmatch_lines(["*flowscope_budget(runs=...) needs a synchronous test*"])
+
+
+def test_baseline_update_and_compare(pytester):
+    pytester.makepyfile(test_app=_traced_module(calls="2"))
+    baseline = pytester.path / "perf" / "baseline.json"
+
+    _run(pytester, f"--flowscope-baseline={baseline}", "--flowscope-update-baseline").assert_outcomes(passed=1)
+    stored = json.loads(baseline.read_text())
+    assert stored["tests"]["test_app.py::test_steps"]["app.step"]["calls_per_run"] == 2
+
+    _run(pytester, f"--flowscope-baseline={baseline}").assert_outcomes(passed=1)
+
+    pytester.makepyfile(test_app=_traced_module(calls="3"))
+    result = _run(pytester, f"--flowscope-baseline={baseline}")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        "*Performance regression against the FlowScope baseline:*",
+        "*app.step*3*2*MORE_CALLS*",
+    ])
+    # Comparing leaves the baseline as it was
+    assert json.loads(baseline.read_text()) == stored
+
+
+def test_baseline_flags_a_significant_slowdown(pytester):
+    pytester.makepyfile(test_app=_traced_module(calls="8"))
+    baseline = pytester.path / "baseline.json"
+    _run(pytester, f"--flowscope-baseline={baseline}", "--flowscope-update-baseline").assert_outcomes(passed=1)
+
+    pytester.makepyfile(test_app=_traced_module(calls="8", sleep_ms="30"))
+    result = _run(pytester, f"--flowscope-baseline={baseline}")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*app.step*SLOWER*"])
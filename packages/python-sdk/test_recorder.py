@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Flight recorder of recent spans
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from flowscope.core import FlowScopeClient, TraceData
+from flowscope.exporters.file import read_records
+from flowscope.recorder import FlightRecorder
+
+
+@pytest.fixture
+def make_recorder(tmp_path):
+    recorders = []
+
+    def make(**config):
+        recorder = FlightRecorder({"signal": None, "dump_directory": str(tmp_path / "dumps"), **config})
+        recorders.append(recorder)
+        return recorder
+
+    yield make
+    for recorder in recorders:
+        recorder.shutdown()
+
+
+def _record(recorder, operation, session_id=None, success=True, finished_at=None):
+    span = TraceData(operation, session_id)
+    span.finish(success, None if success else "failed")
+    if finished_at is not None:
+        span.start_time = span.end_time = finished_at
+    recorder.on_end(span)
+    return span
+
+
+def _wait_for_dumps():
+    # Automatic dumps are written on their own threads
+    for thread in threading.enumerate():
+        if thread.name == "flowscope-flight-dump":
+            thread.join(5.0)
+
+
+def _dumps(recorder):
+    directory = recorder.dump_directory
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_query_by_operation_session_and_status(make_recorder):
+    recorder = make_recorder()
+    first = _record(recorder, "llm.chat", "session-a")
+    _record(recorder, "tool.search", "session-a", success=False)
+    last = _record(recorder, "llm.chat", "session-b", success=False)
+    _record(recorder, "tool.search")
+
+    assert [span["id"] for span in recorder.query(operation="llm.chat")] == [last.id, first.id]
+    assert [span["operation"] for span in recorder.query(session_id="session-a")] == ["tool.search", "llm.chat"]
+    assert [span["operation"] for span in recorder.query(status="error")] == ["llm.chat", "tool.search"]
+    assert [span["id"] for span in recorder.query(operation="llm.chat", status="error")] == [last.id]
+    assert recorder.query(operation="llm.chat", session_id="session-b", status="success") == []
+    assert recorder.query(operation="no.such.operation") == []
+    assert len(recorder.query(limit=2)) == 2
+    assert len(recorder.query(limit=None)) == 4
+
+    summary = recorder.summary()
+    assert summary["spans"] == 4 and summary["sessions"] == 2
+    assert summary["operations"] == {"llm.chat": 2, "tool.search": 2}
+    assert summary["statuses"] == {"success": 2, "error": 2}
+
+
+def test_oldest_spans_are_evicted_beyond_max_bytes(make_recorder):
+    probe = make_recorder()
+    _record(probe, "step")
+    size = probe.summary()["bytes"]
+
+    recorder = make_recorder(max_bytes=3 * size + size // 2)
+    spans = [_record(recorder, "step", f"session-{number}") for number in range(5)]
+
+    assert [span["id"] for span in recorder.query(limit=None)] == [span.id for span in reversed(spans[2:])]
+    assert recorder.query(session_id="session-1") == []
+    summary = recorder.summary()
+    assert summary["spans"] == 3 and summary["sessions"] == 3
+    assert summary["bytes"] <= summary["max_bytes"]
+    assert summary["spans_evicted"] == 2
+
+
+def test_spans_older_than_the_window_are_evicted(make_recorder):
+    recorder = make_recorder(window=60.0)
+    now = time.time()
+    _record(recorder, "old", "session-old", finished_at=now - 120)
+    _record(recorder, "recent", finished_at=now - 30)
+
+    # A query evicts by the current time too, without a new span finishing
+    assert [span["operation"] for span in recorder.query()] == ["recent"]
+    assert recorder.summary()["operations"] == {"recent": 1}
+    assert recorder.summary()["sessions"] == 0
+    assert recorder.stats["spans_evicted"] == 1
+
+
+def test_error_burst_dumps_once_per_cooldown(make_recorder):
+    recorder = make_recorder(error_burst=3, error_window=10.0, dump_cooldown=60.0)
+    now = time.time()
+
+    # Three failures spread wider than the window are not a burst
+    for offset in (0, 6, 12):
+        _record(recorder, "tool", success=False, finished_at=now + offset)
+    _wait_for_dumps()
+    assert _dumps(recorder) == []
+
+    _record(recorder, "tool", success=False, finished_at=now + 13)
+    _record(recorder, "tool", success=False, finished_at=now + 14)
+    _wait_for_dumps()
+    assert len(_dumps(recorder)) == 1
+    assert _dumps(recorder)[0].endswith("-error_burst.ndjson.gz")
+
+    # Within the cooldown another burst does not dump
+    for offset in (20, 21, 22):
+        _record(recorder, "tool", success=False, finished_at=now + offset)
+    _wait_for_dumps()
+    assert len(_dumps(recorder)) == 1
+
+    for offset in (80, 81, 82):
+        _record(recorder, "tool", success=False, finished_at=now + offset)
+    _wait_for_dumps()
+    assert len(_dumps(recorder)) == 2
+    assert recorder.stats["dumps"] == 2
+
+
+def test_dump_is_read_by_flowscope_analyze(tmp_path, capsys):
+    pytest.importorskip("numpy")
+    from flowscope.cli import main
+
+    client = FlowScopeClient({
+        "exporter": "memory", "flight_recorder": {"signal": None, "dump_directory": str(tmp_path)},
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+    for _ in range(3):
+        with client.trace("request", session_id="session-a"):
+            with client.trace("llm.chat", session_id="session-a"):
+                pass
+    recorder = client.get_flight_recorder()
+    path = recorder.dump()
+    client.shutdown()
+
+    assert os.path.dirname(path) == str(tmp_path) and recorder.last_dump == path
+    assert len(list(read_records(path))) == 6
+    assert main(["analyze", "latency", str(tmp_path), "--json"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    assert {row["operation"]: row["count"] for row in rows} == {"request": 3, "llm.chat": 3}
+
+
+def _get(recorder, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{recorder.http_port}{path}", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_http_endpoints_serve_spans_and_summary(make_recorder):
+    recorder = make_recorder(http_port=0)
+    assert recorder.http_port
+    _record(recorder, "llm.chat", "session-a")
+    failed = _record(recorder, "llm.chat", "session-a", success=False)
+    _record(recorder, "tool.search", "session-b")
+
+    assert [span["id"] for span in _get(recorder, "/spans?operation=llm.chat&status=error")] == [failed.id]
+    assert [span["operation"] for span in _get(recorder, "/spans?session_id=session-a&limit=1")] == ["llm.chat"]
+    assert len(_get(recorder, "/spans")) == 3
+    assert _get(recorder, "/spans?since=" + str(time.time() + 60)) == []
+
+    summary = _get(recorder, "/summary")
+    assert summary["spans"] == 3
+    assert summary["operations"] == {"llm.chat": 2, "tool.search": 1}
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(recorder, "/spans?limit=many")
+    assert error.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(recorder, "/elsewhere")
+    assert error.value.code == 404
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Record/replay cache for instrumented calls
+"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import flowscope
+from flowscope import replay as replay_module
+from flowscope.auto import instrument_class
+from flowscope.core import TraceData
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.plugins import InstrumentationPlugin, MethodTarget, get_plugin, register_plugin
+from flowscope.replay import ReplayCache, ReplayMiss
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A strictly increasing clock, so least recently used is unambiguous
+    monkeypatch.setattr(replay_module, "time", SimpleNamespace(time=itertools.count(1).__next__))
+
+
+def _cache(tmp_path, **policy):
+    return ReplayCache({"path": str(tmp_path / "replay.db"), **policy})
+
+
+class Calls:
+    """A provider stand-in counting the calls that reach it."""
+
+    def __init__(self):
+        self.count = 0
+
+
+def _call(cache, inputs, calls, value="answer", operation="llm.invoke"):
+    def func():
+        calls.count += 1
+        return value
+    return cache.call(operation, inputs, func)
+
+
+def test_replay_hit_normalizes_whitespace_and_case(tmp_path):
+    cache = _cache(tmp_path, case_sensitive=False)
+    calls = Calls()
+    assert _call(cache, {"prompt": "Hello   World\n"}, calls, {"text": "hi"}) == {"text": "hi"}
+    assert _call(cache, {"prompt": " hello world"}, calls, "unused") == {"text": "hi"}
+    assert calls.count == 1
+    assert cache.stats["hits"] == 1 and cache.stats["recorded"] == 1
+
+    trace = TraceData("llm.invoke", None)
+    cache.call("llm.invoke", {"prompt": "HELLO WORLD"}, lambda: "unused", trace=trace)
+    assert trace.tags["flowscope.replayed"] is True
+    cache.close()
+
+
+def test_case_matters_by_default(tmp_path):
+    cache = _cache(tmp_path)
+    calls = Calls()
+    _call(cache, {"prompt": "Hello"}, calls)
+    _call(cache, {"prompt": "hello"}, calls)
+    assert calls.count == 2
+    cache.close()
+
+
+def test_strict_mode_raises_on_a_miss(tmp_path):
+    recorder = _cache(tmp_path, mode="record")
+    calls = Calls()
+    _call(recorder, {"prompt": "known"}, calls, "recorded")
+    _call(recorder, {"prompt": "known"}, calls, "recorded")  # Record mode always calls through
+    assert calls.count == 2
+    recorder.close()
+
+    strict = _cache(tmp_path, mode="strict")
+    assert _call(strict, {"prompt": "known"}, calls) == "recorded"
+    with pytest.raises(ReplayMiss):
+        _call(strict, {"prompt": "unknown"}, calls)
+    assert calls.count == 2
+    assert strict.stats["misses"] == 1
+    strict.close()
+
+
+def test_ignored_keys_are_left_out_of_the_key_at_any_depth(tmp_path):
+    cache = _cache(tmp_path, ignore_keys=["run_id", "request_id"])
+    first = {"prompt": "p", "run_id": 1, "config": {"request_id": "a", "temperature": 0}}
+    second = {"prompt": "p", "run_id": 2, "config": {"request_id": "b", "temperature": 0}}
+    assert cache.key("llm", first) == cache.key("llm", second)
+    assert cache.key("llm", first) != cache.key("llm", dict(first, config={"temperature": 1}))
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_entries(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=3)
+    calls = Calls()
+    for prompt in "abc":
+        _call(cache, {"prompt": prompt}, calls, prompt)
+    _call(cache, {"prompt": "a"}, calls)  # Hit: "a" is now the most recently used
+    _call(cache, {"prompt": "d"}, calls, "d")
+
+    assert cache.stats["evicted"] == 1
+    assert cache.get(cache.key("llm.invoke", {"prompt": "b"})) == (False, None)
+    assert all(cache.get(cache.key("llm.invoke", {"prompt": p}))[0] for p in "acd")
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes(tmp_path, clock):
+    cache = _cache(tmp_path, max_bytes=2500)
+    calls = Calls()
+    for prompt in "abc":
+        _call(cache, {"prompt": prompt}, calls, prompt * 1000)
+
+    assert cache.stats["evicted"] == 1
+    assert cache.get(cache.key("llm.invoke", {"prompt": "a"})) == (False, None)
+    assert cache.get(cache.key("llm.invoke", {"prompt": "c"})) == (True, "c" * 1000)
+    cache.close()
+
+
+def test_imported_span_files_serve_a_strict_replay(tmp_path):
+    register_plugin(InstrumentationPlugin("replayed", ["replayed"], [MethodTarget("Model", ["invoke"])]))
+
+    class Model:
+        calls = 0
+
+        def invoke(self, prompt, temperature=0):
+            Model.calls += 1
+            return {"text": prompt.upper()}
+
+    instrument_class(Model, get_plugin("replayed"))
+    spans = tmp_path / "spans"
+    client = flowscope.init({
+        "exporter": "file", "file_exporter": {"directory": str(spans)},
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+    Model().invoke("hello", temperature=0.5)
+    client.shutdown()
+
+    cache = _cache(tmp_path, include_instance=False)
+    assert cache.import_spans([str(spans)]) == 1
+    cache.close()
+
+    client = flowscope.init({
+        "exporter": InMemoryExporter(), "replay": {"mode": "strict", "path": str(tmp_path / "replay.db"), "include_instance": False},
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+    try:
+        assert Model().invoke("hello", temperature=0.5) == {"text": "HELLO"}
+        assert Model.calls == 1
+        with pytest.raises(ReplayMiss):
+            Model().invoke("hello", temperature=1.0)
+        assert Model.calls == 1
+    finally:
+        client.shutdown()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Per-span CPU time, allocation and GC-pause attribution
+"""
+
+import gc
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+
+import flowscope
+from flowscope.exporters.memory import InMemoryExporter
+from flowscope.resources import ResourceTracker
+
+
+@pytest.fixture
+def not_tracing():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc is already tracing")
+    yield
+    tracemalloc.stop()
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_resources_are_attached_to_spans():
+    exporter = InMemoryExporter()
+    client = flowscope.init({
+        "exporter": exporter, "resource_attribution": {},
+        "verbose": False, "shutdown_hooks": False, "auto_flush": False,
+    })
+    try:
+        with client.trace("work"):
+            _busy(0.02)
+            kept = [{"n": i} for i in range(5000)]
+            gc.collect()
+        with client.trace("wait"):
+            time.sleep(0.02)
+        flowscope.flush()
+    finally:
+        client.shutdown()
+
+    work, wait = exporter.spans
+    assert work.resources["cpu_time"] >= 10
+    assert work.resources["alloc_objects"] >= len(kept) // 2  # Net of objects freed meanwhile
+    assert work.resources["gc_collections"] >= 1
+    assert work.resources["gc_pause"] > 0
+    assert wait.resources["cpu_ratio"] < 0.5
+
+
+def test_trackers_share_tracemalloc(not_tracing):
+    first = ResourceTracker({"allocations": "tracemalloc", "cpu": False, "gc": False})
+    second = ResourceTracker({"allocations": "tracemalloc", "cpu": False, "gc": False})
+    first.close()
+    first.close()  # Closing twice releases once
+    assert tracemalloc.is_tracing()
+
+    span = SimpleNamespace(duration=1.0)
+    second.start(span)
+    kept = bytearray(1 << 20)
+    second.finish(span)
+    assert span.resources["alloc_bytes"] >= len(kept)
+
+    second.close()
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracemalloc_started_by_the_application_is_left_running(not_tracing):
+    tracemalloc.start()
+    ResourceTracker({"allocations": "tracemalloc"}).close()
+    assert tracemalloc.is_tracing()
+
+
+def test_unknown_allocation_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ResourceTracker({"allocations": "bytes"})
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Shutdown racing a flush that is still exporting on another thread
+"""
+
+import threading
+
+from flowscope.core import FlowScopeClient
+from flowscope.exporters.file import read_records, span_files
+from flowscope.exporters.memory import InMemoryExporter
+
+
+class FirstExportFails(InMemoryExporter):
+    """Fails the first export once release is set; later exports succeed."""
+
+    def __init__(self):
+        super().__init__()
+        self.exporting = threading.Event()
+        self.release = threading.Event()
+        self.failed = False
+
+    def export(self, traces):
+        if not self.failed:
+            self.failed = True
+            self.exporting.set()
+            self.release.wait(5.0)
+            return False
+        return super().export(traces)
+
+
+def _client(exporter, **config):
+    return FlowScopeClient({"exporter": exporter, "verbose": False, "shutdown_hooks": False, "auto_flush": False, **config})
+
+
+def _finish(client, count):
+    for _ in range(count):
+        with client.trace("op"):
+            pass
+
+
+def _flush_in_background(client, exporter):
+    flusher = threading.Thread(target=client.flush)
+    flusher.start()
+    assert exporter.exporting.wait(1.0)
+    return flusher
+
+
+def test_shutdown_drains_the_batch_of_a_failed_flush_in_flight():
+    exporter = FirstExportFails()
+    client = _client(exporter)
+    _finish(client, 10)
+    flusher = _flush_in_background(client, exporter)
+    _finish(client, 5)
+
+    threading.Timer(0.3, exporter.release.set).start()
+    assert client.shutdown(timeout=2)
+    flusher.join()
+    assert len(exporter.spans) == 15
+    assert client.traces == []
+    assert client.stats["spans_dropped"] == 0
+
+
+def test_batch_failing_after_the_deadline_is_spilled(tmp_path):
+    exporter = FirstExportFails()
+    client = _client(exporter, spool_directory=str(tmp_path))
+    _finish(client, 10)
+    flusher = _flush_in_background(client, exporter)
+    _finish(client, 5)
+
+    # The deadline passes waiting for the flush, so the newer spans are spilled too
+    assert not client.shutdown(timeout=0.2)
+    assert client.stats["spans_spilled"] == 5
+    exporter.release.set()
+    flusher.join()
+    assert client.traces == []
+    assert client.stats["spans_spilled"] == 15
+    assert client.stats["spans_dropped"] == 0
+    assert sum(1 for path in span_files([str(tmp_path)]) for _ in read_records(path)) == 15
+
+
+def test_batch_failing_after_the_deadline_is_counted_as_dropped():
+    exporter = FirstExportFails()
+    client = _client(exporter)
+    _finish(client, 10)
+    flusher = _flush_in_background(client, exporter)
+
+    assert not client.shutdown(timeout=0.1)
+    exporter.release.set()
+    flusher.join()
+    assert client.traces == []
+    assert client.stats["spans_dropped"] == 10
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Live streaming: span updates coalesced into frames
+
+No viewer is needed: the sender thread is kept from starting and frames are
+taken directly.
+"""
+
+import json
+
+from flowscope.core import TraceData
+from flowscope.streaming import LiveStreamer
+
+
+def _streamer():
+    streamer = LiveStreamer({"url": "ws://127.0.0.1:1"})
+    streamer._stopped.set()  # No sender thread
+    return streamer
+
+
+def test_span_within_one_frame_is_sent_once():
+    streamer = _streamer()
+    trace = TraceData("op", "s")
+    streamer.on_start(trace)
+    trace.finish()
+    streamer.on_end(trace)
+
+    [event] = json.loads(streamer._take_frame())["events"]
+    assert event["type"] == "span"
+    assert event["status"] == "success"
+    assert streamer._take_frame() is None
+
+
+def test_start_event_does_not_follow_later_metadata():
+    streamer = _streamer()
+    trace = TraceData("op", "s", metadata={"framework": "openai"})
+    streamer.on_start(trace)
+    trace.add_metadata(model="gpt-4o")
+
+    [event] = json.loads(streamer._take_frame())["events"]
+    assert event["metadata"] == {"framework": "openai"}
+
+
+def test_completing_a_pending_event_leaves_the_snapshot_entry():
+    streamer = _streamer()
+    trace = TraceData("op", "s")
+    streamer.on_start(trace)
+    snapshot = streamer._open[trace.id]
+    trace.finish()
+    streamer.on_end(trace)
+    assert snapshot["type"] == "span_start"
+    assert "status" not in snapshot
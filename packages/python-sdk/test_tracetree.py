@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Trace trees built from flat span records, and the flame graphs made from them
+"""
+
+import sys
+
+from flowscope.tracetree import build_trees, critical_path, to_folded, to_speedscope
+
+
+def _record(id, parent_id, operation, start, end):
+    return {"id": id, "parent_id": parent_id, "operation": operation, "start_time": start, "end_time": end}
+
+
+def _events(profile):
+    return [(event["type"], event["frame"], event["at"]) for event in profile["events"]]
+
+
+def test_concurrent_children_get_their_own_lane():
+    [root] = build_trees([
+        _record("a", None, "agent", 0.0, 1.0),
+        _record("b", "a", "tool", 0.1, 0.6),
+        _record("c", "a", "tool", 0.4, 0.9),  # Overlaps b
+    ])
+    document = to_speedscope([root])
+    agent, tool = 0, 1
+    main, lane = document["profiles"]
+    assert _events(main) == [("O", agent, 0.0), ("O", tool, 100.0), ("C", tool, 600.0), ("C", agent, 1000.0)]
+    assert _events(lane) == [("O", agent, 400.0), ("O", tool, 400.0), ("C", tool, 900.0), ("C", agent, 900.0)]
+    assert lane["name"] == "agent (concurrent lane 1)"
+
+
+def test_deep_traces_do_not_hit_the_recursion_limit():
+    depth = sys.getrecursionlimit() * 2
+    records = [_record("0", None, "step", 0.0, float(depth))]
+    records += [_record(str(i), str(i - 1), "step", i / 2, depth - i / 2) for i in range(1, depth)]
+    [root] = build_trees(records)
+
+    [profile] = to_speedscope([root])["profiles"]
+    assert len(profile["events"]) == 2 * depth
+    assert [event["type"] for event in profile["events"]] == ["O"] * depth + ["C"] * depth
+    assert len(critical_path(root)) == 2 * depth - 1
+    assert to_folded([root]).count("\n") == depth